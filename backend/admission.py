@@ -0,0 +1,151 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Deque, Dict, List
+
+logger = logging.getLogger(__name__)
+
+# work classes, lower is served first
+PRIORITY_TURN = 0       # a turn of a call already in progress
+PRIORITY_NEW_CALL = 1   # /start_call
+PRIORITY_NAMES = {PRIORITY_TURN: "turn", PRIORITY_NEW_CALL: "new_call"}
+
+SHED_QUEUE_FULL = "queue_full"
+SHED_TIMEOUT = "timeout"
+
+
+class AdmissionController:
+    """Adaptive (AIMD) concurrency limit in front of the webhook handlers.
+
+    The limit grows by about one per `limit` fast completions while it is
+    actually being used, and is cut by `backoff` at most once per
+    target_latency when a request comes back slower than target_latency or
+    fails, so a latency spike at the exchange turns into fewer requests in
+    flight instead of a pile-up. Requests over the limit wait in a bounded
+    queue for at most queue_timeout and are shed otherwise. Turns of existing
+    calls are always handed free slots first, and new calls may only use
+    new_call_share of the limit, so a burst of new calls can't starve the
+    calls already talking to us.
+    """
+
+    def __init__(self, initial_limit: float = 64, min_limit: float = 4, max_limit: float = 1024,
+                 target_latency: float = 2.0, backoff: float = 0.9, queue_timeout: float = 0.5,
+                 max_queue: int = 256, new_call_share: float = 0.8):
+        self.limit = float(initial_limit)
+        self.min_limit = float(min_limit)
+        self.max_limit = float(max_limit)
+        self.target_latency = target_latency
+        self.backoff = backoff
+        self.queue_timeout = queue_timeout
+        self.max_queue = max_queue
+        self.new_call_share = new_call_share
+        self.in_flight = 0
+        self.waiters: Dict[int, Deque[asyncio.Future]] = {priority: deque() for priority in PRIORITY_NAMES}
+        self.admitted = {priority: 0 for priority in PRIORITY_NAMES}
+        self.shed = {(priority, reason): 0 for priority in PRIORITY_NAMES for reason in (SHED_QUEUE_FULL, SHED_TIMEOUT)}
+        self.increases = 0
+        self.decreases = 0
+        self.latency_ewma = 0.0
+        self._last_decrease = 0.0
+
+    def _capacity(self, priority: int) -> int:
+        if priority == PRIORITY_TURN:
+            return max(int(self.limit), 1)
+        return max(int(self.limit * self.new_call_share), 1)
+
+    def _queued_ahead(self, priority: int) -> bool:
+        return any(self.waiters[p] for p in PRIORITY_NAMES if p <= priority)
+
+    async def acquire(self, priority: int) -> bool:
+        """True once a slot is held (release() it), False if the request was shed"""
+        if self.in_flight < self._capacity(priority) and not self._queued_ahead(priority):
+            self.in_flight += 1
+            self.admitted[priority] += 1
+            return True
+
+        queue = self.waiters[priority]
+        if len(queue) >= self.max_queue:
+            return self._shed(priority, SHED_QUEUE_FULL)
+        future = asyncio.get_running_loop().create_future()
+        queue.append(future)
+        try:
+            # release() hands the slot over by resolving the future, in_flight already counts us then
+            await asyncio.wait_for(future, self.queue_timeout)
+            self.admitted[priority] += 1
+            return True
+        except asyncio.TimeoutError:
+            try:
+                queue.remove(future)
+            except ValueError:
+                pass
+            return self._shed(priority, SHED_TIMEOUT)
+
+    def _shed(self, priority: int, reason: str) -> bool:
+        self.shed[(priority, reason)] += 1
+        logger.warning(f"Shedding {PRIORITY_NAMES[priority]} request ({reason}), limit {self.limit:.1f}, in flight {self.in_flight}")
+        return False
+
+    def release(self, latency: float, ok: bool = True):
+        was_in_flight = self.in_flight
+        self.in_flight -= 1
+        self._adjust(latency, ok, was_in_flight)
+        self._wake()
+
+    def _adjust(self, latency: float, ok: bool, was_in_flight: int):
+        self.latency_ewma = latency if self.latency_ewma == 0 else 0.9 * self.latency_ewma + 0.1 * latency
+        now = time.monotonic()
+        if not ok or latency > self.target_latency:
+            # many slow requests finish together in a spike, one cut per latency window is enough
+            if now - self._last_decrease >= self.target_latency:
+                self.limit = max(self.min_limit, self.limit * self.backoff)
+                self._last_decrease = now
+                self.decreases += 1
+        elif was_in_flight * 2 >= self.limit:
+            # only grow a limit we're actually using
+            self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+            self.increases += 1
+
+    def _wake(self):
+        for priority in sorted(PRIORITY_NAMES):
+            queue = self.waiters[priority]
+            while queue and self.in_flight < self._capacity(priority):
+                future = queue.popleft()
+                if future.done():
+                    continue
+                self.in_flight += 1
+                future.set_result(True)
+            if queue:
+                # lower priorities wait until this class is drained
+                return
+
+    def stats(self) -> Dict:
+        return {
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "queued": {PRIORITY_NAMES[p]: len(q) for p, q in self.waiters.items()},
+            "admitted": {PRIORITY_NAMES[p]: count for p, count in self.admitted.items()},
+            "shed": {f"{PRIORITY_NAMES[p]}_{reason}": count for (p, reason), count in self.shed.items()},
+            "latency_ewma_ms": round(self.latency_ewma * 1000, 1),
+            "limit_increases": self.increases,
+            "limit_decreases": self.decreases
+        }
+
+    def prometheus(self) -> List[str]:
+        """Metrics in the Prometheus text format"""
+        lines = [
+            "# TYPE admission_limit gauge", f"admission_limit {self.limit:.2f}",
+            "# TYPE admission_in_flight gauge", f"admission_in_flight {self.in_flight}",
+            "# TYPE admission_latency_ewma_seconds gauge", f"admission_latency_ewma_seconds {self.latency_ewma:.4f}",
+            "# TYPE admission_queued gauge"
+        ]
+        lines += [f'admission_queued{{class="{PRIORITY_NAMES[p]}"}} {len(q)}' for p, q in self.waiters.items()]
+        lines.append("# TYPE admission_admitted_total counter")
+        lines += [f'admission_admitted_total{{class="{PRIORITY_NAMES[p]}"}} {count}' for p, count in self.admitted.items()]
+        lines.append("# TYPE admission_shed_total counter")
+        lines += [f'admission_shed_total{{class="{PRIORITY_NAMES[p]}",reason="{reason}"}} {count}'
+                  for (p, reason), count in self.shed.items()]
+        lines += ["# TYPE admission_limit_changes_total counter",
+                  f'admission_limit_changes_total{{direction="increase"}} {self.increases}',
+                  f'admission_limit_changes_total{{direction="decrease"}} {self.decreases}']
+        return lines
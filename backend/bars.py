@@ -0,0 +1,352 @@
+import logging
+import time
+import warnings
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# resolution name -> (seconds per bar, finished bars kept per symbol)
+BAR_RESOLUTIONS = {
+    "1s": (1, 120),
+    "1m": (60, 240),
+    "5m": (300, 287)   # 287 finished bars + the one in progress = 24h, the window of the 24h indicators
+}
+
+DAY_SECONDS = 24 * 60 * 60
+
+# rolling sums over the finished bars in a ring: volume, price*volume, log return, squared log return, returns
+ROLL_VOLUME, ROLL_PV, ROLL_RET, ROLL_RET2, ROLL_N = range(5)
+
+
+class BarSeries:
+    """OHLCV bars of one resolution for every tracked symbol.
+
+    Row i belongs to symbol i. The bar being built lives in the cur_* arrays,
+    finished bars go into (rows x capacity) ring buffers at count % capacity.
+    With rolling=True the ring's volume, VWAP and return sums are kept up to
+    date as bars finish and fall out, so indicators don't rescan the ring.
+    """
+
+    def __init__(self, seconds: int, capacity: int, rows: int, rolling: bool = False):
+        self.seconds = seconds
+        self.capacity = capacity
+        self.rolling = rolling
+        self.count = np.zeros(rows, dtype=np.int64)
+        self.cur_start = np.full(rows, -1, dtype=np.int64)
+        self.cur = np.zeros((rows, 6), dtype=np.float64)  # open, high, low, close, volume, price*volume
+        self.start = np.full((rows, capacity), -1, dtype=np.int64)
+        self.bars = np.full((rows, capacity, 6), np.nan, dtype=np.float64)
+        self.roll = np.zeros((rows, 5), dtype=np.float64)
+
+    def grow(self, rows: int):
+        extra = rows - len(self.count)
+        self.count = np.concatenate([self.count, np.zeros(extra, dtype=np.int64)])
+        self.cur_start = np.concatenate([self.cur_start, np.full(extra, -1, dtype=np.int64)])
+        self.cur = np.concatenate([self.cur, np.zeros((extra, 6))])
+        self.start = np.concatenate([self.start, np.full((extra, self.capacity), -1, dtype=np.int64)])
+        self.bars = np.concatenate([self.bars, np.full((extra, self.capacity, 6), np.nan)])
+        self.roll = np.concatenate([self.roll, np.zeros((extra, 5))])
+
+    def _finish(self, closing: np.ndarray):
+        slot = self.count[closing] % self.capacity
+        if self.rolling:
+            with np.errstate(invalid="ignore", divide="ignore"):
+                # the oldest bar leaves the ring, with its return into the bar after it
+                full = self.count[closing] >= self.capacity
+                evicted = closing[full]
+                if len(evicted):
+                    old = self.bars[evicted, slot[full]]
+                    after = self.bars[evicted, (slot[full] + 1) % self.capacity, 3]
+                    r = np.log(after / old[:, 3])
+                    self.roll[evicted, ROLL_VOLUME] -= old[:, 4]
+                    self.roll[evicted, ROLL_PV] -= old[:, 5]
+                    self.roll[evicted, ROLL_RET] -= r
+                    self.roll[evicted, ROLL_RET2] -= r * r
+                    self.roll[evicted, ROLL_N] -= 1
+                new = self.cur[closing]
+                self.roll[closing, ROLL_VOLUME] += new[:, 4]
+                self.roll[closing, ROLL_PV] += new[:, 5]
+                # and the finished bar comes in with its return from the bar before it
+                has_prev = self.count[closing] > 0
+                linked = closing[has_prev]
+                if len(linked):
+                    prev_close = self.bars[linked, (slot[has_prev] - 1) % self.capacity, 3]
+                    r = np.log(new[has_prev, 3] / prev_close)
+                    self.roll[linked, ROLL_RET] += r
+                    self.roll[linked, ROLL_RET2] += r * r
+                    self.roll[linked, ROLL_N] += 1
+        self.start[closing, slot] = self.cur_start[closing]
+        self.bars[closing, slot] = self.cur[closing]
+        self.count[closing] += 1
+
+    def update(self, rows: np.ndarray, price: np.ndarray, volume: np.ndarray, ts: np.ndarray):
+        """Apply one tick per row (rows must be unique within a call)"""
+        bucket = (ts // self.seconds) * self.seconds
+        rolled = bucket > self.cur_start[rows]
+
+        # close out the current bar of every symbol whose tick opened a new one
+        closing = rows[rolled & (self.cur_start[rows] >= 0)]
+        if len(closing):
+            self._finish(closing)
+
+        fresh = rows[rolled]
+        if len(fresh):
+            p = price[rolled]
+            v = volume[rolled]
+            self.cur_start[fresh] = bucket[rolled]
+            self.cur[fresh] = np.column_stack([p, p, p, p, v, p * v])
+
+        # ticks for the bar already in progress (late ticks are folded into it too)
+        same = rows[~rolled]
+        if len(same):
+            p = price[~rolled]
+            v = volume[~rolled]
+            cur = self.cur[same]
+            cur[:, 1] = np.maximum(cur[:, 1], p)
+            cur[:, 2] = np.minimum(cur[:, 2], p)
+            cur[:, 3] = p
+            cur[:, 4] += v
+            cur[:, 5] += p * v
+            self.cur[same] = cur
+
+    def load(self, row: int, ts: np.ndarray, price: np.ndarray):
+        """Fill an empty row from recorded ticks (unix seconds, prices in time order), one vectorized pass"""
+        bucket = (ts // self.seconds) * self.seconds
+        # keep the bars that fit: capacity finished ones plus the one in progress
+        edges = np.flatnonzero(np.diff(bucket)) + 1
+        first = np.concatenate([[0], edges])[-(self.capacity + 1):]
+        bucket, price = bucket[first[0]:], price[first[0]:]
+        first = first - first[0]
+        last = np.concatenate([first[1:], [len(price)]]) - 1
+        volume = np.diff(np.concatenate([first, [len(price)]])).astype(np.float64)
+        bars = np.column_stack([price[first], np.maximum.reduceat(price, first), np.minimum.reduceat(price, first),
+                                price[last], volume, np.add.reduceat(price, first)])
+        finished = len(first) - 1
+        self.start[row, :finished] = bucket[first[:-1]]
+        self.bars[row, :finished] = bars[:-1]
+        self.count[row] = finished
+        self.cur_start[row] = bucket[first[-1]]
+        self.cur[row] = bars[-1]
+        if self.rolling and finished:
+            closes = bars[:-1, 3]
+            with np.errstate(invalid="ignore", divide="ignore"):
+                returns = np.diff(np.log(closes))
+            self.roll[row] = [bars[:-1, 4].sum(), bars[:-1, 5].sum(), returns.sum(), (returns * returns).sum(), len(returns)]
+
+    def window(self, since: int, rows=slice(None), columns=slice(None)) -> Tuple[np.ndarray, np.ndarray]:
+        """Bars with start >= since in chronological order, the in-progress bar last: (start, bars).
+
+        The oldest ring slot is always count % capacity (unused slots sort
+        first), so ordering is index arithmetic rather than a sort.
+        """
+        base = self.count[rows] % self.capacity
+        order = (base[:, None] + np.arange(self.capacity)) % self.capacity
+        start = np.concatenate([np.take_along_axis(self.start[rows], order, axis=1), self.cur_start[rows, None]], axis=1)
+        ring = self.bars[rows][:, :, columns]
+        ring = np.take_along_axis(ring, order[:, :, None], axis=1)
+        bars = np.concatenate([ring, self.cur[rows][:, None, columns]], axis=1)
+        valid = start >= max(since, 0)
+        bars = np.where(valid[:, :, None], bars, np.nan)
+        return np.where(valid, start, -1), bars
+
+
+class BarAggregator:
+    """Rolls ticks into 1s/1m/5m OHLCV bars per (exchange, symbol) and computes
+    rolling 24h indicators.
+
+    Only symbols someone asked about are tracked: a per-symbol price fetch,
+    bars() or indicators_for() starts tracking a symbol and backfills its bars
+    from history (the tick store, which records every snapshot), whole-exchange
+    snapshots then only update tracked rows. Memory follows the symbols in
+    use, not the thousands on the exchanges. Feeds without trade volume (a
+    polled last price) pass volume=1, so VWAP becomes a tick-weighted average
+    price.
+    """
+
+    def __init__(self, initial_rows: int = 64,
+                 history: Optional[Callable[[str, str, int], Dict[str, np.ndarray]]] = None):
+        self.index: Dict[Tuple[str, str], int] = {}
+        self.keys: List[Tuple[str, str]] = []
+        self.rows = initial_rows
+        self.history = history   # (exchange, symbol, start_ns) -> {"ts": ns, "last": price} columns
+        self.series = {name: BarSeries(seconds, capacity, initial_rows, rolling=name == "5m")
+                       for name, (seconds, capacity) in BAR_RESOLUTIONS.items()}
+        self.backfills = 0
+        self._indicator_cache: Tuple[int, Dict] = (-1, {})
+
+    def track(self, exchange: str, symbol: str) -> int:
+        """Row of a symbol, starting to track it (and backfilling its history) if it isn't yet"""
+        key = (exchange.lower(), symbol.upper())
+        row = self.index.get(key)
+        if row is None:
+            row = self.index[key] = len(self.keys)
+            self.keys.append(key)
+            if row >= self.rows:
+                self.rows *= 2
+                for series in self.series.values():
+                    series.grow(self.rows)
+            self._backfill(row, key)
+        return row
+
+    def _backfill(self, row: int, key: Tuple[str, str]):
+        if self.history is None:
+            return
+        try:
+            ticks = self.history(key[0], key[1], time.time_ns() - DAY_SECONDS * 1_000_000_000)
+            ts, last = ticks["ts"], ticks["last"]
+            keep = last > 0
+            if not keep.any():
+                return
+            ts, last = ts[keep] // 1_000_000_000, last[keep]
+            for series in self.series.values():
+                series.load(row, ts, last)
+            self.backfills += 1
+        except Exception as e:
+            logger.error(f"Bar backfill failed for {key}: {str(e)}")
+
+    def update(self, exchange: str, symbol: str, price: float, volume: float = 1.0, ts: Optional[float] = None):
+        self.track(exchange, symbol)
+        self.update_many([(exchange, symbol, price, volume)], ts)
+
+    def update_many(self, ticks: List[Tuple[str, str, float, float]], ts: Optional[float] = None):
+        """Apply a batch of (exchange, symbol, price, volume) ticks, e.g. a whole-exchange ticker snapshot; untracked symbols are skipped"""
+        index = self.index
+        ticks = [t for t in ticks if (t[0].lower(), t[1].upper()) in index]
+        if not ticks:
+            return
+        now = int(ts if ts is not None else time.time())
+        rows = np.fromiter((index[(t[0].lower(), t[1].upper())] for t in ticks), dtype=np.int64, count=len(ticks))
+        price = np.fromiter((t[2] for t in ticks), dtype=np.float64, count=len(ticks))
+        volume = np.fromiter((t[3] for t in ticks), dtype=np.float64, count=len(ticks))
+
+        # each pass handles the first remaining tick of every symbol, so repeated symbols stay in order
+        while len(rows):
+            _, first = np.unique(rows, return_index=True)
+            first.sort()
+            stamp = np.full(len(first), now, dtype=np.int64)
+            for series in self.series.values():
+                series.update(rows[first], price[first], volume[first], stamp)
+            keep = np.ones(len(rows), dtype=bool)
+            keep[first] = False
+            rows, price, volume = rows[keep], price[keep], volume[keep]
+
+    def bars(self, exchange: str, symbol: str, resolution: str = "1m", limit: int = 100) -> List[Dict]:
+        series = self.series.get(resolution)
+        if series is None:
+            return []
+        row = self.track(exchange, symbol)
+        start, bars = series.window(0, rows=slice(row, row + 1))
+        result = []
+        for bar_start, (o, h, l, c, v, pv) in zip(start[0].tolist(), bars[0].tolist()):
+            if bar_start < 0:
+                continue
+            result.append({"start": bar_start, "open": o, "high": h, "low": l, "close": c, "volume": v})
+        return result[-limit:]
+
+    def indicators(self, now: Optional[float] = None) -> Dict[Tuple[str, str], Dict]:
+        """24h change, 24h VWAP and 24h realized volatility for every tracked symbol"""
+        if not self.keys:
+            return {}
+        now = int(now if now is not None else time.time())
+        # one pass per second serves every lookup in that second
+        if self._indicator_cache[0] == now:
+            return self._indicator_cache[1]
+        rows = np.arange(len(self.keys))
+        result = {self.keys[row]: values for row, values in zip(rows.tolist(), self._indicators(rows, now)) if values}
+        self._indicator_cache = (now, result)
+        return result
+
+    def indicators_for(self, exchange: str, symbol: str, now: Optional[float] = None) -> Optional[Dict]:
+        """Indicators of one symbol, computed from its row alone"""
+        row = self.track(exchange, symbol)
+        now = int(now if now is not None else time.time())
+        return self._indicators(np.array([row]), now)[0]
+
+    def _indicators(self, rows: np.ndarray, now: int) -> List[Optional[Dict]]:
+        series = self.series["5m"]
+        since = now - DAY_SECONDS
+        cap = series.capacity
+        count = series.count[rows]
+        cur = series.cur[rows]
+        active = series.cur_start[rows] >= since
+
+        # the oldest finished bar, a ring whose oldest bar is already outside the window needs the full scan
+        oldest_slot = np.where(count >= cap, count % cap, 0)
+        oldest_start = np.where(count > 0, series.start[rows, oldest_slot], series.cur_start[rows])
+        stale = active & (oldest_start < since)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            roll = series.roll[rows]
+            newest_close = series.bars[rows, (count - 1) % cap, 3]
+            r = np.where(count > 0, np.log(cur[:, 3] / newest_close), 0.0)
+            samples = roll[:, ROLL_N] + (count > 0)
+            mean = (roll[:, ROLL_RET] + r) / samples
+            variance = np.maximum((roll[:, ROLL_RET2] + r * r) / samples - mean * mean, 0.0)
+
+            open_24h = np.where(count > 0, series.bars[rows, oldest_slot, 0], cur[:, 0])
+            last = cur[:, 3]
+            change = (last - open_24h) / open_24h * 100
+            vwap = (roll[:, ROLL_PV] + cur[:, 5]) / (roll[:, ROLL_VOLUME] + cur[:, 4])
+            volatility = np.where(samples > 1, np.sqrt(variance), np.nan) * np.sqrt(DAY_SECONDS / series.seconds) * 100
+            with warnings.catch_warnings():
+                # rows without finished bars are all NaN, the in-progress bar still counts
+                warnings.simplefilter("ignore", RuntimeWarning)
+                high = np.fmax(np.nanmax(series.bars[rows, :, 1], axis=1), cur[:, 1])
+                low = np.fmin(np.nanmin(series.bars[rows, :, 2], axis=1), cur[:, 2])
+
+        columns = np.column_stack([last, change, vwap, volatility, high, low])
+        if stale.any():
+            columns[stale], oldest_start[stale] = self._scan(series, rows[stale], since)
+
+        result: List[Optional[Dict]] = []
+        for is_active, values, first_start in zip(active.tolist(), columns.tolist(), oldest_start.tolist()):
+            if not is_active:
+                result.append(None)
+                continue
+            result.append({
+                "last": _clean(values[0]),
+                "change_24h_pct": _clean(values[1]),
+                "vwap_24h": _clean(values[2]),
+                "volatility_24h_pct": _clean(values[3]),
+                "high_24h": _clean(values[4]),
+                "low_24h": _clean(values[5]),
+                "since": first_start
+            })
+        return result
+
+    @staticmethod
+    def _scan(series: BarSeries, rows: np.ndarray, since: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Indicators from the windowed bars, for rows whose ring reaches back past the window (gaps in the feed)"""
+        start, bars = series.window(since, rows=rows)
+        n = np.arange(len(rows))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            has_bars = start >= 0
+            first = np.argmax(has_bars, axis=1)
+            open_24h = bars[n, first, 0]
+            last = series.cur[rows, 3]
+            change = (last - open_24h) / open_24h * 100
+            vwap = np.nansum(bars[:, :, 5], axis=1) / np.nansum(bars[:, :, 4], axis=1)
+            returns = np.diff(np.log(bars[:, :, 3]), axis=1)
+            samples = np.sum(~np.isnan(returns), axis=1)
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", RuntimeWarning)
+                volatility = np.nanstd(returns, axis=1)
+            volatility = np.where(samples > 1, volatility, np.nan) * np.sqrt(DAY_SECONDS / series.seconds) * 100
+            high = np.nanmax(np.where(has_bars, bars[:, :, 1], -np.inf), axis=1)
+            low = np.nanmin(np.where(has_bars, bars[:, :, 2], np.inf), axis=1)
+        return np.column_stack([last, change, vwap, volatility, high, low]), start[n, first]
+
+    def stats(self) -> Dict:
+        return {
+            "tracked": len(self.keys),
+            "rows_allocated": self.rows,
+            "backfills": self.backfills,
+            "ring_bytes": sum(s.bars.nbytes + s.start.nbytes for s in self.series.values())
+        }
+
+
+def _clean(value: float) -> Optional[float]:
+    # NaN / inf can't go out as JSON
+    return value if value == value and value not in (float("inf"), float("-inf")) else None
@@ -0,0 +1,148 @@
+"""Throughput of the sharded deployment for different worker counts.
+
+    python bench_shards.py --workers 1,2,4 --sessions 400
+
+Starts the fake exchange once, then for every worker count starts
+shard_router.py against it and drives whole calls (start_call, a few
+webhook turns, end_call) from --clients load generator processes. Prints
+turns per second, latency percentiles and scaling relative to one worker.
+Load generators compete with the workers for cores, so give the box
+(workers + clients) cores for a fair linear-scaling reading.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# one call, as the voice frontend would send it
+CALL_SCRIPT = ["okx", "btc usdt", "0.1 at 45000", "yes"]
+
+
+def _wait_for_port(port: int, timeout: float) -> bool:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+async def _drive(base_url: str, sessions: int, concurrency: int) -> List[float]:
+    latencies: List[float] = []
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=60.0, limits=limits) as client:
+        async def timed(method: str, url: str, **kwargs):
+            start = time.perf_counter()
+            response = await client.request(method, url, **kwargs)
+            latencies.append(time.perf_counter() - start)
+            response.raise_for_status()
+            return response
+
+        async def call():
+            async with semaphore:
+                session_id = (await timed("POST", "/start_call", json={"user_name": "bench"})).json()["session_id"]
+                for text in CALL_SCRIPT:
+                    await timed("POST", f"/bland_webhook/{session_id}",
+                                json={"from_": "bench", "to": "bot", "text": text, "direction": "inbound"})
+                await timed("POST", f"/end_call/{session_id}")
+
+        await asyncio.gather(*(call() for _ in range(sessions)))
+    return latencies
+
+
+def _client(base_url: str, sessions: int, concurrency: int, results):
+    results.put(asyncio.run(_drive(base_url, sessions, concurrency)))
+
+
+def run_load(base_url: str, sessions: int, clients: int, concurrency: int) -> Dict:
+    results = multiprocessing.Queue()
+    per_client = max(sessions // clients, 1)
+    procs = [multiprocessing.Process(target=_client, args=(base_url, per_client, concurrency, results)) for _ in range(clients)]
+    start = time.perf_counter()
+    for proc in procs:
+        proc.start()
+    latencies = [value for _ in procs for value in results.get()]
+    elapsed = time.perf_counter() - start
+    for proc in procs:
+        proc.join()
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "seconds": elapsed,
+        "requests_per_second": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the sharded deployment")
+    parser.add_argument("--workers", default="1,2,4", help="comma separated worker counts")
+    parser.add_argument("--sessions", type=int, default=400, help="calls per run")
+    parser.add_argument("--clients", type=int, default=2, help="load generator processes")
+    parser.add_argument("--concurrency", type=int, default=32, help="concurrent calls per load generator")
+    parser.add_argument("--port", type=int, default=8700)
+    parser.add_argument("--exchange-port", type=int, default=8790)
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env.update({"FAKE_EXCHANGE_URL": f"http://127.0.0.1:{args.exchange_port}", "SIM_SEED": "1"})
+    workdir = os.path.join(BACKEND_DIR, ".bench")
+    os.makedirs(workdir, exist_ok=True)
+    # a fresh state dir per run so journals and snapshots don't pile up between runs
+    env.update({"JOURNAL_DIR": os.path.join(workdir, "journal"), "TICK_DIR": os.path.join(workdir, "ticks"),
+                "SESSION_SNAPSHOT_PATH": os.path.join(workdir, "sessions.snapshot")})
+
+    exchange = subprocess.Popen([sys.executable, "-m", "uvicorn", "fake_exchange:app", "--port", str(args.exchange_port),
+                                 "--log-level", "warning"], cwd=BACKEND_DIR, env=env)
+    rows = []
+    try:
+        if not _wait_for_port(args.exchange_port, 30):
+            raise RuntimeError("fake exchange did not start")
+        for workers in [int(value) for value in args.workers.split(",")]:
+            supervisor = subprocess.Popen([sys.executable, "shard_router.py", "--workers", str(workers), "--host", "127.0.0.1",
+                                           "--port", str(args.port), "--worker-base-port", str(args.port + 1)],
+                                          cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            try:
+                if not _wait_for_port(args.port, 120):
+                    raise RuntimeError(f"router with {workers} workers did not start")
+                # warm up: imports, symbol lists, first ticker snapshots
+                run_load(f"http://127.0.0.1:{args.port}", workers * 4, 1, 4)
+                result = run_load(f"http://127.0.0.1:{args.port}", args.sessions, args.clients, args.concurrency)
+                result["workers"] = workers
+                rows.append(result)
+                print(f"{workers} workers: {result['requests_per_second']:.0f} req/s, "
+                      f"p50 {result['p50_ms']:.1f}ms, p99 {result['p99_ms']:.1f}ms", flush=True)
+            finally:
+                supervisor.terminate()
+                supervisor.wait(timeout=60)
+    finally:
+        exchange.terminate()
+        exchange.wait(timeout=10)
+
+    if rows:
+        base = rows[0]["requests_per_second"] / rows[0]["workers"]
+        print(f"\n{'workers':>8} {'req/s':>10} {'speedup':>8} {'efficiency':>10} {'p50 ms':>8} {'p99 ms':>8}")
+        for row in rows:
+            speedup = row["requests_per_second"] / rows[0]["requests_per_second"]
+            efficiency = row["requests_per_second"] / (base * row["workers"])
+            print(f"{row['workers']:>8} {row['requests_per_second']:>10.0f} {speedup:>8.2f} {efficiency:>10.0%} "
+                  f"{row['p50_ms']:>8.1f} {row['p99_ms']:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+import json
+import re
+from datetime import datetime, timezone
+from typing import Dict, List, Tuple, Type
+
+from instruments import KIND_FUTURE, KIND_OPTION, KIND_PERPETUAL, KIND_SPOT, Instrument, InstrumentRegistry, parse_expiry
+from price_source import split_symbol
+from ticker_cache import compact_symbol
+
+ADAPTER_TYPES: Dict[str, Type["ExchangeAdapter"]] = {}
+
+_NAN = float("nan")
+
+
+def register_adapter(exchange_id: str):
+    """Class decorator, the adapter used for EXCHANGES[exchange_id]"""
+    def decorator(cls):
+        ADAPTER_TYPES[exchange_id] = cls
+        return cls
+    return decorator
+
+
+class ExchangeAdapter:
+    """Request building and response parsing for one exchange.
+
+    Symbols inside the bot are canonical BASE-QUOTE (BTC-USDT, ETH-BTC);
+    every exchange spells them its own way (BTCUSDT, ETH-USDT,
+    BTC-PERPETUAL). Both spellings compact to the same key in the
+    InstrumentRegistry, so it maps either way. It is seeded from the
+    configured symbols, loaded from instrument listings (which name base and
+    quote explicitly) and otherwise guessed once per symbol with
+    split_symbol. URLs are prefixes built once, a price request is a string
+    concat. Subclasses set the query layout and parse only the fields they use;
+    this base class is the generic fallback for exchanges without one.
+
+    Exchanges with a whole-exchange ticker endpoint also describe its layout,
+    for TickerCache: symbol, last price and, where the exchange sends them,
+    best bid and ask are pulled straight out of the raw body with the named
+    groups of ticker_pattern, no per-item dicts are built. ticker_marker starts
+    every ticker object and checks nothing was missed, otherwise the body is
+    parsed as JSON from snapshot_items() and the snapshot keys.
+    """
+
+    separator = "-"             # between base and quote in native symbols
+    price_query = "symbol"      # query parameter carrying the native symbol
+    price_params = ""           # fixed query parameters before it, e.g. "category=spot&"
+    symbols_query = ""
+    bulk_ticker_endpoints: List[str] = []   # one request returns every symbol, none means per-symbol only
+    ticker_marker = b""
+    ticker_pattern = None
+    snapshot_symbol_key = "symbol"
+    snapshot_price_key = "price"
+    snapshot_bid_key = None     # best bid / ask fields, None when the bulk endpoint has no quotes
+    snapshot_ask_key = None
+
+    def __init__(self, exchange_id: str, config: Dict, registry: InstrumentRegistry):
+        self.exchange_id = exchange_id
+        self.registry = registry
+        self.name = config["name"]
+        self.base_url = config["base_url"]
+        self.price_url_prefix = f"{config['base_url']}{config['price_endpoint']}?{self.price_params}{self.price_query}="
+        self.symbols_url = f"{config['base_url']}{config['symbols_endpoint']}{self.symbols_query}"
+        self.bulk_ticker_urls = [f"{config['base_url']}{endpoint}" for endpoint in self.bulk_ticker_endpoints]
+        # configured symbols stand in for the catalog until the listing is fetched
+        registry.load(exchange_id, [self.guess(symbol) for symbol in config.get("symbols", [])], listing=False)
+
+    # symbol mapping
+
+    def guess(self, symbol: str) -> Instrument:
+        """Instrument for a symbol no listing has told us about"""
+        base, quote = split_symbol(symbol)
+        return Instrument(self.exchange_id, f"{base}{self.separator}{quote}", base, quote, listed=False)
+
+    def instrument(self, symbol: str) -> Instrument:
+        instrument = self.registry.get(self.exchange_id, symbol)
+        if instrument is None:
+            instrument = self.registry.add(self.guess(symbol))
+        return instrument
+
+    def to_native(self, symbol: str) -> str:
+        return self.instrument(symbol).native
+
+    def to_canonical(self, symbol: str) -> str:
+        return self.instrument(symbol).canonical
+
+    # requests and responses
+
+    def price_url(self, native: str) -> str:
+        return self.price_url_prefix + native
+
+    def parse_price(self, data, native: str) -> float:
+        if "price" in data:
+            return float(data["price"])
+        if "last" in data:
+            return float(data["last"])
+        if "close" in data:
+            return float(data["close"])
+        return 0.0
+
+    def parse_instruments(self, data) -> List[Instrument]:
+        return []
+
+    # bulk ticker snapshots
+
+    def parse_ticker_snapshot(self, body: bytes) -> Dict[str, float]:
+        """Parse a bulk ticker response into {compact symbol: last price}"""
+        return self.parse_ticker_quotes(body)[0]
+
+    def parse_ticker_quotes(self, body: bytes) -> Tuple[Dict[str, float], Dict[str, Tuple[float, float]]]:
+        """Last prices plus {compact symbol: (bid, ask)} for exchanges whose snapshot carries quotes"""
+        if self.ticker_pattern is not None:
+            matches = self.ticker_pattern.findall(body)
+            # every ticker object matched, otherwise the layout isn't what the pattern expects
+            if matches and len(matches) == body.count(self.ticker_marker):
+                groups = self.ticker_pattern.groupindex
+                symbol_at, last_at = groups["symbol"] - 1, groups["last"] - 1
+                bid_at, ask_at = groups.get("bid", 0) - 1, groups.get("ask", 0) - 1
+                prices, quotes = {}, {}
+                for match in matches:
+                    try:
+                        value = float(match[last_at])
+                    except ValueError:
+                        continue
+                    if value > 0:
+                        symbol = compact_symbol(match[symbol_at].decode())
+                        prices[symbol] = value
+                        if bid_at >= 0:
+                            quotes[symbol] = (_quote_price(match[bid_at]), _quote_price(match[ask_at]))
+                return prices, quotes
+        return self.parse_json_snapshot(json.loads(body))
+
+    def snapshot_items(self, data) -> List[Dict]:
+        return data if isinstance(data, list) else []
+
+    def parse_json_snapshot(self, data) -> Tuple[Dict[str, float], Dict[str, Tuple[float, float]]]:
+        prices, quotes = {}, {}
+        for item in self.snapshot_items(data):
+            try:
+                value = float(item.get(self.snapshot_price_key) or 0)
+            except (TypeError, ValueError):
+                continue
+            if value > 0:
+                symbol = compact_symbol(item[self.snapshot_symbol_key])
+                prices[symbol] = value
+                if self.snapshot_bid_key:
+                    quotes[symbol] = (_quote_price(item.get(self.snapshot_bid_key)), _quote_price(item.get(self.snapshot_ask_key)))
+        return prices, quotes
+
+
+@register_adapter("okx")
+class OKXAdapter(ExchangeAdapter):
+    price_query = "instId"
+    symbols_query = "?instType=SPOT"
+    bulk_ticker_endpoints = ["/api/v5/market/tickers?instType=SPOT"]
+    # ticker objects only hold string fields, so the pattern hops whole "key":"value" pairs between the fields
+    ticker_marker = b'"instId":"'
+    ticker_pattern = re.compile(rb'"instId":"(?P<symbol>[^"]+)"(?:,"[^"]*":"[^"]*")*?,"last":"(?P<last>[^"]*)"'
+                                rb'(?:,"[^"]*":"[^"]*")*?,"askPx":"(?P<ask>[^"]*)"(?:,"[^"]*":"[^"]*")*?,"bidPx":"(?P<bid>[^"]*)"')
+    snapshot_symbol_key = "instId"
+    snapshot_price_key = "last"
+    snapshot_bid_key = "bidPx"
+    snapshot_ask_key = "askPx"
+
+    def snapshot_items(self, data) -> List[Dict]:
+        return data.get("data", [])
+
+    def parse_price(self, data, native: str) -> float:
+        rows = data.get("data")
+        return float(rows[0].get("last") or 0) if rows else 0.0
+
+    def parse_instruments(self, data) -> List[Instrument]:
+        return [Instrument(self.exchange_id, item["instId"], item["baseCcy"], item["quoteCcy"]) for item in data.get("data", [])]
+
+
+@register_adapter("bybit")
+class BybitAdapter(ExchangeAdapter):
+    separator = ""
+    price_params = "category=spot&"
+    symbols_query = "?category=spot"
+    bulk_ticker_endpoints = ["/v5/market/tickers?category=spot"]
+    # same string-only layout as OKX (about twice as fast as scanning char by char)
+    ticker_marker = b'"symbol":"'
+    ticker_pattern = re.compile(rb'"symbol":"(?P<symbol>[^"]+)"(?:,"[^"]*":"[^"]*")*?,"bid1Price":"(?P<bid>[^"]*)"'
+                                rb'(?:,"[^"]*":"[^"]*")*?,"ask1Price":"(?P<ask>[^"]*)"(?:,"[^"]*":"[^"]*")*?,"lastPrice":"(?P<last>[^"]*)"')
+    snapshot_price_key = "lastPrice"
+    snapshot_bid_key = "bid1Price"
+    snapshot_ask_key = "ask1Price"
+
+    def snapshot_items(self, data) -> List[Dict]:
+        return data.get("result", {}).get("list", [])
+
+    def parse_price(self, data, native: str) -> float:
+        for item in data.get("result", {}).get("list", []):
+            if item.get("symbol") == native:
+                return float(item.get("lastPrice") or 0)
+        return 0.0
+
+    def parse_instruments(self, data) -> List[Instrument]:
+        return [Instrument(self.exchange_id, item["symbol"], item["baseCoin"], item["quoteCoin"])
+                for item in data.get("result", {}).get("list", [])]
+
+
+@register_adapter("binance")
+class BinanceAdapter(ExchangeAdapter):
+    separator = ""
+    bulk_ticker_endpoints = ["/api/v3/ticker/price"]
+    ticker_marker = b'"symbol":"'
+    ticker_pattern = re.compile(rb'"symbol":"(?P<symbol>[^"]+)","price":"(?P<last>[^"]*)"')
+
+    def parse_price(self, data, native: str) -> float:
+        return float(data.get("price") or 0)
+
+    def parse_instruments(self, data) -> List[Instrument]:
+        return [Instrument(self.exchange_id, item["symbol"], item["baseAsset"], item["quoteAsset"]) for item in data.get("symbols", [])]
+
+
+@register_adapter("deribit")
+class DeribitAdapter(ExchangeAdapter):
+    """Deribit lists perpetuals (BTC-PERPETUAL), futures (BTC-29SEP23), options
+    (BTC-29SEP23-30000-C) and spot pairs (BTC_USDC). The listing names kind,
+    currencies and expiry, only symbols it never named are read off the name.
+    """
+
+    price_query = "instrument_name"
+    symbols_query = "?currency=any"
+    # deribit only has per-currency summaries
+    bulk_ticker_endpoints = ["/api/v2/public/get_book_summary_by_currency?currency=BTC",
+                             "/api/v2/public/get_book_summary_by_currency?currency=ETH"]
+    # [^{}]*? keeps a match inside a single summary object
+    ticker_marker = b'"instrument_name":"'
+    ticker_pattern = re.compile(rb'"instrument_name":"(?P<symbol>[^"]+)"[^{}]*?"last":(?P<last>[-0-9.eE]+|null)')
+    snapshot_symbol_key = "instrument_name"
+    snapshot_price_key = "last"
+
+    def guess(self, symbol: str) -> Instrument:
+        name = symbol.upper().strip()
+        if "_" in name:
+            base, _, quote = name.partition("_")
+            return Instrument(self.exchange_id, name, base, quote, KIND_SPOT, listed=False)
+        parts = name.split("-")
+        expiry = parse_expiry(parts[1]) if len(parts) > 1 else None
+        if len(parts) == 4:
+            kind = KIND_OPTION
+        else:
+            kind = KIND_FUTURE if expiry else KIND_PERPETUAL
+        return Instrument(self.exchange_id, name, parts[0], "USD", kind, expiry, listed=False)
+
+    def listed_instrument(self, item: Dict) -> Instrument:
+        name = item["instrument_name"]
+        kind = item.get("kind")
+        if not kind or not item.get("base_currency"):
+            guessed = self.guess(name)
+            guessed.listed = True
+            return guessed
+        if kind == KIND_FUTURE and (item.get("settlement_period") == "perpetual" or name.endswith("-PERPETUAL")):
+            kind = KIND_PERPETUAL
+        expiry = None
+        if kind != KIND_PERPETUAL and kind != KIND_SPOT and item.get("expiration_timestamp"):
+            expiry = datetime.fromtimestamp(item["expiration_timestamp"] / 1000, timezone.utc).date().isoformat()
+        return Instrument(self.exchange_id, name, item["base_currency"], item.get("quote_currency") or "USD", kind, expiry)
+
+    def parse_price(self, data, native: str) -> float:
+        result = data.get("result") or {}
+        return float(result.get("last_price") or 0)
+
+    def parse_instruments(self, data) -> List[Instrument]:
+        return [self.listed_instrument(item) for item in data.get("result", [])]
+
+    def snapshot_items(self, data) -> List[Dict]:
+        return data.get("result", [])
+
+
+def _quote_price(value) -> float:
+    # empty or zero sides (no resting orders) are recorded as missing
+    try:
+        price = float(value)
+    except (TypeError, ValueError):
+        return _NAN
+    return price if price > 0 else _NAN
+
+
+def build_adapters(exchanges: Dict[str, Dict], registry: InstrumentRegistry) -> Dict[str, ExchangeAdapter]:
+    """One adapter per configured exchange, the generic one where no type is registered"""
+    return {exchange_id: ADAPTER_TYPES.get(exchange_id, ExchangeAdapter)(exchange_id, config, registry)
+            for exchange_id, config in exchanges.items()}
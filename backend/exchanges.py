@@ -0,0 +1,48 @@
+import os
+
+from exchange_adapters import build_adapters
+from instruments import InstrumentRegistry
+
+# Exchange configurations, shared by the API (main.py) and the shard market feeder (shard_router.py)
+EXCHANGES = {
+    "okx": {
+        "name": "OKX",
+        "base_url": "https://www.okx.com",
+        "symbols": ["BTC-USDT", "ETH-USDT", "XRP-USDT", "LTC-USDT", "ADA-USDT", "DOT-USDT", "LINK-USDT", "BCH-USDT", "EOS-USDT", "TRX-USDT"],
+        "price_endpoint": "/api/v5/market/ticker",
+        "symbols_endpoint": "/api/v5/public/instruments"
+    },
+    "bybit": {
+        "name": "Bybit",
+        "base_url": "https://api.bybit.com",
+        "symbols": ["BTC-USDT", "ETH-USDT", "XRP-USDT", "ETH-BTC", "XRP-BTC", "DOT-USDT", "XLM-USDT", "LTC-USDT", "DOGE-USDT", "CHZ-USDT"],
+        "price_endpoint": "/v5/market/tickers",
+        "symbols_endpoint": "/v5/market/instruments-info"
+    },
+    "deribit": {
+        "name": "Deribit",
+        "base_url": "https://www.deribit.com",
+        "symbols": ["BTC-PERPETUAL", "ETH-PERPETUAL", "BTC-30JUN23", "ETH-30JUN23", "BTC-29SEP23", "ETH-29SEP23"],
+        "price_endpoint": "/api/v2/public/ticker",
+        "symbols_endpoint": "/api/v2/public/get_instruments"
+    },
+    "binance": {
+        "name": "Binance",
+        "base_url": "https://api.binance.com",
+        "symbols": ["ETH-BTC", "LTC-BTC", "BNB-BTC", "NEO-BTC", "QTUM-ETH", "EOS-ETH", "SNT-ETH", "BNT-ETH", "BCC-BTC", "GAS-BTC"],
+        "price_endpoint": "/api/v3/ticker/price",
+        "symbols_endpoint": "/api/v3/exchangeInfo"
+    }
+}
+
+# point every exchange at the local simulator (fake_exchange.py) for offline load and chaos tests
+FAKE_EXCHANGE_URL = os.getenv("FAKE_EXCHANGE_URL")
+if FAKE_EXCHANGE_URL:
+    for exchange_id, exchange_config in EXCHANGES.items():
+        exchange_config["base_url"] = f"{FAKE_EXCHANGE_URL.rstrip('/')}/{exchange_id}"
+
+# every instrument of every exchange, catalogs are loaded as main.py fetches the listings
+INSTRUMENTS = InstrumentRegistry()
+
+# request builders and parsers per exchange, built after the base_url override above
+ADAPTERS = build_adapters(EXCHANGES, INSTRUMENTS)
@@ -0,0 +1,458 @@
+"""Simulated OKX / Bybit / Binance / Deribit for offline load and chaos testing.
+
+Run it next to the bot and point the bot at it:
+
+    uvicorn fake_exchange:app --port 9000
+    FAKE_EXCHANGE_URL=http://localhost:9000 uvicorn main:app
+
+Every exchange is mounted under its own prefix (/okx, /bybit, /binance,
+/deribit) and answers the REST and websocket endpoints the bot uses, in the
+same response shapes. Prices of all symbols move together as one vectorized
+random walk. Latency, errors and 429s can be injected through env vars or at
+runtime with POST /_sim/faults.
+"""
+import asyncio
+import json
+import logging
+import os
+import random
+import time
+from typing import Dict, List, Optional, Set
+
+import numpy as np
+from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel
+
+from price_source import BASE_PRICES
+
+logger = logging.getLogger(__name__)
+
+QUOTES = ["USDT", "BTC", "ETH"]
+
+SECONDS_PER_YEAR = 365 * 24 * 60 * 60
+
+
+class MarketSimulator:
+    """One geometric random walk per instrument, stepped for all instruments at once.
+
+    An instrument is a (base, quote) pair; every exchange lists the same
+    instruments under its own naming (BTC-USDT, BTCUSDT, BTC-PERPETUAL).
+    """
+
+    def __init__(self, symbols: int = 2000, volatility: float = 0.8, seed: Optional[int] = None):
+        self.rng = np.random.default_rng(seed)
+        # real coins first so the bot's default symbols resolve, then synthetic ones up to the requested count
+        bases = list(BASE_PRICES)
+        while len(bases) * len(QUOTES) < symbols:
+            bases.append(f"SIM{len(bases):04d}")
+        pairs = [(base, quote) for base in bases for quote in QUOTES if base != quote][:symbols]
+
+        self.bases = [base for base, _ in pairs]
+        self.quotes = [quote for _, quote in pairs]
+        usd = np.array([BASE_PRICES.get(base, 0.0) for base in bases])
+        synthetic = usd == 0
+        usd[synthetic] = np.exp(self.rng.uniform(np.log(0.01), np.log(500.0), synthetic.sum()))
+        usd_by_base = dict(zip(bases, usd.tolist()))
+        # cross pairs are priced through USD so BTC, ETH-BTC and ETH stay roughly consistent at the start
+        self.prices = np.array([usd_by_base[base] / (usd_by_base[quote] if quote != "USDT" else 1.0) for base, quote in pairs])
+        self.open = self.prices.copy()
+        self.high = self.prices.copy()
+        self.low = self.prices.copy()
+        self.volume = np.zeros(len(pairs))
+        self.volatility = self.rng.uniform(0.5, 1.5, len(pairs)) * volatility   # annualized
+        self.updated_at = time.time()
+        self.steps = 0
+
+        # per-exchange name -> instrument index
+        self.names: Dict[str, List[str]] = {
+            "okx": [f"{base}-{quote}" for base, quote in pairs],
+            "bybit": [f"{base}{quote}" for base, quote in pairs],
+            "binance": [f"{base}{quote}" for base, quote in pairs],
+            # deribit only lists perpetuals, one per base coin
+            "deribit": [f"{base}-PERPETUAL" if quote == "USDT" else None for base, quote in pairs]
+        }
+        self.index: Dict[str, Dict[str, int]] = {
+            exchange: {_compact(name): i for i, name in enumerate(names) if name}
+            for exchange, names in self.names.items()
+        }
+
+    def step(self, now: Optional[float] = None):
+        now = now if now is not None else time.time()
+        dt = max(now - self.updated_at, 1e-3) / SECONDS_PER_YEAR
+        shocks = self.rng.standard_normal(len(self.prices))
+        self.prices *= np.exp(-0.5 * self.volatility ** 2 * dt + self.volatility * np.sqrt(dt) * shocks)
+        np.maximum(self.high, self.prices, out=self.high)
+        np.minimum(self.low, self.prices, out=self.low)
+        self.volume += self.rng.exponential(1.0, len(self.prices))
+        self.updated_at = now
+        self.steps += 1
+
+    def find(self, exchange: str, symbol: str) -> Optional[int]:
+        # lenient like a user typing it: BTC-USDT, btcusdt and BTC_USDT all resolve
+        return self.index.get(exchange, {}).get(_compact(symbol))
+
+    def listed(self, exchange: str) -> List[int]:
+        return list(self.index.get(exchange, {}).values())
+
+
+def _compact(symbol: str) -> str:
+    return symbol.upper().replace("-", "").replace("_", "")
+
+
+def _fmt(value: float) -> str:
+    return f"{value:.10g}"
+
+
+class FaultInjector:
+    """Latency, 5xx errors and 429s applied to every simulated request and stream push"""
+
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, error_rate: float = 0.0,
+                 rate_limit_rate: float = 0.0, max_rps: float = 0.0, retry_after: int = 1):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.max_rps = max_rps
+        self.retry_after = retry_after
+        self.requests = 0
+        self.errors = 0
+        self.rate_limited = 0
+        self._tokens = max_rps
+        self._refilled_at = time.monotonic()
+
+    @classmethod
+    def from_env(cls) -> "FaultInjector":
+        return cls(
+            latency_ms=float(os.getenv("SIM_LATENCY_MS", "0")),
+            jitter_ms=float(os.getenv("SIM_JITTER_MS", "0")),
+            error_rate=float(os.getenv("SIM_ERROR_RATE", "0")),
+            rate_limit_rate=float(os.getenv("SIM_RATE_LIMIT_RATE", "0")),
+            max_rps=float(os.getenv("SIM_MAX_RPS", "0"))
+        )
+
+    def configure(self, **settings):
+        for name, value in settings.items():
+            if value is not None and hasattr(self, name):
+                setattr(self, name, value)
+        self._tokens = self.max_rps
+
+    async def delay(self):
+        latency = self.latency_ms + (random.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0.0)
+        if latency > 0:
+            await asyncio.sleep(latency / 1000)
+
+    def _over_rate(self) -> bool:
+        if self.max_rps <= 0:
+            return False
+        now = time.monotonic()
+        self._tokens = min(self.max_rps, self._tokens + (now - self._refilled_at) * self.max_rps)
+        self._refilled_at = now
+        if self._tokens < 1:
+            return True
+        self._tokens -= 1
+        return False
+
+    def check(self) -> Optional[Response]:
+        """An error response to send instead of the real one, or None"""
+        self.requests += 1
+        if self._over_rate() or (self.rate_limit_rate and random.random() < self.rate_limit_rate):
+            self.rate_limited += 1
+            return JSONResponse({"code": 429, "msg": "Too many requests"}, status_code=429,
+                                headers={"Retry-After": str(self.retry_after)})
+        if self.error_rate and random.random() < self.error_rate:
+            self.errors += 1
+            return JSONResponse({"code": 500, "msg": "Internal error (simulated)"}, status_code=500)
+        return None
+
+    def stats(self) -> Dict:
+        return {
+            "latency_ms": self.latency_ms, "jitter_ms": self.jitter_ms, "error_rate": self.error_rate,
+            "rate_limit_rate": self.rate_limit_rate, "max_rps": self.max_rps,
+            "requests": self.requests, "errors": self.errors, "rate_limited": self.rate_limited
+        }
+
+
+# response bodies in each exchange's shape, built from instrument indexes
+
+def okx_ticker(sim: MarketSimulator, i: int, ts: int) -> Dict:
+    return {"instType": "SPOT", "instId": sim.names["okx"][i], "last": _fmt(sim.prices[i]), "lastSz": "1",
+            "askPx": _fmt(sim.prices[i] * 1.0001), "askSz": "1", "bidPx": _fmt(sim.prices[i] * 0.9999), "bidSz": "1",
+            "open24h": _fmt(sim.open[i]), "high24h": _fmt(sim.high[i]), "low24h": _fmt(sim.low[i]),
+            "volCcy24h": _fmt(sim.volume[i] * sim.prices[i]), "vol24h": _fmt(sim.volume[i]), "ts": str(ts)}
+
+
+def bybit_ticker(sim: MarketSimulator, i: int) -> Dict:
+    return {"symbol": sim.names["bybit"][i], "bid1Price": _fmt(sim.prices[i] * 0.9999), "bid1Size": "1",
+            "ask1Price": _fmt(sim.prices[i] * 1.0001), "ask1Size": "1", "lastPrice": _fmt(sim.prices[i]),
+            "prevPrice24h": _fmt(sim.open[i]), "price24hPcnt": _fmt(sim.prices[i] / sim.open[i] - 1),
+            "highPrice24h": _fmt(sim.high[i]), "lowPrice24h": _fmt(sim.low[i]),
+            "turnover24h": _fmt(sim.volume[i] * sim.prices[i]), "volume24h": _fmt(sim.volume[i])}
+
+
+def deribit_summary(sim: MarketSimulator, i: int, ts: int) -> Dict:
+    return {"instrument_name": sim.names["deribit"][i], "base_currency": sim.bases[i], "quote_currency": "USD",
+            "volume": sim.volume[i], "mark_price": sim.prices[i], "high": sim.high[i], "low": sim.low[i],
+            "last": sim.prices[i], "creation_timestamp": ts}
+
+
+def _body(data) -> Response:
+    # exchanges send compact JSON, the bot's bulk ticker regexes rely on it
+    return Response(json.dumps(data, separators=(",", ":")), media_type="application/json")
+
+
+def _ts() -> int:
+    return int(time.time() * 1000)
+
+
+simulator = MarketSimulator(
+    symbols=int(os.getenv("SIM_SYMBOLS", "2000")),
+    seed=int(os.environ["SIM_SEED"]) if os.getenv("SIM_SEED") else None
+)
+faults = FaultInjector.from_env()
+TICK_INTERVAL = float(os.getenv("SIM_TICK_INTERVAL", "0.1"))
+STREAM_INTERVAL = float(os.getenv("SIM_STREAM_INTERVAL", "0.1"))
+
+app = FastAPI(title="Fake Exchange Simulator", version="1.0.0")
+
+
+@app.middleware("http")
+async def inject_faults(request: Request, call_next):
+    if request.url.path.startswith("/_sim"):
+        return await call_next(request)
+    await faults.delay()
+    failure = faults.check()
+    if failure is not None:
+        return failure
+    return await call_next(request)
+
+
+async def _tick_loop():
+    while True:
+        try:
+            await asyncio.sleep(TICK_INTERVAL)
+            simulator.step()
+        except asyncio.CancelledError:
+            break
+        except Exception as e:
+            logger.error(f"Simulator tick error: {str(e)}")
+
+
+@app.on_event("startup")
+async def startup_event():
+    app.state.tick_task = asyncio.create_task(_tick_loop())
+    logger.info(f"Simulating {len(simulator.prices)} instruments, faults: {faults.stats()}")
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    app.state.tick_task.cancel()
+
+
+class FaultSettings(BaseModel):
+    latency_ms: Optional[float] = None
+    jitter_ms: Optional[float] = None
+    error_rate: Optional[float] = None
+    rate_limit_rate: Optional[float] = None
+    max_rps: Optional[float] = None
+    retry_after: Optional[int] = None
+
+
+@app.post("/_sim/faults")
+async def set_faults(settings: FaultSettings):
+    faults.configure(**settings.model_dump())
+    return faults.stats()
+
+
+@app.get("/_sim/stats")
+async def sim_stats():
+    return {"instruments": len(simulator.prices), "steps": simulator.steps, "faults": faults.stats()}
+
+
+# OKX
+
+@app.get("/okx/api/v5/market/ticker")
+async def okx_single_ticker(instId: str):
+    i = simulator.find("okx", instId)
+    if i is None:
+        return _body({"code": "51001", "msg": "Instrument ID does not exist", "data": []})
+    return _body({"code": "0", "msg": "", "data": [okx_ticker(simulator, i, _ts())]})
+
+
+@app.get("/okx/api/v5/market/tickers")
+async def okx_tickers(instType: str = "SPOT"):
+    ts = _ts()
+    return _body({"code": "0", "msg": "", "data": [okx_ticker(simulator, i, ts) for i in simulator.listed("okx")]})
+
+
+@app.get("/okx/api/v5/public/instruments")
+async def okx_instruments(instType: str = "SPOT"):
+    return _body({"code": "0", "msg": "", "data": [
+        {"instType": "SPOT", "instId": simulator.names["okx"][i], "baseCcy": simulator.bases[i],
+         "quoteCcy": simulator.quotes[i], "state": "live"}
+        for i in simulator.listed("okx")]})
+
+
+# Bybit
+
+@app.get("/bybit/v5/market/tickers")
+async def bybit_tickers(category: str = "spot", symbol: Optional[str] = None):
+    if symbol is not None:
+        i = simulator.find("bybit", symbol)
+        if i is None:
+            return _body({"retCode": 10001, "retMsg": "Not supported symbols", "result": {}, "time": _ts()})
+        rows = [i]
+    else:
+        rows = simulator.listed("bybit")
+    return _body({"retCode": 0, "retMsg": "OK", "result": {"category": category, "list": [bybit_ticker(simulator, i) for i in rows]},
+                  "time": _ts()})
+
+
+@app.get("/bybit/v5/market/instruments-info")
+async def bybit_instruments(category: str = "spot"):
+    return _body({"retCode": 0, "retMsg": "OK", "result": {"category": category, "list": [
+        {"symbol": simulator.names["bybit"][i], "baseCoin": simulator.bases[i], "quoteCoin": simulator.quotes[i], "status": "Trading"}
+        for i in simulator.listed("bybit")]}})
+
+
+# Binance
+
+@app.get("/binance/api/v3/ticker/price")
+async def binance_price(symbol: Optional[str] = None):
+    if symbol is not None:
+        i = simulator.find("binance", symbol)
+        if i is None:
+            return JSONResponse({"code": -1121, "msg": "Invalid symbol."}, status_code=400)
+        return _body({"symbol": simulator.names["binance"][i], "price": _fmt(simulator.prices[i])})
+    return _body([{"symbol": simulator.names["binance"][i], "price": _fmt(simulator.prices[i])} for i in simulator.listed("binance")])
+
+
+@app.get("/binance/api/v3/exchangeInfo")
+async def binance_exchange_info():
+    return _body({"timezone": "UTC", "serverTime": _ts(), "symbols": [
+        {"symbol": simulator.names["binance"][i], "status": "TRADING", "baseAsset": simulator.bases[i], "quoteAsset": simulator.quotes[i]}
+        for i in simulator.listed("binance")]})
+
+
+# Deribit
+
+@app.get("/deribit/api/v2/public/ticker")
+async def deribit_ticker(instrument_name: Optional[str] = None, symbol: Optional[str] = None):
+    i = simulator.find("deribit", instrument_name or symbol or "")
+    if i is None:
+        return JSONResponse({"jsonrpc": "2.0", "error": {"code": 10009, "message": "instrument_not_found"}}, status_code=400)
+    return _body({"jsonrpc": "2.0", "result": {"instrument_name": simulator.names["deribit"][i], "last_price": simulator.prices[i],
+                                                "mark_price": simulator.prices[i], "timestamp": _ts()}})
+
+
+@app.get("/deribit/api/v2/public/get_book_summary_by_currency")
+async def deribit_book_summary(currency: str = "BTC"):
+    ts = _ts()
+    rows = [i for i in simulator.listed("deribit") if simulator.bases[i] == currency.upper()]
+    return _body({"jsonrpc": "2.0", "result": [deribit_summary(simulator, i, ts) for i in rows]})
+
+
+@app.get("/deribit/api/v2/public/get_instruments")
+async def deribit_instruments(currency: str = "any"):
+    return _body({"jsonrpc": "2.0", "result": [
+        {"instrument_name": simulator.names["deribit"][i], "base_currency": simulator.bases[i], "quote_currency": "USD",
+         "kind": "future", "settlement_period": "perpetual", "expiration_timestamp": 32503708800000, "is_active": True}
+        for i in simulator.listed("deribit") if currency == "any" or simulator.bases[i] == currency.upper()]})
+
+
+# streams: subscribe in the exchange's own protocol, then get one push per subscribed symbol every STREAM_INTERVAL
+
+def _subscriptions(exchange: str, message: Dict) -> List[int]:
+    if exchange == "okx":
+        names = [arg.get("instId", "") for arg in message.get("args", []) if arg.get("channel") == "tickers"]
+    elif exchange == "bybit":
+        names = [topic.split(".", 1)[1] for topic in message.get("args", []) if topic.startswith("tickers.")]
+    elif exchange == "binance":
+        names = [param.split("@")[0] for param in message.get("params", []) if param.endswith("@ticker")]
+    else:
+        names = [channel.split(".")[1] for channel in message.get("params", {}).get("channels", []) if channel.startswith("ticker.")]
+    found = [simulator.find(exchange, name) for name in names]
+    return [i for i in found if i is not None]
+
+
+def _ack(exchange: str, message: Dict) -> Dict:
+    if exchange == "okx":
+        return {"event": "subscribe", "args": message.get("args", [])}
+    if exchange == "bybit":
+        return {"success": True, "ret_msg": "subscribe", "op": "subscribe"}
+    if exchange == "binance":
+        return {"result": None, "id": message.get("id")}
+    return {"jsonrpc": "2.0", "id": message.get("id"), "result": message.get("params", {}).get("channels", [])}
+
+
+def _push(exchange: str, i: int, ts: int) -> Dict:
+    if exchange == "okx":
+        return {"arg": {"channel": "tickers", "instId": simulator.names["okx"][i]}, "data": [okx_ticker(simulator, i, ts)]}
+    if exchange == "bybit":
+        return {"topic": f"tickers.{simulator.names['bybit'][i]}", "ts": ts, "type": "snapshot", "data": bybit_ticker(simulator, i)}
+    if exchange == "binance":
+        return {"e": "24hrTicker", "E": ts, "s": simulator.names["binance"][i], "c": _fmt(simulator.prices[i]),
+                "o": _fmt(simulator.open[i]), "h": _fmt(simulator.high[i]), "l": _fmt(simulator.low[i]), "v": _fmt(simulator.volume[i])}
+    name = simulator.names["deribit"][i]
+    return {"jsonrpc": "2.0", "method": "subscription", "params": {
+        "channel": f"ticker.{name}.100ms", "data": {"instrument_name": name, "last_price": simulator.prices[i], "timestamp": ts}}}
+
+
+async def _stream(websocket: WebSocket, exchange: str):
+    await websocket.accept()
+    subscribed: Set[int] = set()
+
+    async def reader():
+        while True:
+            message = json.loads(await websocket.receive_text())
+            if message.get("op") == "ping" or message.get("method") == "public/test":
+                await websocket.send_text(json.dumps({"op": "pong"}))
+                continue
+            subscribed.update(_subscriptions(exchange, message))
+            await websocket.send_text(json.dumps(_ack(exchange, message)))
+
+    reader_task = asyncio.create_task(reader())
+    try:
+        while not reader_task.done():
+            await asyncio.sleep(STREAM_INTERVAL)
+            if not subscribed:
+                continue
+            await faults.delay()
+            # a failed push is a dropped connection, like a real exchange resetting the socket
+            if faults.error_rate and random.random() < faults.error_rate:
+                faults.errors += 1
+                await websocket.close(code=1011)
+                break
+            ts = _ts()
+            for i in list(subscribed):
+                await websocket.send_text(json.dumps(_push(exchange, i, ts), separators=(",", ":")))
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        reader_task.cancel()
+
+
+@app.websocket("/okx/ws/v5/public")
+async def okx_stream(websocket: WebSocket):
+    await _stream(websocket, "okx")
+
+
+@app.websocket("/bybit/v5/public/spot")
+async def bybit_stream(websocket: WebSocket):
+    await _stream(websocket, "bybit")
+
+
+@app.websocket("/binance/ws")
+async def binance_stream(websocket: WebSocket):
+    await _stream(websocket, "binance")
+
+
+@app.websocket("/deribit/ws/api/v2")
+async def deribit_stream(websocket: WebSocket):
+    await _stream(websocket, "deribit")
+
+
+if __name__ == "__main__":
+    import uvicorn
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    uvicorn.run(app, host="0.0.0.0", port=int(os.getenv("SIM_PORT", "9000")), log_level="warning")
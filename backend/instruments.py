@@ -0,0 +1,145 @@
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from ticker_cache import compact_symbol
+
+KIND_SPOT = "spot"
+KIND_PERPETUAL = "perpetual"
+KIND_FUTURE = "future"
+KIND_OPTION = "option"
+
+
+def parse_expiry(code: str) -> Optional[str]:
+    """29SEP23 -> 2023-09-29, None if it isn't a Deribit style expiry"""
+    try:
+        return datetime.strptime(code.upper(), "%d%b%y").date().isoformat()
+    except ValueError:
+        return None
+
+
+class Instrument:
+    __slots__ = ("exchange", "native", "canonical", "base", "quote", "kind", "expiry", "listed")
+
+    def __init__(self, exchange: str, native: str, base: str, quote: str, kind: str = KIND_SPOT,
+                 expiry: Optional[str] = None, listed: bool = True):
+        self.exchange = exchange
+        self.native = native
+        self.base = base.upper()
+        self.quote = quote.upper()
+        self.kind = kind
+        self.expiry = expiry
+        self.listed = listed   # False for guesses, the exchange's listing never named it
+        # spot pairs are BASE-QUOTE everywhere, derivatives keep their exchange name (BTC-PERPETUAL)
+        self.canonical = f"{self.base}-{self.quote}" if kind == KIND_SPOT else native.upper()
+
+    def to_dict(self) -> Dict:
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+
+class InstrumentRegistry:
+    """Every known instrument per exchange, with lookups by symbol, base, quote and spoken alias.
+
+    An exchange's catalog is loaded in one go from its instruments listing
+    and all indexes for it are rebuilt then, so answering "show only bitcoin
+    symbols" is an alias lookup plus two dict reads. Symbols are keyed by
+    their compact form, so BTC-USDT, btc_usdt and BTCUSDT find the same
+    instrument. Until the first listing arrives the configured defaults
+    stand in for the catalog; guesses for unlisted symbols are only kept for
+    symbol mapping and never show up in symbols() or the base/quote lookups.
+    """
+
+    def __init__(self):
+        self.by_symbol: Dict[str, Dict[str, Instrument]] = {}
+        self.by_base: Dict[str, Dict[str, List[Instrument]]] = {}
+        self.by_quote: Dict[str, Dict[str, List[Instrument]]] = {}
+        self.listed: Dict[str, List[Instrument]] = {}
+        self.loaded_at: Dict[str, float] = {}
+        self.aliases: Dict[str, str] = {}
+        self.loads = 0
+
+    def add_aliases(self, aliases: Dict[str, Iterable[str]]):
+        """{asset: names it's spoken as}, e.g. {"BTC": ["bitcoin", "bit coin"]}"""
+        for asset, names in aliases.items():
+            self.aliases[asset.lower()] = asset.upper()
+            for name in names:
+                self.aliases[name.lower()] = asset.upper()
+
+    def resolve(self, name: str) -> str:
+        """Asset ticker for a spoken name or ticker ("bitcoin" -> BTC)"""
+        return self.aliases.get(name.lower(), name.upper())
+
+    def load(self, exchange: str, instruments: Iterable[Instrument], listing: bool = True):
+        """Replace an exchange's catalog with a fresh listing (listing=False seeds it, it doesn't count as loaded)"""
+        by_symbol: Dict[str, Instrument] = {}
+        by_base: Dict[str, List[Instrument]] = {}
+        by_quote: Dict[str, List[Instrument]] = {}
+        listed = []
+        for instrument in instruments:
+            key = compact_symbol(instrument.native)
+            if key in by_symbol:
+                continue
+            by_symbol[key] = instrument
+            by_base.setdefault(instrument.base, []).append(instrument)
+            by_quote.setdefault(instrument.quote, []).append(instrument)
+            listed.append(instrument)
+        self.by_symbol[exchange] = by_symbol
+        self.by_base[exchange] = by_base
+        self.by_quote[exchange] = by_quote
+        self.listed[exchange] = listed
+        if listing:
+            self.loaded_at[exchange] = time.time()
+            self.loads += 1
+
+    def add(self, instrument: Instrument) -> Instrument:
+        """Remember a guessed instrument for symbol mapping, the catalog indexes stay as listed"""
+        exchange = instrument.exchange
+        key = compact_symbol(instrument.native)
+        known = self.by_symbol.setdefault(exchange, {}).get(key)
+        if known is not None:
+            return known
+        self.by_symbol[exchange][key] = instrument
+        return instrument
+
+    def get(self, exchange: str, symbol: str) -> Optional[Instrument]:
+        return self.by_symbol.get(exchange, {}).get(compact_symbol(symbol))
+
+    def with_base(self, exchange: str, asset: str) -> List[Instrument]:
+        return self.by_base.get(exchange, {}).get(self.resolve(asset), [])
+
+    def with_quote(self, exchange: str, asset: str) -> List[Instrument]:
+        return self.by_quote.get(exchange, {}).get(self.resolve(asset), [])
+
+    def with_asset(self, exchange: str, asset: str) -> List[Instrument]:
+        """Instruments trading the asset, ones where it is the base first"""
+        return self.with_base(exchange, asset) + self.with_quote(exchange, asset)
+
+    def is_listed(self, exchange: str, symbol: str) -> bool:
+        """Whether the exchange's catalog has the symbol, True while no catalog was loaded yet"""
+        if exchange not in self.loaded_at:
+            return True
+        instrument = self.get(exchange, symbol)
+        return instrument is not None and instrument.listed
+
+    def has_base(self, exchange: str, symbol: str, asset: str) -> bool:
+        """Whether the symbol trades the asset (ETH-BTC trades ETH, not BTC)"""
+        instrument = self.get(exchange, symbol)
+        return instrument is not None and instrument.base == self.resolve(asset)
+
+    def symbols(self, exchange: str, limit: Optional[int] = None) -> List[str]:
+        return [instrument.canonical for instrument in self.listed.get(exchange, [])[:limit]]
+
+    def age(self, exchange: str) -> Optional[float]:
+        """Seconds since the exchange's catalog was loaded, None if it never was"""
+        loaded_at = self.loaded_at.get(exchange)
+        return time.time() - loaded_at if loaded_at else None
+
+    def stats(self) -> Dict:
+        return {
+            "loads": self.loads,
+            "aliases": len(self.aliases),
+            "exchanges": {
+                exchange: {"instruments": len(instruments), "age_seconds": round(self.age(exchange), 1) if exchange in self.loaded_at else None}
+                for exchange, instruments in self.by_symbol.items()
+            }
+        }
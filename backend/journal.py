@@ -0,0 +1,308 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_PREFIX = "journal-"
+SEGMENT_SUFFIX = ".jsonl"
+CHECKPOINT_NAME = "checkpoint.json"
+
+# order statuses after which nothing more can happen to an order
+FINAL_ORDER_STATUSES = ("filled", "cancelled", "rejected")
+
+
+def _segment_name(index: int) -> str:
+    return f"{SEGMENT_PREFIX}{index:06d}{SEGMENT_SUFFIX}"
+
+
+def _segment_index(path: str) -> int:
+    return int(os.path.basename(path)[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)])
+
+
+def list_segments(directory: str) -> List[str]:
+    """Segment paths in write order"""
+    if not os.path.isdir(directory):
+        return []
+    names = sorted(n for n in os.listdir(directory) if n.startswith(SEGMENT_PREFIX) and n.endswith(SEGMENT_SUFFIX))
+    return [os.path.join(directory, n) for n in names]
+
+
+def _read_segment(path: str, needle: Optional[bytes] = None) -> Iterator[Dict]:
+    with open(path, "rb") as f:
+        for line in f:
+            # cheap byte check before parsing, a session's records are a small part of a segment
+            if needle is not None and needle not in line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                # a crash mid-write can leave a torn last line, everything before it is intact
+                logger.warning(f"Skipping torn journal record in {path}")
+
+
+def read_records(directory: str, kind: Optional[str] = None, session_id: Optional[str] = None,
+                 since_seq: int = 0, first_segment: int = 0) -> Iterator[Dict]:
+    """Replay the journal in order, optionally filtered by record kind and session.
+
+    With a session, only the segments the checkpoint lists for it (and the ones
+    written since) are read.
+    """
+    needle = None
+    segments = [path for path in list_segments(directory) if _segment_index(path) >= first_segment]
+    if session_id is not None:
+        needle = json.dumps({"session_id": session_id}, separators=(",", ":"))[1:-1].encode()
+        checkpoint = load_checkpoint(directory)
+        indexed = set(checkpoint["sessions"].get(session_id, []))
+        segments = [path for path in segments
+                    if _segment_index(path) in indexed or _segment_index(path) >= checkpoint["segment"]]
+    for path in segments:
+        for record in _read_segment(path, needle):
+            if record["seq"] <= since_seq:
+                continue
+            if kind is not None and record["kind"] != kind:
+                continue
+            if session_id is not None and record.get("session_id") != session_id:
+                continue
+            yield record
+
+
+def _empty_checkpoint() -> Dict:
+    # segment: first segment the checkpoint doesn't cover yet
+    return {"segment": 0, "seq": 0, "orders": {}, "triggers": {}, "sessions": {}}
+
+
+def load_checkpoint(directory: str) -> Dict:
+    """State folded from every sealed segment up to checkpoint["segment"]"""
+    try:
+        with open(os.path.join(directory, CHECKPOINT_NAME), "rb") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return _empty_checkpoint()
+
+
+def _fold(state: Dict, record: Dict, segment: int):
+    data = record["data"]
+    if record["kind"] == "order":
+        if data["status"] in FINAL_ORDER_STATUSES:
+            state["orders"].pop(data["client_order_id"], None)
+        else:
+            state["orders"][data["client_order_id"]] = data
+    elif record["kind"] == "trigger":
+        if data["status"] == "armed":
+            state["triggers"][data["trigger_id"]] = data
+        else:
+            state["triggers"].pop(data["trigger_id"], None)
+    session_id = record.get("session_id")
+    if session_id:
+        segments = state["sessions"].setdefault(session_id, [])
+        if not segments or segments[-1] != segment:
+            segments.append(segment)
+
+
+def write_checkpoint(directory: str) -> Dict:
+    """Fold the sealed segments the last checkpoint doesn't cover into a new one.
+
+    Recovery then reads the checkpoint plus the open segment, so restart cost
+    stays bounded by segment_bytes however long the journal gets.
+    """
+    checkpoint = load_checkpoint(directory)
+    sealed = [path for path in list_segments(directory)[:-1] if _segment_index(path) >= checkpoint["segment"]]
+    if not sealed:
+        return checkpoint
+    for path in sealed:
+        segment = _segment_index(path)
+        for record in _read_segment(path):
+            _fold(checkpoint, record, segment)
+            checkpoint["seq"] = record["seq"]
+    checkpoint["segment"] = _segment_index(sealed[-1]) + 1
+    tmp_path = os.path.join(directory, CHECKPOINT_NAME + ".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(checkpoint, f, separators=(",", ":"))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, os.path.join(directory, CHECKPOINT_NAME))
+    logger.info(f"Journal checkpoint written up to segment {checkpoint['segment'] - 1}, seq {checkpoint['seq']}")
+    return checkpoint
+
+
+def _recover(directory: str) -> Dict:
+    checkpoint = load_checkpoint(directory)
+    for path in list_segments(directory):
+        segment = _segment_index(path)
+        if segment >= checkpoint["segment"]:
+            for record in _read_segment(path):
+                _fold(checkpoint, record, segment)
+    return checkpoint
+
+
+def recover_open_orders(directory: str) -> List[Dict]:
+    """Latest state of every order that was still in flight when the journal ends"""
+    return list(_recover(directory)["orders"].values())
+
+
+def recover_armed_triggers(directory: str) -> List[Dict]:
+    """Latest state of every trigger that was still armed when the journal ends"""
+    return list(_recover(directory)["triggers"].values())
+
+
+class Journal:
+    """Append-only JSONL write-ahead journal with group commit.
+
+    append() only buffers the record; a background task writes everything
+    buffered since the last commit with one write + fsync, so callers never
+    wait on the disk. Segments rotate once they reach segment_bytes, and every
+    sealed segment is folded into the checkpoint in the background.
+    """
+
+    def __init__(self, directory: str, segment_bytes: int = 64 * 1024 * 1024,
+                 commit_interval: float = 0.05, fsync: bool = True):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.commit_interval = commit_interval
+        self.fsync = fsync
+        self.seq = 0
+        self.committed_seq = 0
+        self.commits = 0
+        self._buffer: List[bytes] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._file = None
+        self._segment_index = 0
+        self._checkpoint_task: Optional[asyncio.Task] = None
+
+    def open(self):
+        os.makedirs(self.directory, exist_ok=True)
+        segments = list_segments(self.directory)
+        if segments:
+            # continue numbering from the last durable record, only the newest non-empty segment is scanned
+            for path in reversed(segments):
+                with open(path, "rb") as f:
+                    for line in f:
+                        try:
+                            self.seq = json.loads(line)["seq"]
+                        except ValueError:
+                            continue
+                if self.seq:
+                    break
+            self.committed_seq = self.seq
+            self._segment_index = _segment_index(segments[-1])
+            self._truncate_torn_tail(segments[-1])
+        else:
+            self._segment_index = 1
+        self._file = open(os.path.join(self.directory, _segment_name(self._segment_index)), "ab")
+        logger.info(f"Journal opened at {self.directory}, segment {self._segment_index}, last seq {self.seq}")
+
+    def _truncate_torn_tail(self, path: str):
+        # a crash mid-write leaves a partial last line, the next record appended would be glued onto it
+        with open(path, "r+b") as f:
+            end = f.seek(0, os.SEEK_END)
+            position = end
+            while position > 0:
+                step = min(65536, position)
+                f.seek(position - step)
+                chunk = f.read(step)
+                newline = chunk.rfind(b"\n")
+                if newline >= 0:
+                    position = position - step + newline + 1
+                    break
+                position -= step
+            if position < end:
+                f.truncate(position)
+                logger.warning(f"Truncated {end - position} bytes of torn journal record in {path}")
+
+    async def start(self):
+        if self._file is None:
+            await asyncio.to_thread(self.open)
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._task = asyncio.create_task(self._commit_loop())
+        # sealed segments left uncovered by a crash get folded now
+        self._checkpoint()
+
+    def _checkpoint(self):
+        if self._checkpoint_task is None or self._checkpoint_task.done():
+            self._checkpoint_task = asyncio.create_task(self._write_checkpoint())
+
+    async def _write_checkpoint(self):
+        try:
+            await asyncio.to_thread(write_checkpoint, self.directory)
+        except Exception as e:
+            logger.error(f"Journal checkpoint failed: {str(e)}")
+
+    async def stop(self):
+        # let the commit loop write out whatever is still buffered before closing
+        if self._task:
+            self._stopping = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        if self._checkpoint_task:
+            await self._checkpoint_task
+            self._checkpoint_task = None
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def append(self, kind: str, data: Dict, session_id: Optional[str] = None) -> int:
+        self.seq += 1
+        record = {"seq": self.seq, "ts": time.time(), "kind": kind, "session_id": session_id, "data": data}
+        self._buffer.append(json.dumps(record, separators=(",", ":")).encode() + b"\n")
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return self.seq
+
+    def _take_buffer(self) -> List[bytes]:
+        buffer, self._buffer = self._buffer, []
+        return buffer
+
+    async def _commit_loop(self):
+        while not (self._stopping and not self._buffer):
+            try:
+                await self._wakeup.wait()
+                # let more records pile up so one fsync covers the whole group
+                if not self._stopping:
+                    await asyncio.sleep(self.commit_interval)
+                self._wakeup.clear()
+                buffer = self._take_buffer()
+                last_seq = self.seq
+                if buffer:
+                    segment = self._segment_index
+                    await asyncio.to_thread(self._commit, buffer)
+                    self.committed_seq = last_seq
+                    self.commits += 1
+                    if self._segment_index != segment:
+                        self._checkpoint()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Journal commit failed: {str(e)}")
+
+    def _commit(self, buffer: List[bytes]):
+        if not buffer or self._file is None:
+            return
+        self._file.write(b"".join(buffer))
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        if self._file.tell() >= self.segment_bytes:
+            self._rotate()
+
+    def _rotate(self):
+        self._file.close()
+        self._segment_index += 1
+        self._file = open(os.path.join(self.directory, _segment_name(self._segment_index)), "ab")
+        logger.info(f"Journal rotated to segment {self._segment_index}")
+
+    def stats(self) -> Dict:
+        return {
+            "seq": self.seq,
+            "committed_seq": self.committed_seq,
+            "buffered": len(self._buffer),
+            "commits": self.commits,
+            "segment": self._segment_index
+        }
@@ -1,19 +1,37 @@
 import asyncio
 import json
 import logging
+import os
 import re
-import uuid
+import time
 from datetime import datetime
 from typing import Dict, List, Optional
 from difflib import SequenceMatcher
 
 import httpx
 import nltk
-from fastapi import FastAPI, HTTPException, Request, WebSocket, WebSocketDisconnect, BackgroundTasks
+from fastapi import FastAPI, HTTPException, Request, WebSocket, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel
 from dotenv import load_dotenv
 
+from admission import PRIORITY_NEW_CALL, PRIORITY_TURN, AdmissionController
+from bars import BAR_RESOLUTIONS, BarAggregator
+from exchange_adapters import ExchangeAdapter
+from exchanges import ADAPTERS, EXCHANGES, INSTRUMENTS
+from journal import Journal, read_records, recover_armed_triggers, recover_open_orders
+from order_engine import OrderManager
+from price_source import SOURCE_CACHED, SOURCE_LIVE, SOURCE_SIMULATED, SOURCE_UNAVAILABLE, MockPriceEngine, PriceQuote
+from session_snapshot import SessionSnapshotter
+from shared_market import SharedMarketData, SharedTickerCache
+from sharding import SHARD_COUNT, SHARD_INDEX, is_local, local_id, new_session_id
+from tick_store import TickRecorder, TickStore, merge_ticks
+from tracing import annotate, record_error, traced, tracer
+from triggers import Trigger, TriggerEngine, TriggerPoller
+from ticker_cache import NO_QUOTE, TickerCache, compact_symbol
+from ws_gateway import WebSocketGateway
+
 
 load_dotenv()    # loading  envirionment variables 
 
@@ -43,40 +61,57 @@ app.add_middleware(
 )
 
 # Global state, to keep track of active sessions and Websocket connections
+# active_connections is a gateway: every socket gets its own send queue, so webhooks never wait on a browser
 active_sessions: Dict[str, Dict] = {}
-active_connections: Dict[str, WebSocket] = {}
-
-# Exchange configurations
-EXCHANGES = {
-    "okx": {
-        "name": "OKX",
-        "base_url": "https://www.okx.com",
-        "symbols": ["BTC-USDT", "ETH-USDT", "XRP-USDT", "LTC-USDT", "ADA-USDT", "DOT-USDT", "LINK-USDT", "BCH-USDT", "EOS-USDT", "TRX-USDT"],
-        "price_endpoint": "/api/v5/market/ticker",
-        "symbols_endpoint": "/api/v5/public/instruments"
-    },
-    "bybit": {
-        "name": "Bybit",
-        "base_url": "https://api.bybit.com",
-        "symbols": ["BTC-USDT", "ETH-USDT", "XRP-USDT", "ETH-BTC", "XRP-BTC", "DOT-USDT", "XLM-USDT", "LTC-USDT", "DOGE-USDT", "CHZ-USDT"],
-        "price_endpoint": "/v5/market/tickers",
-        "symbols_endpoint": "/v5/market/instruments-info"
-    },
-    "deribit": {
-        "name": "Deribit",
-        "base_url": "https://www.deribit.com",
-        "symbols": ["BTC-PERPETUAL", "ETH-PERPETUAL", "BTC-30JUN23", "ETH-30JUN23", "BTC-29SEP23", "ETH-29SEP23"],
-        "price_endpoint": "/api/v2/public/ticker",
-        "symbols_endpoint": "/api/v2/public/get_instruments"
-    },
-    "binance": {
-        "name": "Binance",
-        "base_url": "https://api.binance.com",
-        "symbols": ["ETH-BTC", "LTC-BTC", "BNB-BTC", "NEO-BTC", "QTUM-ETH", "EOS-ETH", "SNT-ETH", "BNT-ETH", "BCC-BTC", "GAS-BTC"],
-        "price_endpoint": "/api/v3/ticker/price",
-        "symbols_endpoint": "/api/v3/exchangeInfo"
-    }
-}
+active_connections = WebSocketGateway()
+
+# write-ahead journal of every turn, order and trigger event, replayed on startup to rebuild in-flight orders and armed triggers
+JOURNAL_DIR = os.getenv("JOURNAL_DIR", "journal")
+journal = Journal(JOURNAL_DIR)
+
+# set when running as a shard worker (shard_router.py): bulk tickers come from the feeder through shared memory
+MARKET_SHM_NAME = os.getenv("MARKET_SHM_NAME")
+
+# every live price we fetch is kept as a tick in per-symbol columnar files
+# (in shard mode the feeder records the snapshots, each worker its own per-symbol fetches in a directory of its own)
+TICK_DIR = os.getenv("TICK_DIR", "ticks")
+tick_store = TickStore(TICK_DIR)
+if MARKET_SHM_NAME:
+    tick_recorder = TickRecorder(TickStore(f"{TICK_DIR}.shard-{SHARD_INDEX}"))
+    tick_sources = [tick_store] + [TickStore(f"{TICK_DIR}.shard-{index}") for index in range(SHARD_COUNT)]
+else:
+    tick_recorder = TickRecorder(tick_store)
+    tick_sources = [tick_store]
+
+# 1s/1m/5m OHLCV bars and 24h indicators for the symbols callers ask about, backfilled from the recorded ticks
+bar_aggregator = BarAggregator(history=lambda exchange, symbol, start_ns: merge_ticks(
+    [store.query(exchange, symbol, start_ns) for store in tick_sources]))
+
+# price alerts and conditional orders, evaluated on every live price and ticker snapshot
+trigger_engine = TriggerEngine(symbol_key=compact_symbol)
+# armed symbols missing from the bulk snapshots (Deribit futures, BCC-BTC) are fetched one by one,
+# the live price reaches the triggers through on_price_update
+trigger_poller = TriggerPoller(trigger_engine, lambda exchange, symbol: fetch_price_quote(symbol, exchange, max_retries=1))
+
+# adaptive concurrency limit for webhook turns and new calls, overload gets a quick "please hold" instead of a pile-up
+admission = AdmissionController(target_latency=float(os.getenv("ADMISSION_TARGET_LATENCY", "2.0")))
+DEGRADED_REPLY = "Prices are delayed right now, please hold on a moment and say that again."
+
+# whole-exchange ticker snapshots, price lookups read from here before hitting per-symbol endpoints
+if MARKET_SHM_NAME:
+    ticker_cache = SharedTickerCache(ADAPTERS, SharedMarketData.attach(MARKET_SHM_NAME, list(EXCHANGES)))
+else:
+    ticker_cache = TickerCache(ADAPTERS)
+
+# deterministic fallback prices for when no exchange answers, always labelled as simulated
+mock_prices = MockPriceEngine(seed=int(os.getenv("MOCK_PRICE_SEED", "0")))
+price_source_counts: Dict[str, int] = {SOURCE_LIVE: 0, SOURCE_CACHED: 0, SOURCE_SIMULATED: 0, SOURCE_UNAVAILABLE: 0}
+
+# most legs one basket (spoken or POST /baskets) may carry
+MAX_BASKET_LEGS = int(os.getenv("MAX_BASKET_LEGS", "50"))
+
+# exchange instrument listings are fetched and indexed once per CATALOG_TTL, not once per call
+CATALOG_TTL = float(os.getenv("CATALOG_TTL_SECONDS", "3600"))
 
 #call setup
 #Basemodel is  library, its main job to validate the data, and convert it to objects
@@ -84,6 +119,30 @@ EXCHANGES = {
 class CallRequest(BaseModel):
     user_name: str
 
+class TriggerRequest(BaseModel):
+    exchange: str
+    symbol: str
+    direction: str
+    threshold: float
+    action: str = "alert"
+    side: Optional[str] = None
+    quantity: Optional[float] = None
+    limit_price: Optional[float] = None
+    session_id: Optional[str] = None
+
+class BasketLeg(BaseModel):
+    symbol: str
+    side: str
+    quantity: float
+    price: float
+    client_order_id: Optional[str] = None
+
+class BasketRequest(BaseModel):
+    exchange: str
+    legs: List[BasketLeg]
+    session_id: Optional[str] = None
+    dry_run: bool = False
+
 class VoiceInput(BaseModel):
     from_: str
     to: str
@@ -91,19 +150,36 @@ class VoiceInput(BaseModel):
     direction: str 
 
 class SessionState:
-    def __init__(self):
+    def __init__(self, session_id: Optional[str] = None):
+        self.session_id = session_id
         self.state = "await_exchange"
         self.exchange = None
         self.symbol = None
+        self.side = "buy"
         self.quantity = None
         self.price = None
         self.symbols = []
         self.current_price = 0.0
+        self.price_source = None
+        self.last_order_id = None
+        self.basket = []   # legs of a multi-order utterance waiting for the exchange or a confirmation
+
+# SessionState fields carried across restarts by the session snapshot
+SESSION_SNAPSHOT_FIELDS = ("state", "exchange", "symbol", "side", "quantity", "price", "symbols", "current_price", "price_source", "last_order_id", "basket")
+
+# live sessions are snapshotted periodically and on shutdown (SIGTERM), and restored on startup
+session_snapshotter = SessionSnapshotter(
+    os.getenv("SESSION_SNAPSHOT_PATH", "sessions.snapshot"),
+    active_sessions,
+    SessionState,
+    SESSION_SNAPSHOT_FIELDS,
+    interval=float(os.getenv("SESSION_SNAPSHOT_INTERVAL", "30"))
+)
 
 def get_session_state(session_id: str) -> SessionState:
     if session_id not in active_sessions:
         # Create a new session if it doesn't exist
-        session_state = SessionState()
+        session_state = SessionState(session_id)
         active_sessions[session_id] = {
             "state": session_state,
             "user_name": "Trader",
@@ -116,255 +192,193 @@ def get_session_state(session_id: str) -> SessionState:
 
 #setting symbols, exchanges, quantity, fetching price, etc.
 #retry logic used
-async def fetch_price_with_retry(symbol: str, exchange: str, max_retries: int = 3) -> float:
+@traced("price_quote")
+async def fetch_price_quote(symbol: str, exchange: str, max_retries: int = 3) -> PriceQuote:
+    """Price plus where it came from (live / cached / simulated) and how old it is"""
+    quote = await _fetch_price_quote(symbol, exchange, max_retries)
+    price_source_counts[quote.source] = price_source_counts.get(quote.source, 0) + 1
+    annotate(symbol=symbol, exchange=exchange, source=quote.source, price=quote.price)
+    return quote
+
+async def _fetch_price_quote(symbol: str, exchange: str, max_retries: int) -> PriceQuote:
 
-    exchange_config = EXCHANGES.get(exchange.lower())
-    if not exchange_config:
+    adapter = ADAPTERS.get(exchange.lower())
+    if not adapter:
         logger.error(f"Unsupported exchange: {exchange}")
-        return 0.0
+        return PriceQuote(exchange, symbol, 0.0, SOURCE_UNAVAILABLE, None)
+
+    # bulk snapshot first, a dict read while it is fresh (snapshot prices were already recorded by on_ticker_snapshot)
+    try:
+        with tracer.span("ticker_cache", exchange=exchange) as span:
+            price = await ticker_cache.get_price(exchange, symbol)
+            if span is not None:
+                span.set(hit=bool(price))
+        if price:
+            return PriceQuote(exchange, symbol, price, SOURCE_CACHED, ticker_cache.age(exchange))
+    except Exception as e:
+        logger.error(f"Ticker cache lookup failed for {symbol}: {str(e)}")
 
     for attempt in range(max_retries):
         try:
-            logger.info(f"Fetching price for {symbol} from {exchange_config['name']} (attempt {attempt + 1})")
+            logger.info(f"Fetching price for {symbol} from {adapter.name} (attempt {attempt + 1})")
             
             # Try different price fetching strategies
-            price = await fetch_price_strategy_1(symbol, exchange_config)
+            price = await fetch_price_strategy_1(symbol, adapter)
             if price > 0:
-                return price
+                on_price_update(exchange, symbol, price)
+                return PriceQuote(exchange, symbol, price, SOURCE_LIVE)
                 
-            price = await fetch_price_strategy_2(symbol, exchange_config)
+            price = await fetch_price_strategy_2(symbol, adapter)
             if price > 0:
-                return price
+                on_price_update(exchange, symbol, price)
+                return PriceQuote(exchange, symbol, price, SOURCE_LIVE)
                 
-            mock_price = generate_mock_price(symbol)
-            logger.warning(f"Using mock price for {symbol}: ${mock_price}")
-            return mock_price
+            return simulated_price_quote(symbol, exchange)
             
         except Exception as e:
             logger.error(f"Error fetching price (attempt {attempt + 1}): {str(e)}")
             if attempt == max_retries - 1:
                 logger.error(f"Failed to fetch price after {max_retries} attempts")
-                return generate_mock_price(symbol)
-            await asyncio.sleep(1)  # Wait before retry
+                return simulated_price_quote(symbol, exchange)
+            with tracer.span("retry_backoff", attempt=attempt + 1):
+                await asyncio.sleep(1)  # Wait before retry
     
-    return generate_mock_price(symbol)
+    return simulated_price_quote(symbol, exchange)
 
+def simulated_price_quote(symbol: str, exchange: str) -> PriceQuote:
+    mock_price = mock_prices.price(symbol)
+    logger.warning(f"Using simulated price for {symbol}: ${mock_price}")
+    on_price_update(exchange, symbol, mock_price, live=False)
+    return PriceQuote(exchange, symbol, mock_price, SOURCE_SIMULATED)
 
-async def fetch_price_strategy_1(symbol: str, exchange_config: Dict) -> float:
+async def fetch_price_with_retry(symbol: str, exchange: str, max_retries: int = 3) -> float:
+    return (await fetch_price_quote(symbol, exchange, max_retries)).price
+
+def price_note(source: Optional[str]) -> str:
+    # never let a made-up price be heard as a real one
+    if source == SOURCE_SIMULATED:
+        return " (simulated, I can't reach the exchange right now)"
+    return ""
+
+def on_price_update(exchange: str, symbol: str, price: float, live: bool = True):
+    # single fan-out point for every price we obtain, mock prices only mark paper orders (and the fills say so)
+    order_manager.on_price(exchange, symbol, price, SOURCE_LIVE if live else SOURCE_SIMULATED)
+    if live:
+        # history is keyed by the compact symbol so BTC-USDT and BTCUSDT land in the same series
+        tick_recorder.record(exchange, compact_symbol(symbol), price)
+        bar_aggregator.update(exchange, compact_symbol(symbol), price)
+        trigger_engine.on_price(exchange, symbol, price)
+
+def on_ticker_snapshot(exchange: str, prices: Dict[str, float]):
+    # a bulk refresh is one tick for every symbol on the exchange
+    bar_aggregator.update_many([(exchange, symbol, price, 1.0) for symbol, price in prices.items()])
+    if not MARKET_SHM_NAME:
+        # shard workers see the feeder's snapshots, which it records itself
+        quotes = ticker_cache.quotes.get(exchange, {})
+        for symbol, price in prices.items():
+            tick_recorder.record(exchange, symbol, price, *quotes.get(symbol, NO_QUOTE))
+    trigger_engine.on_snapshot(exchange, prices)
+    # only books that already exist, a snapshot shouldn't create thousands of empty ones
+    for book_exchange, book_symbol in list(order_manager.engine.books):
+        if book_exchange == exchange and compact_symbol(book_symbol) in prices:
+            order_manager.on_price(exchange, book_symbol, prices[compact_symbol(book_symbol)], SOURCE_CACHED)
+
+@traced("price_strategy_1")
+async def fetch_price_strategy_1(symbol: str, adapter: ExchangeAdapter) -> float:
 
     try:
         async with httpx.AsyncClient(timeout=10.0) as client:
-            if exchange_config["name"] == "Bybit":
-                url = f"{exchange_config['base_url']}{exchange_config['price_endpoint']}?category=spot&symbol={symbol}"
-            elif exchange_config["name"] == "Binance":
-                url = f"{exchange_config['base_url']}{exchange_config['price_endpoint']}?symbol={symbol}"
-            elif exchange_config["name"] == "OKX":
-                url = f"{exchange_config['base_url']}{exchange_config['price_endpoint']}?instId={symbol}"
-            else:
-                url = f"{exchange_config['base_url']}{exchange_config['price_endpoint']}?symbol={symbol}"
+            native = adapter.to_native(symbol)
+            url = adapter.price_url(native)
 
             logger.info(f"Making request to: {url}")
+            annotate(url=url)
             response = await client.get(url)
+            annotate(status=response.status_code)
             response.raise_for_status()
             data = response.json()
             
-            logger.info(f"Response from {exchange_config['name']}: {data}")
+            logger.info(f"Response from {adapter.name}: {data}")
 
-            price = extract_price_from_response(data, exchange_config["name"], symbol)
+            price = adapter.parse_price(data, native)
             if price > 0:
                 logger.info(f"Extracted price for {symbol}: {price}")
                 return price
                 
     except Exception as e:
         logger.error(f"Strategy 1 failed for {symbol}: {str(e)}")
+        record_error(f"{type(e).__name__}: {str(e)}")
     
     return 0.0
 
-async def fetch_price_strategy_2(symbol: str, exchange_config: Dict) -> float:
+@traced("price_strategy_2")
+async def fetch_price_strategy_2(symbol: str, adapter: ExchangeAdapter) -> float:
 
     try:
         async with httpx.AsyncClient(timeout=10.0) as client:
             # Try alternative endpoints or different symbol formats
             alt_symbol = symbol.replace("-", "").replace("_", "")
-            url = f"{exchange_config['base_url']}/api/v1/ticker?symbol={alt_symbol}"
+            url = f"{adapter.base_url}/api/v1/ticker?symbol={alt_symbol}"
             
             logger.info(f"Strategy 2 - Making request to: {url}")
+            annotate(url=url)
             response = await client.get(url)
+            annotate(status=response.status_code)
             response.raise_for_status()
             data = response.json()
             
-            price = extract_price_from_response(data, exchange_config["name"], alt_symbol)
+            price = adapter.parse_price(data, alt_symbol)
             if price > 0:
                 logger.info(f"Strategy 2 extracted price for {symbol}: {price}")
                 return price
                 
     except Exception as e:
         logger.error(f"Strategy 2 failed for {symbol}: {str(e)}")
+        record_error(f"{type(e).__name__}: {str(e)}")
     
     return 0.0
 
-def extract_price_from_response(data: Dict, exchange_name: str, symbol: str) -> float:
-
-    try:
-        if exchange_name == "Bybit":
-            if "result" in data and "list" in data["result"]:
-                for item in data["result"]["list"]:
-                    if item.get("symbol") == symbol:
-                        return float(item.get("lastPrice", 0))
-        elif exchange_name == "Binance":
-            if "price" in data:
-                return float(data["price"])
-        elif exchange_name == "OKX":
-            if "data" in data and len(data["data"]) > 0:
-                return float(data["data"][0].get("last", 0))
-        else:
-            # Generic extraction
-            if "price" in data:
-                return float(data["price"])
-            elif "last" in data:
-                return float(data["last"])
-            elif "close" in data:
-                return float(data["close"])
-                
-    except (ValueError, KeyError, TypeError) as e:
-        logger.error(f"Error extracting price from {exchange_name} response: {str(e)}")
-    
-    return 0.0
-
-def generate_mock_price(symbol: str) -> float:
-    """Generate a realistic mock price for demonstration"""
-    import random
-    base_prices = {
-        "BTC": 45000 + random.uniform(-2000, 2000),
-        "ETH": 3000 + random.uniform(-200, 200),
-        "XRP": 2 + random.uniform(-0.5, 0.5),
-        "LTC": 150 + random.uniform(-20, 20),
-        "ADA": 1.5 + random.uniform(-0.3, 0.3),
-        "DOT": 25 + random.uniform(-5, 5),
-        "LINK": 18 + random.uniform(-3, 3),
-        "BCH": 400 + random.uniform(-50, 50),
-        "EOS": 3 + random.uniform(-0.5, 0.5),
-        "TRX": 0.1 + random.uniform(-0.02, 0.02),
-        "NEO": 35 + random.uniform(-5, 5),
-        "QTUM": 8 + random.uniform(-1, 1),
-        "SNT": 0.05 + random.uniform(-0.01, 0.01),
-        "BNT": 2 + random.uniform(-0.3, 0.3),
-        "GAS": 12 + random.uniform(-2, 2)
-    }
-    
-    for coin, base_price in base_prices.items():
-        if coin in symbol.upper():
-            return round(base_price, 4)
-    
-    return round(random.uniform(1, 100), 4)
-
+@traced("fetch_symbols")
 async def get_exchange_symbols(exchange: str) -> List[str]:
-    exchange_config = EXCHANGES.get(exchange.lower())
-    if not exchange_config:
+    adapter = ADAPTERS.get(exchange.lower())
+    if not adapter:
         logger.error(f"Unsupported exchange: {exchange}")
         return []
     
+    age = INSTRUMENTS.age(adapter.exchange_id)
+    if age is not None and age < CATALOG_TTL:
+        annotate(catalog="cached")
+        return INSTRUMENTS.symbols(adapter.exchange_id, 10)
+    
     # Return default symbols immediately to avoid async issues
     default_symbols = ["BTC-USDT", "ETH-USDT", "XRP-USDT", "LTC-USDT", "ADA-USDT", "DOT-USDT", "LINK-USDT", "BCH-USDT", "EOS-USDT", "TRX-USDT"]
     
     try:
         async with httpx.AsyncClient(timeout=5.0) as client:
-            url = f"{exchange_config['base_url']}{exchange_config['symbols_endpoint']}"
+            url = adapter.symbols_url
             logger.info(f"Fetching symbols from: {url}")
+            annotate(url=url)
             
             response = await client.get(url)
+            annotate(status=response.status_code)
             response.raise_for_status()
             data = response.json()
             
-            # Extract symbols based on exchange
-            symbols = extract_symbols_from_response(data, exchange_config["name"])
-            if symbols:
-                return symbols[:10]  # Return top 10 symbols
+            # the whole listing goes into the registry, callers get canonical BASE-QUOTE names
+            instruments = adapter.parse_instruments(data)
+            if instruments:
+                INSTRUMENTS.load(adapter.exchange_id, instruments)
+                return INSTRUMENTS.symbols(adapter.exchange_id, 10)  # Return top 10 symbols
             else:
                 return default_symbols
                 
     except Exception as e:
         logger.error(f"Error fetching symbols for {exchange}: {str(e)}")
+        record_error(f"{type(e).__name__}: {str(e)}")
         return default_symbols
 
-def extract_symbols_from_response(data: Dict, exchange_name: str) -> List[str]:
-    """Extract symbols from exchange response"""
-    try:
-        symbols = []
-        if exchange_name == "Bybit":
-            if "result" in data and "list" in data["result"]:
-                symbols = [item["symbol"] for item in data["result"]["list"][:10]]
-        elif exchange_name == "Binance":
-            if "symbols" in data:
-                symbols = [item["symbol"] for item in data["symbols"][:10]]
-        elif exchange_name == "OKX":
-            if "data" in data:
-                symbols = [item["instId"] for item in data["data"][:10]]
-        return symbols
-    except Exception as e:
-        logger.error(f" Error extracting symbols from {exchange_name}: {str(e)}")
-        return []
-
-def normalize_symbol(symbol: str, exchange: str) -> str:
-   
-    symbol = symbol.upper().strip()
-    # Remove common words
-    symbol = re.sub(r'\b(USDT|USD|BTC|ETH)\b', '', symbol).strip()
-    # Add back the base currency based on exchange
-    exchange_config = EXCHANGES.get(exchange.lower())
-    if exchange_config:
-        if exchange_config["name"] == "Binance":
-            return f"{symbol}BTC"
-        elif exchange_config["name"] == "Bybit":
-            return f"{symbol}USDT"
-        elif exchange_config["name"] == "OKX":
-            return f"{symbol}-USDT"
-    return symbol
-
-def extract_quantity_and_price(text: str) -> tuple:
-    
-    try:
-        quantity_patterns = [
-            r'(\d+(?:\.\d+)?)\s*(?:of|units?|coins?|tokens?|shares?)',
-            r'trade\s*(\d+(?:\.\d+)?)',
-            r'buy\s*(\d+(?:\.\d+)?)',
-            r'sell\s*(\d+(?:\.\d+)?)',
-            r'(\d+(?:\.\d+)?)\s*(?:at|for|price)',
-        ]
-        
-        price_patterns = [
-            r'at\s*\$?(\d+(?:\.\d+)?)',
-            r'price\s*\$?(\d+(?:\.\d+)?)',
-            r'for\s*\$?(\d+(?:\.\d+)?)',
-            r'Rs\s*(\d+(?:\.\d+)?)',
-            r'(\d+(?:\.\d+)?)\s*dollars?',
-        ]
-        
-        quantity = None
-        price = None
-        
-        # Extract quantity
-        for pattern in quantity_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                quantity = float(match.group(1))
-                break
-        
-        # Extract price
-        for pattern in price_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                price = float(match.group(1))
-                break
-        
-        logger.info(f"🔍 Extracted from '{text}': quantity={quantity}, price={price}")
-        return quantity, price
-        
-    except Exception as e:
-        logger.error(f"Error extracting quantity and price: {str(e)}")
-        return None, None
- 
 # voice processing system 
+@traced("process_voice_input")
 async def process_voice_input(text: str, session_state: SessionState) -> str:
 
     try:
@@ -372,6 +386,21 @@ async def process_voice_input(text: str, session_state: SessionState) -> str:
         text = text.strip().lower()
         logger.info(f"Processing voice input: '{text}' in state: {session_state.state}")
         
+        # market questions and alerts can come at any point in the call and don't move the state
+        # (checked before corrections, "24 hour change" or "notify me" would otherwise read as one;
+        # stats first, so "tell me bitcoin's 24 hour change" is a question and not an alert at 24)
+        if smart_processor.is_market_stats_request(text):
+            return await handle_market_stats(text, session_state)
+        
+        if smart_processor.is_trigger_request(text):
+            return await handle_trigger_request(text, session_state)
+        
+        # several orders in one utterance get one confirmation for the whole basket instead of turns per order
+        if session_state.state not in ("confirm_order", "confirm_basket"):
+            legs = smart_processor.extract_legs(text)
+            if len(legs) >= 2:
+                return await handle_basket_request(text, legs, session_state)
+        
         if smart_processor.is_correction(text):
             return await handle_correction(text, session_state)
         
@@ -398,11 +427,7 @@ async def process_voice_input(text: str, session_state: SessionState) -> str:
                 crypto = smart_processor.extract_filter_crypto(text)
                 if crypto:
 
-                    filtered_symbols = []
-                    for symbol in session_state.symbols:
-                        symbol_lower = symbol.lower()
-                        if crypto in symbol_lower or any(var in symbol_lower for var in smart_processor.crypto_variations.get(crypto, [])):
-                            filtered_symbols.append(symbol)
+                    filtered_symbols = [instrument.canonical for instrument in INSTRUMENTS.with_asset(session_state.exchange, crypto)[:10]]
                     
                     if filtered_symbols:
                         session_state.symbols = filtered_symbols
@@ -427,9 +452,10 @@ async def process_voice_input(text: str, session_state: SessionState) -> str:
                     
                     # Fetching current price for the selected symbol
                     try:
-                        current_price = await fetch_price_with_retry(symbol, session_state.exchange)
-                        session_state.current_price = current_price
-                        return f"Perfect! I've selected {symbol}. Current price: ${current_price:,.2f} USDT. Now please specify both the quantity and price you'd like to trade at (e.g., '0.1 BTC at 50000' or '100 USDT at 50000')."
+                        quote = await fetch_price_quote(symbol, session_state.exchange)
+                        session_state.current_price = quote.price
+                        session_state.price_source = quote.source
+                        return f"Perfect! I've selected {symbol}. Current price: ${quote.price:,.2f} USDT{price_note(quote.source)}. Now please specify both the quantity and price you'd like to trade at (e.g., '0.1 BTC at 50000' or '100 USDT at 50000')."
                     except Exception as e:
                         logger.error(f"Error fetching price for {symbol}: {str(e)}")
                         return f"Perfect! I've selected {symbol}. Now please specify both the quantity and price you'd like to trade at (e.g., '0.1 BTC at 50000' or '100 USDT at 50000')."
@@ -439,6 +465,9 @@ async def process_voice_input(text: str, session_state: SessionState) -> str:
         elif session_state.state == "await_quantity_and_price":
             # Extracting quantity and price
             quantity, price = smart_processor.extract_quantity_and_price(text)
+            side = smart_processor.extract_side(text)
+            if side:
+                session_state.side = side
             
             # Checking if we already have quantity or price from previous input
             current_quantity = session_state.quantity
@@ -458,7 +487,7 @@ async def process_voice_input(text: str, session_state: SessionState) -> str:
                 symbol = session_state.symbol
                 exchange = session_state.exchange
                 
-                return f"Perfect! I'm about to place a {exchange.capitalize()} order for {current_quantity} {symbol} at ${current_price:,.2f} USDT. Please confirm by saying 'yes' or 'confirm'."
+                return f"Perfect! I'm about to place a {exchange.capitalize()} {session_state.side} order for {current_quantity} {symbol} at ${current_price:,.2f} USDT. Please confirm by saying 'yes' or 'confirm'."
             
             # ask for price input if only quantity input there
             elif current_quantity is not None:
@@ -480,22 +509,62 @@ async def process_voice_input(text: str, session_state: SessionState) -> str:
                 price = session_state.price
                 exchange = session_state.exchange
                 
-                logger.info(f"Placing order: {quantity} {symbol} at ${price} on {exchange}")
+                logger.info(f"Placing order: {session_state.side} {quantity} {symbol} at ${price} on {exchange}")
+                
+                # only queued here, fills are pushed to the session's websocket as order_update messages
+                order = order_manager.submit(exchange, symbol, session_state.side, quantity, price, session_id=session_state.session_id)
+                session_state.last_order_id = order.client_order_id
+                if order.status == "rejected":
+                    session_state.state = "await_continue"
+                    return f"Sorry, the order was rejected: {order.reason}. Would you like to place another order? Say 'yes' to continue or 'no' to end the call."
                 
                 session_state.state = "await_continue"
-                return f"Order placed successfully! {quantity} {symbol} at ${price:,.2f} USDT on {exchange.capitalize()}. Would you like to place another order? Say 'yes' to continue or 'no' to end the call."
+                # paper orders fill against the last mark, which is a mock price while the exchange is unreachable
+                fill_note = ""
+                if order_manager.engine.book(order.exchange, order.symbol).last_source == SOURCE_SIMULATED:
+                    fill_note = " Note that the exchange is unreachable, so it would fill against simulated prices for now."
+                return f"Order placed successfully! {session_state.side.capitalize()} {quantity} {symbol} at ${price:,.2f} USDT on {exchange.capitalize()}. Your order ID is {order.client_order_id[:8]}, I'll update you when it fills.{fill_note} Would you like to place another order? Say 'yes' to continue or 'no' to end the call."
             elif any(word in text for word in ["no", "cancel", "stop", "end"]):
                 session_state.state = "end_call"
                 return "Order cancelled. Thank you for using the our Trading Bot!"
             else:
                 return "Please confirm the order by saying 'yes' or 'confirm', or cancel by saying 'no'."
         
+        elif session_state.state == "await_basket_exchange":
+            exchange = smart_processor.extract_exchange(text)
+            if exchange:
+                return await quote_basket(exchange, session_state)
+            return f"Which exchange should I place these {len(session_state.basket)} orders on? Available exchanges: OKX, Bybit, Deribit, Binance"
+        
+        elif session_state.state == "confirm_basket":
+            if any(word in text for word in ["yes", "confirm", "okay", "sure", "go ahead"]):
+                exchange = session_state.exchange
+                logger.info(f"Placing basket of {len(session_state.basket)} orders on {exchange}")
+                orders = submit_basket(exchange, session_state.basket, session_state.session_id)
+                session_state.basket = []
+                session_state.last_order_id = orders[-1].client_order_id
+                session_state.state = "await_continue"
+                
+                placed = [f"{o.side} {o.quantity} {o.symbol} at ${o.price:,.2f} (ID {o.client_order_id[:8]})" for o in orders if o.status != "rejected"]
+                rejected = [f"{o.side} {o.quantity} {o.symbol} ({o.reason})" for o in orders if o.status == "rejected"]
+                reply = f"Placed {len(placed)} orders on {exchange.capitalize()}: {'; '.join(placed)}." if placed else "No orders were placed."
+                if rejected:
+                    reply += f" Rejected: {'; '.join(rejected)}."
+                return f"{reply} I'll update you as they fill. Would you like to place another order? Say 'yes' to continue or 'no' to end the call."
+            elif any(word in text for word in ["no", "cancel", "stop", "end"]):
+                session_state.basket = []
+                session_state.state = "end_call"
+                return "Orders cancelled. Thank you for using the our Trading Bot!"
+            else:
+                return "Please confirm the orders by saying 'yes' or 'confirm', or cancel by saying 'no'."
+        
         elif session_state.state == "await_continue":
             if any(word in text for word in ["yes", "continue", "another", "more"]):
                 # Reset session state to start over
                 session_state.state = "await_exchange"
                 session_state.exchange = None
                 session_state.symbol = None
+                session_state.side = "buy"
                 session_state.quantity = None
                 session_state.price = None
                 session_state.symbols = []
@@ -514,6 +583,181 @@ async def process_voice_input(text: str, session_state: SessionState) -> str:
         logger.error(f"Error processing voice input: {str(e)}")
         return "I encountered an error processing your request. Please try again."
 
+def resolve_symbol(crypto: Optional[str], exchange: str, session_state: SessionState) -> Optional[str]:
+    # prefer the symbol the caller is already trading (if the coin is its base), then the coin's USDT pair,
+    # then any pair with it as base
+    if session_state.symbol and (not crypto or INSTRUMENTS.has_base(exchange, session_state.symbol, crypto)):
+        return session_state.symbol
+    if crypto:
+        base = INSTRUMENTS.resolve(crypto)
+        instrument = INSTRUMENTS.get(exchange, f"{base}-USDT")
+        if instrument is None:
+            instrument = next(iter(INSTRUMENTS.with_base(exchange, base)), None)
+        return instrument.canonical if instrument else f"{base}-USDT"
+    return None
+
+@traced()
+async def handle_trigger_request(text: str, session_state: SessionState) -> str:
+
+    try:
+        parsed = smart_processor.extract_trigger(text)
+        if not parsed or parsed["threshold"] is None:
+            return "Please tell me the coin and the price, for example 'alert me when ETH goes above 3500' or 'buy 0.1 BTC if it drops to 40000'."
+        
+        exchange = parsed["exchange"] or session_state.exchange or "bybit"
+        symbol = resolve_symbol(parsed["crypto"], exchange, session_state)
+        if symbol is None:
+            return "Which coin should I watch? For example, 'alert me when ETH goes above 3500'."
+        if parsed["action"] == "order" and not parsed["quantity"]:
+            return f"How much would you like to {parsed['side']}? For example, '{parsed['side']} 0.1 BTC if it drops to 40000'."
+        
+        threshold = parsed["threshold"]
+        quote = await fetch_price_quote(symbol, exchange)
+        current_price = quote.price
+        # "when it hits 3500" has no direction, it's whichever side of the current price the level is on
+        direction = parsed["direction"] or ("above" if threshold > current_price else "below")
+        
+        trigger = trigger_engine.arm(Trigger(
+            exchange, symbol, direction, threshold,
+            action=parsed["action"],
+            side=parsed["side"],
+            quantity=parsed["quantity"],
+            limit_price=threshold if parsed["action"] == "order" else None,
+            session_id=session_state.session_id,
+            trigger_id=local_id()
+        ))
+        journal.append("trigger", trigger.to_dict(), session_id=session_state.session_id)
+        
+        move = "rises above" if direction == "above" else "drops below"
+        if trigger.action == "order":
+            return f"Done! I'll {trigger.side} {trigger.quantity} {symbol} on {exchange.capitalize()} if the price {move} ${threshold:,.2f}. It's ${current_price:,.2f} right now{price_note(quote.source)}."
+        return f"Done! I'll alert you when {symbol} on {exchange.capitalize()} {move} ${threshold:,.2f}. It's ${current_price:,.2f} right now{price_note(quote.source)}."
+    
+    except Exception as e:
+        logger.error(f"Error handling trigger request: {str(e)}")
+        return "I couldn't set that up. Please try again."
+
+def on_trigger_fired(trigger: Trigger):
+    price = trigger.fired_price
+    if trigger.action == "order":
+        order = order_manager.submit(trigger.exchange, trigger.symbol, trigger.side, trigger.quantity, trigger.limit_price,
+                                     session_id=trigger.session_id, client_order_id=f"trigger-{trigger.trigger_id}")
+        trigger.client_order_id = order.client_order_id
+        text = f"{trigger.symbol} reached ${price:,.2f}, I've placed your order to {trigger.side} {trigger.quantity} {trigger.symbol} at ${trigger.limit_price:,.2f} on {trigger.exchange.capitalize()}."
+    else:
+        move = "above" if trigger.direction == "above" else "below"
+        text = f"Price alert: {trigger.symbol} on {trigger.exchange.capitalize()} is now {move} ${trigger.threshold:,.2f} at ${price:,.2f}."
+    logger.info(f"Trigger {trigger.trigger_id} fired at {price}: {text}")
+    journal.append("trigger", trigger.to_dict(), session_id=trigger.session_id)
+    
+    if trigger.session_id:
+        timestamp = datetime.now().isoformat()
+        active_connections.publish(trigger.session_id, {"type": "price_alert", "trigger": trigger.to_dict(), "text": text, "timestamp": timestamp})
+        active_connections.publish(trigger.session_id, {"type": "transcript_update", "speaker": "bot", "text": text, "timestamp": timestamp})
+
+@traced()
+async def handle_market_stats(text: str, session_state: SessionState) -> str:
+
+    try:
+        stats = smart_processor.extract_market_stats(text)
+        crypto = smart_processor.extract_crypto(text)
+        exchange = session_state.exchange or "bybit"
+        symbol = resolve_symbol(crypto, exchange, session_state)
+        if symbol is None:
+            return "Which coin would you like market stats for? For example, 'what's bitcoin's 24 hour change'."
+        
+        # a fresh price also feeds the bar aggregator
+        quote = await fetch_price_quote(symbol, exchange)
+        indicators = bar_aggregator.indicators_for(exchange, compact_symbol(symbol))
+        name = crypto.capitalize() if crypto else symbol
+        
+        parts = [f"{name} ({symbol} on {exchange.capitalize()}) is at ${quote.price:,.2f}{price_note(quote.source)}"]
+        if indicators:
+            tracked_for = (datetime.now().timestamp() - indicators["since"]) / 3600
+            window = "24 hour" if tracked_for >= 23.5 else f"{max(tracked_for, 0.1):.1f} hour (all the history I have)"
+            if "change_24h_pct" in stats and indicators["change_24h_pct"] is not None:
+                parts.append(f"{window} change {indicators['change_24h_pct']:+.2f}%")
+            if "vwap_24h" in stats and indicators["vwap_24h"] is not None:
+                parts.append(f"{window} VWAP ${indicators['vwap_24h']:,.2f}")
+            if "volatility_24h_pct" in stats:
+                if indicators["volatility_24h_pct"] is not None:
+                    parts.append(f"{window} volatility {indicators['volatility_24h_pct']:.2f}%")
+                else:
+                    parts.append("not enough history for volatility yet")
+        else:
+            parts.append("I don't have any price history for it yet")
+        return ", ".join(parts) + "."
+    
+    except Exception as e:
+        logger.error(f"Error handling market stats request: {str(e)}")
+        return "I couldn't get market stats right now. Please try again."
+
+async def price_legs(exchange: str, legs: List[Dict]) -> List[Dict]:
+    """Validate every leg and quote its market price, all legs at once (a basket costs one price lookup of latency)"""
+    # listed symbols are checked against the exchange catalog, loaded here if it isn't yet (a dict read once it is)
+    await get_exchange_symbols(exchange)
+    
+    async def price_leg(leg: Dict) -> Dict:
+        error = None
+        if leg["side"] not in ("buy", "sell"):
+            error = f"invalid side {leg['side']}"
+        elif not leg["quantity"] or leg["quantity"] <= 0 or not leg["price"] or leg["price"] <= 0:
+            error = "quantity and price must be positive"
+        elif not INSTRUMENTS.is_listed(exchange, leg["symbol"]):
+            error = f"{leg['symbol']} is not listed on {exchange.capitalize()}"
+        elif leg.get("client_order_id") and not is_local(leg["client_order_id"]):
+            # GET/DELETE /orders/{id} are routed by the id, it has to lead back to the worker holding the order
+            error = f"client_order_id {leg['client_order_id']} belongs to another shard, leave it out to get one assigned"
+        if error:
+            return {**leg, "error": error, "market_price": None, "price_source": None}
+        quote = await fetch_price_quote(leg["symbol"], exchange)
+        return {**leg, "error": None, "market_price": quote.price, "price_source": quote.source}
+    
+    return list(await asyncio.gather(*(price_leg(leg) for leg in legs)))
+
+def submit_basket(exchange: str, legs: List[Dict], session_id: Optional[str] = None) -> List:
+    return [order_manager.submit(exchange, leg["symbol"], leg["side"], leg["quantity"], leg["price"],
+                                 session_id=session_id, client_order_id=leg.get("client_order_id"))
+            for leg in legs]
+
+@traced()
+async def handle_basket_request(text: str, legs: List[Dict], session_state: SessionState) -> str:
+
+    try:
+        if len(legs) > MAX_BASKET_LEGS:
+            return f"That's more than {MAX_BASKET_LEGS} orders at once, please split them up."
+        for leg in legs:
+            leg["side"] = leg["side"] or session_state.side
+        session_state.basket = legs
+        
+        exchange = smart_processor.extract_exchange(text) or session_state.exchange
+        if not exchange:
+            session_state.state = "await_basket_exchange"
+            return f"Got {len(legs)} orders. Which exchange should I place them on? Available exchanges: OKX, Bybit, Deribit, Binance"
+        return await quote_basket(exchange, session_state)
+    except Exception as e:
+        logger.error(f"Error handling basket request: {str(e)}")
+        return "Sorry, I couldn't read those orders. Please try again, for example 'buy 0.1 BTC at 45000 and 2 ETH at 3000 on OKX'."
+
+async def quote_basket(exchange: str, session_state: SessionState) -> str:
+    session_state.exchange = exchange
+    legs = [{**leg, "symbol": resolve_symbol(leg["crypto"], exchange, session_state)} for leg in session_state.basket]
+    legs = await price_legs(exchange, legs)
+    
+    errors = [f"order {i + 1} ({leg['symbol']}): {leg['error']}" for i, leg in enumerate(legs) if leg["error"]]
+    if errors:
+        session_state.basket = []
+        if session_state.state in ("await_exchange", "await_basket_exchange"):
+            session_state.state = "await_symbol"
+        return f"I can't place that basket on {exchange.capitalize()}: {'; '.join(errors)}. Please say the orders again."
+    
+    session_state.basket = [{key: leg[key] for key in ("symbol", "side", "quantity", "price")} for leg in legs]
+    session_state.state = "confirm_basket"
+    summary = "; ".join(f"{leg['side']} {leg['quantity']} {leg['symbol']} at ${leg['price']:,.2f} (market ${leg['market_price']:,.2f}){price_note(leg['price_source'])}"
+                        for leg in legs)
+    return f"I'm about to place {len(legs)} {exchange.capitalize()} orders: {summary}. Please confirm all of them by saying 'yes' or 'confirm'."
+
+@traced()
 async def handle_correction(text: str, session_state: SessionState) -> str:
 
     try:
@@ -544,21 +788,18 @@ async def handle_correction(text: str, session_state: SessionState) -> str:
         elif what_to_correct in smart_processor.crypto_variations:
             if new_value in smart_processor.crypto_variations:
                 if session_state.state == "await_symbol":
-                    new_symbol = None
-                    for symbol in session_state.symbols:
-                        symbol_lower = symbol.lower()
-                        if new_value in symbol_lower or any(var in symbol_lower for var in smart_processor.crypto_variations.get(new_value, [])):
-                            new_symbol = symbol
-                            break
+                    matches = INSTRUMENTS.with_asset(session_state.exchange, new_value)
+                    new_symbol = matches[0].canonical if matches else None
                     
                     if new_symbol:
                         session_state.symbol = new_symbol
                         session_state.state = "await_quantity_and_price"
                         
                         try:
-                            current_price = await fetch_price_with_retry(new_symbol, session_state.exchange)
-                            session_state.current_price = current_price
-                            return f"Got it! I've changed the symbol to {new_symbol}. Current price: ${current_price:,.2f} USDT. Now please specify both the quantity and price you'd like to trade at."
+                            quote = await fetch_price_quote(new_symbol, session_state.exchange)
+                            session_state.current_price = quote.price
+                            session_state.price_source = quote.source
+                            return f"Got it! I've changed the symbol to {new_symbol}. Current price: ${quote.price:,.2f} USDT{price_note(quote.source)}. Now please specify both the quantity and price you'd like to trade at."
                         except Exception as e:
                             logger.error(f"Error fetching price for {new_symbol}: {str(e)}")
                             return f"Got it! I've changed the symbol to {new_symbol}. Now please specify both the quantity and price you'd like to trade at."
@@ -587,6 +828,69 @@ async def handle_correction(text: str, session_state: SessionState) -> str:
         logger.error(f"Error handling correction: {str(e)}")
         return "I encountered an error processing your correction. Please try again."
 
+@app.on_event("startup")
+async def startup_event():
+    session_snapshotter.restore()
+    await session_snapshotter.start()
+    await active_connections.start()
+    await order_manager.start()
+    # every configured symbol gets its mock path in one bulk pass, so a fallback quote is just an array read
+    mock_prices.prepare(symbol for exchange_config in EXCHANGES.values() for symbol in exchange_config["symbols"])
+    
+    # the journal has to be open (seq continued) and listening before recovered orders can move again
+    await journal.start()
+    order_manager.add_listener(journal_order_event)
+    order_manager.add_listener(publish_order_update)
+    
+    # rebuild orders that were still working when the process went down
+    try:
+        recovered = await asyncio.to_thread(recover_open_orders, JOURNAL_DIR)
+        for order_data in recovered:
+            order_manager.restore(order_data)
+        if recovered:
+            logger.info(f"Recovered {len(recovered)} in-flight orders from journal")
+    except Exception as e:
+        logger.error(f"Order recovery from journal failed: {str(e)}")
+    
+    # and re-arm the alerts and conditional orders that hadn't fired yet
+    trigger_engine.add_listener(on_trigger_fired)
+    try:
+        armed = await asyncio.to_thread(recover_armed_triggers, JOURNAL_DIR)
+        for trigger_data in armed:
+            trigger_engine.restore(trigger_data)
+        if armed:
+            logger.info(f"Re-armed {len(armed)} triggers from journal")
+    except Exception as e:
+        logger.error(f"Trigger recovery from journal failed: {str(e)}")
+    
+    await tick_recorder.start()
+    ticker_cache.add_listener(on_ticker_snapshot)
+    ticker_cache.add_warm_source(trigger_engine.armed_exchanges)
+    await ticker_cache.start()
+    await trigger_poller.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await order_manager.stop()
+    await session_snapshotter.stop()
+    await active_connections.stop()
+    await journal.stop()
+    await trigger_poller.stop()
+    await tick_recorder.stop()
+    await ticker_cache.stop()
+
+def journal_order_event(order):
+    journal.append("order", order.to_dict(), session_id=order.session_id)
+
+def publish_order_update(order):
+    # order events go to every socket of the owning session
+    if order.session_id:
+        active_connections.publish(order.session_id, {
+            "type": "order_update",
+            "order": order.to_dict(),
+            "timestamp": datetime.now().isoformat()
+        })
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
@@ -594,19 +898,209 @@ async def health_check():
         return {
             "status": "healthy",
             "timestamp": datetime.now().isoformat(),
+            "shard": {"index": SHARD_INDEX, "count": SHARD_COUNT},
             "active_sessions": len(active_sessions),
-            "active_connections": len(active_connections)
+            "active_connections": active_connections.connection_count(),
+            "journal": journal.stats(),
+            "session_snapshot": session_snapshotter.stats(),
+            "ticks": tick_recorder.stats(),
+            "bars": bar_aggregator.stats(),
+            "tickers": ticker_cache.stats(),
+            "triggers": trigger_engine.stats(),
+            "trigger_poller": trigger_poller.stats(),
+            "instruments": INSTRUMENTS.stats(),
+            "price_sources": {**price_source_counts, "mock_engine": mock_prices.stats()},
+            "admission": admission.stats(),
+            "tracing": tracer.stats()
         }
     except Exception as e:
         logger.error(f"Health check failed: {str(e)}")
         raise HTTPException(status_code=500, detail="Service unhealthy")
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Admission control and load shedding metrics in the Prometheus text format"""
+    return "\n".join(admission.prometheus()) + "\n"
+
+@app.get("/debug/traces")
+async def get_traces(limit: int = 50, session_id: Optional[str] = None):
+    """Slow or failed requests kept by tail sampling, newest first"""
+    return tracer.recent(limit, session_id)
+
+@app.get("/debug/traces/{trace_id}")
+async def get_trace(trace_id: str):
+    """One kept trace with all of its spans"""
+    trace = tracer.get(trace_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail="Trace not found")
+    return trace
+
+@app.get("/connections")
+async def connection_stats():
+    """Per-socket queue depth, drops and coalesced frames"""
+    return active_connections.stats()
+
+@app.get("/orders/{client_order_id}")
+async def get_order(client_order_id: str):
+    """Order status by client order id"""
+    order = order_manager.get(client_order_id)
+    if order is None:
+        raise HTTPException(status_code=404, detail="Order not found")
+    return order.to_dict()
+
+@app.delete("/orders/{client_order_id}")
+async def cancel_order(client_order_id: str):
+    """Cancel a resting paper order"""
+    order = order_manager.cancel(client_order_id)
+    if order is None:
+        raise HTTPException(status_code=404, detail="Order not found")
+    return order.to_dict()
+
+@app.get("/sessions/{session_id}/orders")
+async def get_session_orders(session_id: str):
+    """All orders placed in a call session"""
+    return [order.to_dict() for order in order_manager.for_session(session_id)]
+
+@app.get("/sessions/{session_id}/journal")
+async def get_session_journal(session_id: str, kind: Optional[str] = None):
+    """Audit trail of a session replayed from the journal"""
+    return await asyncio.to_thread(lambda: list(read_records(JOURNAL_DIR, kind=kind, session_id=session_id)))
+
+@app.get("/prices/{exchange}/{symbol}")
+async def get_price(exchange: str, symbol: str):
+    """Current price with its source (live / cached / simulated) and age in seconds"""
+    quote = await fetch_price_quote(symbol, exchange)
+    if quote.source == SOURCE_UNAVAILABLE:
+        raise HTTPException(status_code=400, detail=f"Unsupported exchange: {exchange}")
+    return quote.to_dict()
+
+@app.get("/ticks/{exchange}/{symbol}")
+async def get_ticks(exchange: str, symbol: str, start: Optional[float] = None, end: Optional[float] = None, limit: int = 1000):
+    """Recorded ticks between start and end (unix seconds), newest `limit` rows"""
+    start_ns = int(start * 1e9) if start is not None else None
+    end_ns = int(end * 1e9) if end is not None else None
+    ticks = await asyncio.to_thread(lambda: merge_ticks([store.query(exchange, compact_symbol(symbol), start_ns, end_ns)
+                                                         for store in tick_sources]))
+    result = {}
+    for column, values in ticks.items():
+        values = values[-limit:].tolist()
+        # bid/ask are NaN when only a last price was fetched, which JSON can't carry
+        result[column] = [None if value != value else value for value in values]
+    return result
+
+@app.get("/bars/{exchange}/{symbol}")
+async def get_bars(exchange: str, symbol: str, resolution: str = "1m", limit: int = 100):
+    """OHLCV bars for a symbol, resolution is one of 1s, 1m, 5m"""
+    if resolution not in BAR_RESOLUTIONS:
+        raise HTTPException(status_code=400, detail=f"Unsupported resolution {resolution}, use one of {', '.join(BAR_RESOLUTIONS)}")
+    return bar_aggregator.bars(exchange, compact_symbol(symbol), resolution, limit)
+
+@app.get("/indicators")
+async def get_all_indicators():
+    """24h change, VWAP and volatility for every tracked symbol"""
+    return [{"exchange": exchange, "symbol": symbol, **values} for (exchange, symbol), values in bar_aggregator.indicators().items()]
+
+@app.get("/indicators/{exchange}/{symbol}")
+async def get_indicators(exchange: str, symbol: str):
+    """24h change, VWAP and volatility for one symbol"""
+    indicators = bar_aggregator.indicators_for(exchange, compact_symbol(symbol))
+    if indicators is None:
+        raise HTTPException(status_code=404, detail="No price history for this symbol")
+    return indicators
+
+@app.post("/triggers")
+async def create_trigger(request: TriggerRequest):
+    """Arm a price alert or a conditional order"""
+    if request.direction not in ("above", "below"):
+        raise HTTPException(status_code=400, detail="direction must be 'above' or 'below'")
+    if request.action not in ("alert", "order"):
+        raise HTTPException(status_code=400, detail="action must be 'alert' or 'order'")
+    if request.action == "order" and (request.side not in ("buy", "sell") or not request.quantity):
+        raise HTTPException(status_code=400, detail="conditional orders need a side (buy/sell) and a quantity")
+    if request.exchange.lower() not in EXCHANGES:
+        raise HTTPException(status_code=400, detail=f"Unsupported exchange: {request.exchange}")
+    trigger = trigger_engine.arm(Trigger(
+        request.exchange.lower(), request.symbol, request.direction, request.threshold,
+        action=request.action,
+        side=request.side,
+        quantity=request.quantity,
+        limit_price=request.limit_price or (request.threshold if request.action == "order" else None),
+        session_id=request.session_id,
+        trigger_id=local_id()
+    ))
+    journal.append("trigger", trigger.to_dict(), session_id=request.session_id)
+    return trigger.to_dict()
+
+@app.get("/triggers/{trigger_id}")
+async def get_trigger(trigger_id: str):
+    """Trigger status"""
+    trigger = trigger_engine.triggers.get(trigger_id)
+    if trigger is None:
+        raise HTTPException(status_code=404, detail="Trigger not found")
+    return trigger.to_dict()
+
+@app.delete("/triggers/{trigger_id}")
+async def cancel_trigger(trigger_id: str):
+    """Disarm a trigger"""
+    trigger = trigger_engine.cancel(trigger_id)
+    if trigger is None:
+        raise HTTPException(status_code=404, detail="Trigger not found")
+    # journaled so a restart doesn't re-arm it
+    journal.append("trigger", trigger.to_dict(), session_id=trigger.session_id)
+    return trigger.to_dict()
+
+@app.get("/sessions/{session_id}/triggers")
+async def get_session_triggers(session_id: str):
+    """All alerts and conditional orders of a call session"""
+    return [trigger.to_dict() for trigger in trigger_engine.for_session(session_id)]
+
+@app.get("/orderbook/{exchange}/{symbol}")
+async def get_order_book(exchange: str, symbol: str):
+    """Top of the local paper-trading book"""
+    return order_manager.engine.book(exchange.lower(), symbol).depth()
+
+@app.post("/baskets")
+async def create_basket(request: BasketRequest):
+    """Validate and price every leg concurrently, then place all of them, or none if any leg is invalid"""
+    with tracer.trace("basket", legs=len(request.legs), session_id=request.session_id):
+        exchange = request.exchange.lower()
+        if exchange not in EXCHANGES:
+            raise HTTPException(status_code=400, detail=f"Unsupported exchange: {request.exchange}")
+        if not request.legs or len(request.legs) > MAX_BASKET_LEGS:
+            raise HTTPException(status_code=400, detail=f"A basket needs 1 to {MAX_BASKET_LEGS} legs")
+        
+        legs = [leg.model_dump() for leg in request.legs]
+        for leg in legs:
+            leg["side"] = leg["side"].lower()
+            if INSTRUMENTS.is_listed(exchange, leg["symbol"]):
+                leg["symbol"] = ADAPTERS[exchange].to_canonical(leg["symbol"])
+        legs = await price_legs(exchange, legs)
+        
+        errors = [{"leg": i, "symbol": leg["symbol"], "error": leg["error"]} for i, leg in enumerate(legs) if leg["error"]]
+        if errors:
+            raise HTTPException(status_code=422, detail={"message": "Basket rejected, no orders were placed", "errors": errors})
+        if request.dry_run:
+            return {"placed": False, "legs": legs}
+        
+        orders = submit_basket(exchange, legs, request.session_id)
+        return {"placed": True, "legs": [{**leg, "order": order.to_dict()} for leg, order in zip(legs, orders)]}
+
 @app.post("/start_call")
 async def start_call(request: CallRequest, background_tasks: BackgroundTasks):
     """Start a new call session"""
+    with tracer.trace("start_call"):
+        return await handle_start_call(request, background_tasks)
+
+async def handle_start_call(request: CallRequest, background_tasks: BackgroundTasks):
+    # new calls yield to calls already in progress when we're overloaded
+    if not await admission.acquire(PRIORITY_NEW_CALL):
+        raise HTTPException(status_code=503, detail="We're very busy right now, please try again in a moment.",
+                            headers={"Retry-After": "2"})
+    started = time.monotonic()
+    ok = True
     try:
-        session_id = str(uuid.uuid4())
-        session_state = SessionState()
+        session_id = new_session_id()
+        session_state = SessionState(session_id)
         
         active_sessions[session_id] = {
             "state": session_state,
@@ -615,6 +1109,7 @@ async def start_call(request: CallRequest, background_tasks: BackgroundTasks):
         }
         
         logger.info(f"Starting new call session: {session_id} for user: {request.user_name}")
+        journal.append("session", {"event": "start", "user_name": request.user_name}, session_id=session_id)
         logger.info(f"Session initialized with state: {session_state.state}")
         
         background_tasks.add_task(simulate_bland_call, session_id)
@@ -628,8 +1123,11 @@ async def start_call(request: CallRequest, background_tasks: BackgroundTasks):
         }
         
     except Exception as e:
+        ok = False
         logger.error(f"Error starting call: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to start call: {str(e)}")
+    finally:
+        admission.release(time.monotonic() - started, ok)
 
 @app.post("/end_call/{session_id}")
 async def end_call(session_id: str):
@@ -637,19 +1135,13 @@ async def end_call(session_id: str):
     try:
         logger.info(f"Ending call session: {session_id}")
         
-        # Close WebSocket connection if exists
-        if session_id in active_connections:
-            try:
-                await active_connections[session_id].close()
-                logger.info(f"Closed WebSocket connection for session {session_id}")
-            except Exception as e:
-                logger.error(f"Error closing WebSocket: {str(e)}")
-            finally:
-                del active_connections[session_id]
+        # Close WebSocket connections if any, the writers flush and close in the background
+        active_connections.close_session(session_id)
         
         # Remove session from active sessions
         if session_id in active_sessions:
             del active_sessions[session_id]
+            journal.append("session", {"event": "end"}, session_id=session_id)
             logger.info(f"Call session {session_id} ended")
             return {"message": "Call ended successfully"}
         else:
@@ -659,8 +1151,7 @@ async def end_call(session_id: str):
     except Exception as e:
         logger.error(f"Error ending call: {str(e)}")
         # Still try to clean up
-        if session_id in active_connections:
-            del active_connections[session_id]
+        active_connections.close_session(session_id)
         if session_id in active_sessions:
             del active_sessions[session_id]
         raise HTTPException(status_code=500, detail=f"Failed to end call: {str(e)}")
@@ -668,6 +1159,11 @@ async def end_call(session_id: str):
 # Bland.ai webhook,receives voice input, processes it and sends back response
 @app.post("/bland_webhook/{session_id}")
 async def bland_webhook(session_id: str, request: Request):
+    # one trace per turn, only kept when the turn was slow or something failed
+    with tracer.trace("webhook", session_id=session_id):
+        return await handle_webhook(session_id, request)
+
+async def handle_webhook(session_id: str, request: Request):
     try:
         body = await request.body()
         logger.info(f"Raw request body: {body}")
@@ -688,34 +1184,56 @@ async def bland_webhook(session_id: str, request: Request):
             logger.error(f"Session {session_id} not found")
             raise HTTPException(status_code=404, detail="Session not found")
         logger.info(f"Received voice input webhook for session {session_id}: {voice_input.text}")
-        session_state = get_session_state(session_id)
-        bot_response = await process_voice_input(voice_input.text, session_state)
+        
+        with tracer.span("admission"):
+            admitted = await admission.acquire(PRIORITY_TURN)
+        if not admitted:
+            record_error("shed")
+            # shed: the caller hears a quick holding reply and repeats, the session state doesn't move
+            active_connections.publish(session_id, {
+                "type": "transcript_update",
+                "speaker": "bot",
+                "text": DEGRADED_REPLY,
+                "timestamp": datetime.now().isoformat()
+            })
+            return {"status": "shed", "response": DEGRADED_REPLY}
+        started = time.monotonic()
+        ok = False
+        try:
+            session_state = get_session_state(session_id)
+            previous_state = session_state.state
+            annotate(state=previous_state, text=voice_input.text)
+            bot_response = await process_voice_input(voice_input.text, session_state)
+            annotate(to_state=session_state.state)
+            ok = True
+        finally:
+            admission.release(time.monotonic() - started, ok)
         logger.info(f"Bot response: {bot_response}")
         
+        journal.append("turn", {
+            "text": voice_input.text,
+            "from_state": previous_state,
+            "to_state": session_state.state,
+            "response": bot_response
+        }, session_id=session_id)
+        
+        # only enqueued here, each socket's writer task does the actual send
+        active_connections.publish(session_id, {
+            "type": "transcript_update",
+            "speaker": "bot",
+            "text": bot_response,
+            "timestamp": datetime.now().isoformat()
+        })
+        
         # Check if call should be ended
         if session_state.state == "end_call":
             logger.info(f"Call ended for session {session_id}, cleaning up...")
-            # Clean up the session
+            # Clean up the session, sockets close after the goodbye message is flushed
             if session_id in active_sessions:
                 del active_sessions[session_id]
-            if session_id in active_connections:
-                try:
-                    await active_connections[session_id].close()
-                except Exception as e:
-                    logger.error(f"Error closing WebSocket: {str(e)}")
-                finally:
-                    del active_connections[session_id]
+                journal.append("session", {"event": "end"}, session_id=session_id)
+            active_connections.close_session(session_id)
         
-        if session_id in active_connections:
-            try:
-                await active_connections[session_id].send_json({
-                    "type": "transcript_update",
-                    "speaker": "bot",
-                    "text": bot_response,
-                    "timestamp": datetime.now().isoformat()
-                })
-            except Exception as e:
-                logger.error(f"Error sending WebSocket message: {str(e)}")
         return {"status": "processed", "response": bot_response}
     except Exception as e:
         logger.error(f"Error processing webhook: {str(e)}")
@@ -725,69 +1243,43 @@ async def bland_webhook(session_id: str, request: Request):
         raise HTTPException(status_code=500, detail=f"Failed to process webhook: {str(e)}")
 
 @app.websocket("/ws/{session_id}")
-async def websocket_endpoint(websocket: WebSocket, session_id: str):
-    """WebSocket endpoint for real-time communication"""
+async def websocket_endpoint(websocket: WebSocket, session_id: str, role: str = "caller", batch: bool = False):
+    """WebSocket endpoint for real-time communication, several sockets per session are allowed (e.g. ?role=agent).
+
+    With ?batch=true queued messages arrive as one JSON array per send.
+    """
     try:
-        await websocket.accept()
-        logger.info(f"WebSocket connection established for session {session_id}")
-        
-        # Store the connection
-        active_connections[session_id] = websocket
-        
-        # Send initial connection message
-        try:
-            await websocket.send_json({
-                "type": "connection_established",
-                "session_id": session_id,
-                "timestamp": datetime.now().isoformat()
-            })
-            
-            # Send initial greeting if session exists
-            if session_id in active_sessions:
-                session_state = get_session_state(session_id)
-                greeting = "Hello! Welcome to our OTC Trading Bot. I'm here to help you place trades. Which exchange would you like to use? Available exchanges: OKX, Bybit, Deribit, and Binance."
-                
-                await websocket.send_json({
-                    "type": "transcript_update",
-                    "speaker": "bot",
-                    "text": greeting,
-                    "timestamp": datetime.now().isoformat()
-                })
-                
-                logger.info(f"Sent initial greeting for session {session_id}")
-            
-        except Exception as e:
-            logger.error(f"Error sending initial message: {str(e)}")
-        
-        try:
-            while True:
-                # Keep connection alive and handle incoming messages
-                data = await websocket.receive_text()
-                logger.info(f"Received WebSocket message: {data}")
-                
-                # Process any incoming messages if needed
-                try:
-                    message_data = json.loads(data)
-                    if message_data.get("type") == "ping":
-                        await websocket.send_json({"type": "pong"})
-                except json.JSONDecodeError:
-                    logger.warning(f"Invalid JSON received: {data}")
-                    
-        except WebSocketDisconnect:
-            logger.info(f"WebSocket disconnected for session {session_id}")
-        except Exception as e:
-            logger.error(f"WebSocket error for session {session_id}: {str(e)}")
-        finally:
-            # Clean up connection
-            if session_id in active_connections:
-                del active_connections[session_id]
-                logger.info(f"Cleaned up WebSocket connection for session {session_id}")
-                
+        conn = await active_connections.connect(websocket, session_id, role, batch)
     except Exception as e:
         logger.error(f"Error in WebSocket endpoint: {str(e)}")
-        # cllean up connection on error
-        if session_id in active_connections:
-            del active_connections[session_id]
+        return
+
+    # Send initial connection message
+    active_connections.send_to(conn, {
+        "type": "connection_established",
+        "session_id": session_id,
+        "timestamp": datetime.now().isoformat()
+    })
+
+    # Send initial greeting if session exists
+    if session_id in active_sessions and role == "caller":
+        session_state = get_session_state(session_id)
+        if session_state.state == "await_exchange":
+            greeting = "Hello! Welcome to our OTC Trading Bot. I'm here to help you place trades. Which exchange would you like to use? Available exchanges: OKX, Bybit, Deribit, and Binance."
+        else:
+            # session restored after a restart, carry on from where the caller was
+            greeting = "Welcome back! We got briefly disconnected, let's continue where we left off."
+        active_connections.send_to(conn, {
+            "type": "transcript_update",
+            "speaker": "bot",
+            "text": greeting,
+            "timestamp": datetime.now().isoformat()
+        })
+        logger.info(f"Sent initial greeting for session {session_id}")
+
+    # reads until the client goes away, pings are answered and stale sockets reaped by the gateway heartbeat
+    await active_connections.serve(conn)
+    logger.info(f"Cleaned up WebSocket connection for session {session_id}")
 
 async def simulate_bland_call(session_id: str):
     """Simulate Bland.ai call setup"""
@@ -832,15 +1324,49 @@ class SmartTextProcessor:
             "instead", "rather", "switch", "different", "wrong", "mistake"
         ]
         
+        self.correction_pattern = re.compile(rf'\b(?:{"|".join(re.escape(p) for p in self.correction_phrases)})\b')
+        
         self.negation_words = ["not", "no", "wrong", "incorrect", "different", "change"]
+        
+        self.crypto_tickers = {
+            "bitcoin": "BTC", "ethereum": "ETH", "ripple": "XRP", "litecoin": "LTC", "cardano": "ADA",
+            "polkadot": "DOT", "chainlink": "LINK", "stellar": "XLM", "dogecoin": "DOGE", "chiliz": "CHZ"
+        }
+        
+        self.market_stats_phrases = {
+            "change_24h_pct": ["24 hour", "24-hour", "24h", "twenty four hour", "daily change", "today's change"],
+            "vwap_24h": ["vwap", "average price", "volume weighted"],
+            "volatility_24h_pct": ["volatility", "volatile"]
+        }
+        
+        self.alert_words = ["alert", "notify", "tell me", "let me know", "ping me", "warn me"]
+        self.above_words = ["above", "over", "rises", "goes up", "climbs", "exceeds", "higher than", "up to"]
+        self.below_words = ["below", "under", "drops", "falls", "goes down", "dips", "lower than", "down to"]
+        self.reach_words = ["reaches", "hits", "touches", "gets to", "is at"]
+        # a price level: a level word directly followed by the number ("drops to 40000", "goes above $3500")
+        self.level_directions = {**{w: "above" for w in self.above_words}, **{w: "below" for w in self.below_words},
+                                 **{w: None for w in self.reach_words}}
+        level_words = "|".join(re.escape(w) for w in sorted(self.level_directions, key=len, reverse=True))
+        self.level_pattern = re.compile(rf'\b({level_words})\s+(?:to\s+|of\s+)?\$?(\d+(?:\.\d+)?)')
+        
+        self.buy_words = ["buy", "long", "bid", "purchase"]
+        self.sell_words = ["sell", "short", "offer", "cell"]
+        self.side_words = {**{w: "buy" for w in self.buy_words}, **{w: "sell" for w in self.sell_words}}
+        self.side_pattern = re.compile(rf'\b({"|".join(self.side_words)})\b')
+        
+        # one leg of a basket: "[buy|sell] 0.1 btc at 45000", the coin is whatever sits between quantity and price
+        side_words = "|".join(self.buy_words + self.sell_words)
+        self.leg_pattern = re.compile(rf'(?:\b({side_words})\s+)?(\d+(?:\.\d+)?)\s+(?:of\s+)?([a-z][a-z ]*?)\s+(?:at|@|for|price)\s+\$?(\d+(?:\.\d+)?)')
     
     def normalize_text(self, text: str) -> str:
         return text.lower().strip()
     
+    @traced("nlu.is_correction")
     def is_correction(self, text: str) -> bool:
-        text_lower = text.lower()
-        return any(phrase in text_lower for phrase in self.correction_phrases)
+        # whole words, "know" or "note" aren't a "no"/"not"
+        return bool(self.correction_pattern.search(text.lower()))
     
+    @traced("nlu.extract_correction")
     def extract_correction(self, text: str) -> tuple[Optional[str], Optional[str]]:
 
         text_lower = text.lower()
@@ -926,6 +1452,7 @@ class SmartTextProcessor:
         
         return None
 
+    @traced("nlu.extract_exchange")
     def extract_exchange(self, text: str) -> Optional[str]:
         """Extract exchange from text"""
         text_lower = text.lower()
@@ -936,6 +1463,7 @@ class SmartTextProcessor:
         
         return None
 
+    @traced("nlu.extract_crypto")
     def extract_crypto(self, text: str) -> Optional[str]:
         """Extract cryptocurrency from text"""
         text_lower = text.lower()
@@ -956,6 +1484,64 @@ class SmartTextProcessor:
         """Extract cryptocurrency for filtering"""
         return self.extract_crypto(text)
 
+    def extract_market_stats(self, text: str) -> List[str]:
+        """Which market stats (indicator keys) the text is asking for"""
+        text_lower = text.lower()
+        return [stat for stat, phrases in self.market_stats_phrases.items() if any(phrase in text_lower for phrase in phrases)]
+
+    @traced("nlu.is_market_stats_request")
+    def is_market_stats_request(self, text: str) -> bool:
+        return bool(self.extract_market_stats(text))
+
+    @traced("nlu.is_trigger_request")
+    def is_trigger_request(self, text: str) -> bool:
+        """Alerts ("alert me when ...") and conditional orders ("buy ... if it drops to ..."), only with a price level in them"""
+        text_lower = f" {text.lower().replace(',', '')} "
+        if not self.level_pattern.search(text_lower):
+            return False
+        return any(word in text_lower for word in self.alert_words) or any(word in text_lower for word in [" if ", " when ", " once "])
+
+    @traced("nlu.extract_trigger")
+    def extract_trigger(self, text: str) -> Optional[Dict]:
+        """Parse an alert / conditional order into its parts, direction is None when the text doesn't say"""
+        text_lower = text.lower().replace(",", "")
+        level = self.level_pattern.search(text_lower)
+        if not level:
+            return None
+        
+        # exchange names ("bybit") would otherwise be read as coins ("bit")
+        exchange = self.extract_exchange(text_lower)
+        crypto_text = text_lower
+        if exchange:
+            for variation in self.exchange_variations[exchange]:
+                crypto_text = crypto_text.replace(variation, " ")
+        
+        side = self.extract_side(text_lower)
+        is_order = side is not None and not any(word in text_lower for word in self.alert_words)
+        
+        # an order's quantity comes before the level ("buy 0.1 btc if it drops to 40000")
+        quantities = re.findall(r'\d+(?:\.\d+)?', text_lower[:level.start()])
+        
+        return {
+            "action": "order" if is_order else "alert",
+            "exchange": exchange,
+            "crypto": self.extract_crypto(crypto_text),
+            "direction": self.level_directions[level.group(1)],
+            "threshold": float(level.group(2)),
+            "side": side if is_order else None,
+            "quantity": float(quantities[0]) if is_order and quantities else None
+        }
+
+    def extract_side(self, text: str) -> Optional[str]:
+        """Extract order side from text, whole words only ("excellent" isn't "cell")"""
+        words = self.side_pattern.findall(text.lower())
+        # an explicit buy/sell wins over the looser synonyms (long, bid, offer, ...)
+        for word in words:
+            if word in ("buy", "sell"):
+                return word
+        return self.side_words[words[0]] if words else None
+
+    @traced("nlu.extract_quantity_and_price")
     def extract_quantity_and_price(self, text: str) -> tuple[Optional[float], Optional[float]]:
         """Extract quantity and price from text"""
         text_lower = text.lower()
@@ -999,8 +1585,31 @@ class SmartTextProcessor:
         
         return None, None
 
+    @traced("nlu.extract_legs")
+    def extract_legs(self, text: str) -> List[Dict]:
+        """Every order leg of an utterance ("buy 0.1 btc at 45000 and 2 eth at 3000"), a leg without a side takes the one before it"""
+        text_lower = text.lower().replace(",", "")
+        legs = []
+        side = None
+        for side_word, quantity, coin, price in self.leg_pattern.findall(text_lower):
+            if side_word:
+                side = self.extract_side(side_word)
+            legs.append({
+                "side": side,
+                "crypto": self.extract_crypto(coin) or coin.split()[0],
+                "quantity": float(quantity),
+                "price": float(price)
+            })
+        return legs
+
 # Initialize smart text processor
 smart_processor = SmartTextProcessor()
+# spoken coin names resolve to tickers through the instrument registry's alias index
+INSTRUMENTS.add_aliases({ticker: smart_processor.crypto_variations[name] + [name] for name, ticker in smart_processor.crypto_tickers.items()})
+# Initialize order manager, paper executors mark new symbols through fetch_price_quote (source included)
+# Initialize order manager, paper executors mark new symbols through fetch_price_with_retry
+# (order ids are minted on this shard so the router sends /orders/{id} back here)
+order_manager = OrderManager(price_feed=fetch_price_quote, id_factory=local_id)
 
 async def fetch_symbols_with_retry(exchange: str, max_retries: int = 3) -> List[str]:
     """Fetch symbols from exchange with retry logic"""
@@ -0,0 +1,389 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+import uuid
+from abc import ABC, abstractmethod
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from price_source import SOURCE_LIVE, SOURCE_SIMULATED, PriceQuote
+
+logger = logging.getLogger(__name__)
+
+# how many orders each venue accepts in one batch request, 1 means no batch endpoint
+EXCHANGE_BATCH_LIMITS = {
+    "okx": 20,
+    "bybit": 10,
+    "binance": 1,
+    "deribit": 1
+}
+
+# fill price source of a match against another resting paper order
+FILL_MATCHED = "matched"
+
+_seq = itertools.count()
+
+
+class Order:
+    __slots__ = ("client_order_id", "session_id", "exchange", "symbol", "side", "quantity", "price",
+                 "filled", "avg_fill_price", "fill_source", "status", "reason", "seq", "created_at", "updated_at")
+
+    def __init__(self, client_order_id: str, exchange: str, symbol: str, side: str, quantity: float,
+                 price: float, session_id: Optional[str] = None):
+        self.client_order_id = client_order_id
+        self.session_id = session_id
+        self.exchange = exchange
+        self.symbol = symbol
+        self.side = side
+        self.quantity = quantity
+        self.price = price
+        self.filled = 0.0
+        self.avg_fill_price = 0.0
+        self.fill_source = None  # where the fill prices came from, "simulated" once any fill used a mock price
+        self.status = "accepted"
+        self.reason = None
+        self.seq = next(_seq)
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+
+    @property
+    def remaining(self) -> float:
+        return self.quantity - self.filled
+
+    @property
+    def is_done(self) -> bool:
+        return self.status in ("filled", "cancelled", "rejected")
+
+    def apply_fill(self, quantity: float, price: float, source: str = SOURCE_LIVE):
+        notional = self.avg_fill_price * self.filled + price * quantity
+        self.filled += quantity
+        self.avg_fill_price = notional / self.filled
+        # a made-up price taints the average for good
+        if self.fill_source != SOURCE_SIMULATED:
+            self.fill_source = source
+        # float dust from partial fills shouldn't leave an order open forever
+        self.status = "filled" if self.remaining <= 1e-12 else "partially_filled"
+        self.updated_at = time.time()
+
+    def to_dict(self) -> Dict:
+        return {
+            "client_order_id": self.client_order_id,
+            "session_id": self.session_id,
+            "exchange": self.exchange,
+            "symbol": self.symbol,
+            "side": self.side,
+            "quantity": self.quantity,
+            "price": self.price,
+            "filled": self.filled,
+            "avg_fill_price": self.avg_fill_price,
+            "fill_source": self.fill_source,
+            "status": self.status,
+            "reason": self.reason,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at
+        }
+
+
+class OrderBook:
+    """Price-time priority book for one (exchange, symbol).
+
+    Resting orders match against each other, and against the last price of
+    the feed, which acts as a counterparty with unlimited size.
+    """
+
+    def __init__(self, exchange: str, symbol: str):
+        self.exchange = exchange
+        self.symbol = symbol
+        self.bids: List[Tuple[float, int, Order]] = []  # (-price, seq, order)
+        self.asks: List[Tuple[float, int, Order]] = []  # (price, seq, order)
+        self.last_price: Optional[float] = None
+        self.last_source: Optional[str] = None
+
+    def _best(self, heap: List) -> Optional[Order]:
+        # cancelled / filled orders are removed lazily
+        while heap and heap[0][2].is_done:
+            heapq.heappop(heap)
+        return heap[0][2] if heap else None
+
+    def submit(self, order: Order) -> List[Tuple[Order, float, float]]:
+        """Match an incoming order, rest what is left, returns (order, qty, price) fills"""
+        fills = []
+        buying = order.side == "buy"
+        opposite = self.asks if buying else self.bids
+
+        while order.remaining > 0:
+            resting = self._best(opposite)
+            if resting is None:
+                break
+            if (buying and resting.price > order.price) or (not buying and resting.price < order.price):
+                break
+            qty = min(order.remaining, resting.remaining)
+            # trade at the resting order's price
+            order.apply_fill(qty, resting.price, FILL_MATCHED)
+            resting.apply_fill(qty, resting.price, FILL_MATCHED)
+            fills.append((order, qty, resting.price))
+            fills.append((resting, qty, resting.price))
+
+        if order.remaining > 0 and self.last_price is not None and self._crosses_feed(order, self.last_price):
+            qty = order.remaining
+            order.apply_fill(qty, self.last_price, self.last_source)
+            fills.append((order, qty, self.last_price))
+
+        if order.remaining > 0:
+            if order.status == "accepted":
+                order.status = "open"
+            if buying:
+                heapq.heappush(self.bids, (-order.price, order.seq, order))
+            else:
+                heapq.heappush(self.asks, (order.price, order.seq, order))
+        return fills
+
+    def on_price(self, price: float, source: str = SOURCE_LIVE) -> List[Tuple[Order, float, float]]:
+        """Fill resting orders the new feed price has crossed, the fills remember the price source"""
+        self.last_price = price
+        self.last_source = source
+        fills = []
+        while True:
+            bid = self._best(self.bids)
+            if bid is None or bid.price < price:
+                break
+            heapq.heappop(self.bids)
+            qty = bid.remaining
+            bid.apply_fill(qty, price, source)
+            fills.append((bid, qty, price))
+        while True:
+            ask = self._best(self.asks)
+            if ask is None or ask.price > price:
+                break
+            heapq.heappop(self.asks)
+            qty = ask.remaining
+            ask.apply_fill(qty, price, source)
+            fills.append((ask, qty, price))
+        return fills
+
+    @staticmethod
+    def _crosses_feed(order: Order, last_price: float) -> bool:
+        return order.price >= last_price if order.side == "buy" else order.price <= last_price
+
+    def depth(self, levels: int = 5) -> Dict:
+        bids = sorted((o for _, _, o in self.bids if not o.is_done), key=lambda o: (-o.price, o.seq))
+        asks = sorted((o for _, _, o in self.asks if not o.is_done), key=lambda o: (o.price, o.seq))
+        return {
+            "last_price": self.last_price,
+            "bids": [[o.price, o.remaining] for o in bids[:levels]],
+            "asks": [[o.price, o.remaining] for o in asks[:levels]]
+        }
+
+
+class MatchingEngine:
+    """Local paper-trading matcher, one OrderBook per (exchange, symbol)"""
+
+    def __init__(self):
+        self.books: Dict[Tuple[str, str], OrderBook] = {}
+
+    def book(self, exchange: str, symbol: str) -> OrderBook:
+        key = (exchange, symbol)
+        book = self.books.get(key)
+        if book is None:
+            book = self.books[key] = OrderBook(exchange, symbol)
+        return book
+
+    def submit(self, order: Order) -> List[Tuple[Order, float, float]]:
+        return self.book(order.exchange, order.symbol).submit(order)
+
+    def on_price(self, exchange: str, symbol: str, price: float, source: str = SOURCE_LIVE) -> List[Tuple[Order, float, float]]:
+        return self.book(exchange, symbol).on_price(price, source)
+
+
+class ExchangeExecutor(ABC):
+    """Drains one exchange's order queue, grouping orders up to the venue batch limit.
+
+    Subclasses decide where a batch goes (PaperExecutor: the local MatchingEngine).
+    """
+
+    def __init__(self, exchange: str, manager: "OrderManager", max_batch: int, queue_size: int):
+        self.exchange = exchange
+        self.manager = manager
+        self.max_batch = max_batch
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.task: Optional[asyncio.Task] = None
+        self.batches = 0
+
+    async def run(self):
+        while True:
+            try:
+                order = await self.queue.get()
+                batch = [order]
+                while len(batch) < self.max_batch and not self.queue.empty():
+                    batch.append(self.queue.get_nowait())
+                await self.submit_batch(batch)
+                self.batches += 1
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"{self.exchange} executor error: {str(e)}")
+
+    @abstractmethod
+    async def submit_batch(self, batch: List[Order]):
+        """Execute one batch, emitting every order it changes"""
+
+
+class PaperExecutor(ExchangeExecutor):
+    """Executes against the local MatchingEngine instead of the venue"""
+
+    async def submit_batch(self, batch: List[Order]):
+        engine = self.manager.engine
+        feed = self.manager.price_feed
+
+        # make sure every symbol in the batch has a mark price before matching
+        if feed is not None:
+            missing = {o.symbol for o in batch if engine.book(self.exchange, o.symbol).last_price is None}
+            for symbol in missing:
+                try:
+                    quote = await feed(symbol, self.exchange)
+                    if quote.price > 0:
+                        book = engine.book(self.exchange, symbol)
+                        book.last_price = quote.price
+                        book.last_source = quote.source
+                except Exception as e:
+                    logger.error(f"Price feed failed for {symbol} on {self.exchange}: {str(e)}")
+
+        for order in batch:
+            if order.is_done:
+                continue
+            fills = engine.submit(order)
+            self.manager.emit(order)
+            self.manager.emit_fills(fills, skip=order)
+
+
+class OrderManager:
+    """Async order intake: accept fast, execute in per-exchange background workers"""
+
+    def __init__(self, price_feed: Optional[Callable[[str, str], Awaitable[PriceQuote]]] = None,
+                 queue_size: int = 10000, executor_class=PaperExecutor,
+                 id_factory: Callable[[], str] = lambda: uuid.uuid4().hex):
+        self.engine = MatchingEngine()
+        self.id_factory = id_factory
+        self.price_feed = price_feed
+        self.queue_size = queue_size
+        self.executor_class = executor_class
+        self.executors: Dict[str, ExchangeExecutor] = {}
+        self.orders: Dict[str, Order] = {}
+        self.session_orders: Dict[str, List[str]] = {}
+        self.listeners: List[Callable[[Order], None]] = []
+
+    async def start(self):
+        for exchange in EXCHANGE_BATCH_LIMITS:
+            self._executor(exchange)
+
+    async def stop(self):
+        for executor in self.executors.values():
+            if executor.task:
+                executor.task.cancel()
+        self.executors.clear()
+
+    def _executor(self, exchange: str) -> ExchangeExecutor:
+        executor = self.executors.get(exchange)
+        if executor is None:
+            max_batch = EXCHANGE_BATCH_LIMITS.get(exchange, 1)
+            executor = self.executor_class(exchange, self, max_batch, self.queue_size)
+            executor.task = asyncio.create_task(executor.run())
+            self.executors[exchange] = executor
+        return executor
+
+    def add_listener(self, listener: Callable[[Order], None]):
+        self.listeners.append(listener)
+
+    def emit(self, order: Order):
+        for listener in self.listeners:
+            try:
+                listener(order)
+            except Exception as e:
+                logger.error(f"Order listener failed for {order.client_order_id}: {str(e)}")
+
+    def emit_fills(self, fills: List[Tuple[Order, float, float]], skip: Optional[Order] = None):
+        seen = set()
+        for order, qty, price in fills:
+            if order is skip or order.client_order_id in seen:
+                continue
+            seen.add(order.client_order_id)
+            self.emit(order)
+
+    def submit(self, exchange: str, symbol: str, side: str, quantity: float, price: float,
+               session_id: Optional[str] = None, client_order_id: Optional[str] = None) -> Order:
+        """Validate and enqueue, returns as soon as the order is accepted (or rejected).
+
+        Submitting the same client_order_id twice returns the original order.
+        """
+        client_order_id = client_order_id or self.id_factory()
+        existing = self.orders.get(client_order_id)
+        if existing is not None:
+            return existing
+
+        exchange = exchange.lower()
+        order = Order(client_order_id, exchange, symbol, side.lower(), float(quantity), float(price), session_id)
+        self.orders[client_order_id] = order
+        if session_id:
+            self.session_orders.setdefault(session_id, []).append(client_order_id)
+
+        if order.side not in ("buy", "sell"):
+            self._reject(order, f"invalid side {side}")
+        elif order.quantity <= 0 or order.price <= 0:
+            self._reject(order, "quantity and price must be positive")
+        else:
+            try:
+                self._executor(exchange).queue.put_nowait(order)
+                self.emit(order)
+            except asyncio.QueueFull:
+                self._reject(order, f"{exchange} order queue is full")
+        return order
+
+    def restore(self, data: Dict) -> Order:
+        """Re-queue an in-flight order recovered from the journal, keeping its id and fills"""
+        existing = self.orders.get(data["client_order_id"])
+        if existing is not None:
+            return existing
+        order = Order(data["client_order_id"], data["exchange"], data["symbol"], data["side"],
+                      float(data["quantity"]), float(data["price"]), data.get("session_id"))
+        order.filled = float(data.get("filled", 0.0))
+        order.avg_fill_price = float(data.get("avg_fill_price", 0.0))
+        order.fill_source = data.get("fill_source")
+        order.created_at = data.get("created_at", order.created_at)
+        if order.filled > 0:
+            order.status = "partially_filled"
+        self.orders[order.client_order_id] = order
+        if order.session_id:
+            self.session_orders.setdefault(order.session_id, []).append(order.client_order_id)
+        self._executor(order.exchange).queue.put_nowait(order)
+        # listeners see the re-queued order before any fill, the journal records the recovery
+        self.emit(order)
+        return order
+
+    def _reject(self, order: Order, reason: str):
+        order.status = "rejected"
+        order.reason = reason
+        order.updated_at = time.time()
+        logger.warning(f"Rejected order {order.client_order_id}: {reason}")
+        self.emit(order)
+
+    def cancel(self, client_order_id: str) -> Optional[Order]:
+        order = self.orders.get(client_order_id)
+        if order is None or order.is_done:
+            return order
+        order.status = "cancelled"
+        order.updated_at = time.time()
+        self.emit(order)
+        return order
+
+    def on_price(self, exchange: str, symbol: str, price: float, source: str = SOURCE_LIVE):
+        """Feed hook, fills resting paper orders the new price has crossed"""
+        if price <= 0:
+            return
+        self.emit_fills(self.engine.on_price(exchange.lower(), symbol, price, source))
+
+    def get(self, client_order_id: str) -> Optional[Order]:
+        return self.orders.get(client_order_id)
+
+    def for_session(self, session_id: str) -> List[Order]:
+        return [self.orders[oid] for oid in self.session_orders.get(session_id, [])]
@@ -0,0 +1,140 @@
+import logging
+import re
+import time
+import zlib
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# where a quoted price came from
+SOURCE_LIVE = "live"              # fetched from the exchange for this request
+SOURCE_CACHED = "cached"          # read from a recent whole-exchange ticker snapshot
+SOURCE_SIMULATED = "simulated"    # exchange unreachable, from the mock engine
+SOURCE_UNAVAILABLE = "unavailable"
+
+# rough USD anchors for mock prices, also used by the fake exchange simulator
+BASE_PRICES = {
+    "BTC": 45000.0, "ETH": 3000.0, "BNB": 300.0, "XRP": 0.6, "LTC": 150.0, "ADA": 0.5, "DOT": 25.0,
+    "LINK": 18.0, "BCH": 400.0, "EOS": 3.0, "TRX": 0.1, "XLM": 0.12, "DOGE": 0.08, "CHZ": 0.1,
+    "NEO": 35.0, "QTUM": 8.0, "SNT": 0.05, "BNT": 2.0, "GAS": 12.0, "SOL": 100.0, "AVAX": 35.0,
+    "MATIC": 0.9, "UNI": 6.0, "ATOM": 10.0
+}
+USD_QUOTES = {"USDT": 1.0, "USDC": 1.0, "USD": 1.0}
+QUOTE_ASSETS = ("USDT", "USDC", "USD", "BTC", "ETH", "BNB")
+
+_separators = re.compile(r"[-_/]")
+
+
+def _key(symbol: str) -> str:
+    return _separators.sub("", symbol.upper())
+
+
+class PriceQuote:
+    __slots__ = ("exchange", "symbol", "price", "source", "age")
+
+    def __init__(self, exchange: str, symbol: str, price: float, source: str, age: Optional[float] = 0.0):
+        self.exchange = exchange
+        self.symbol = symbol
+        self.price = price
+        self.source = source
+        self.age = age   # seconds since the price was observed, None if unknown
+
+    @property
+    def live(self) -> bool:
+        return self.source in (SOURCE_LIVE, SOURCE_CACHED)
+
+    def to_dict(self) -> Dict:
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+
+def split_symbol(symbol: str) -> Tuple[str, str]:
+    """(base, quote) of BTC-USDT, BTCUSDT, ETH_BTC or BTC-PERPETUAL (quoted in USD)"""
+    symbol = symbol.upper().strip()
+    if _separators.search(symbol):
+        parts = _separators.split(symbol)
+        return parts[0], parts[1] if len(parts) > 1 and parts[1] in QUOTE_ASSETS else "USD"
+    for quote in QUOTE_ASSETS:
+        if symbol.endswith(quote) and len(symbol) > len(quote):
+            return symbol[:-len(quote)], quote
+    return symbol, "USD"
+
+
+class MockPriceEngine:
+    """Deterministic mock prices for when no exchange answers.
+
+    Every symbol gets its own mean-reverting (Ornstein-Uhlenbeck) path of log
+    deviations around an anchor price, seeded by (seed, symbol) and laid over
+    a repeating window of `horizon` steps of `step_seconds`. The path is bent
+    so its ends meet, so there is no jump when the window wraps. A price is a
+    function of (symbol, time) only: every session and every worker process
+    sees the same mock price at the same moment, and a lookup is an array read.
+    Paths are built in bulk, the recursion runs once per step for all pending
+    symbols together.
+    """
+
+    def __init__(self, seed: int = 0, step_seconds: float = 60.0, horizon: int = 1440,
+                 reversion: float = 0.02, volatility: float = 0.002):
+        self.seed = seed
+        self.step_seconds = step_seconds
+        self.horizon = horizon
+        self.reversion = reversion      # pull back towards the anchor per step
+        self.volatility = volatility    # log-price shock per step
+        self.anchors: Dict[str, float] = {}
+        self.paths: Dict[str, np.ndarray] = {}
+        self.served = 0
+
+    def _rng(self, key: str) -> np.random.Generator:
+        return np.random.default_rng([self.seed, zlib.crc32(key.encode())])
+
+    def _usd(self, asset: str) -> float:
+        if asset in USD_QUOTES:
+            return USD_QUOTES[asset]
+        if asset in BASE_PRICES:
+            return BASE_PRICES[asset]
+        # unknown coins get a stable made-up price between 1 cent and 500 dollars
+        return float(np.exp(self._rng(asset).uniform(np.log(0.01), np.log(500.0))))
+
+    def prepare(self, symbols: Iterable[str]):
+        """Precompute paths for every symbol not seen yet, all in one vectorized pass"""
+        pending: List[str] = []
+        for symbol in symbols:
+            key = _key(symbol)
+            if key not in self.paths and key not in pending:
+                pending.append(key)
+                base, quote = split_symbol(symbol)
+                self.anchors[key] = self._usd(base) / self._usd(quote)
+        if not pending:
+            return
+
+        steps = self.horizon + 1
+        shocks = np.stack([self._rng(key).standard_normal(steps) for key in pending])
+        keep = 1.0 - self.reversion
+        paths = np.empty_like(shocks)
+        # start from the stationary distribution so the first step isn't special
+        paths[:, 0] = shocks[:, 0] * self.volatility / np.sqrt(1.0 - keep * keep)
+        for t in range(1, steps):
+            paths[:, t] = keep * paths[:, t - 1] + self.volatility * shocks[:, t]
+        # close the loop: spread the end-to-start gap linearly over the window
+        paths -= np.outer(paths[:, -1] - paths[:, 0], np.linspace(0.0, 1.0, steps))
+        multipliers = np.exp(paths)
+        for row, key in enumerate(pending):
+            self.paths[key] = multipliers[row]
+        logger.info(f"Precomputed mock price paths for {len(pending)} symbols")
+
+    def price(self, symbol: str, now: Optional[float] = None) -> float:
+        key = _key(symbol)
+        path = self.paths.get(key)
+        if path is None:
+            self.prepare([symbol])
+            path = self.paths[key]
+        position = (now if now is not None else time.time()) / self.step_seconds
+        step = int(position) % self.horizon
+        frac = position - int(position)
+        self.served += 1
+        price = self.anchors[key] * (path[step] + (path[step + 1] - path[step]) * frac)
+        return float(f"{price:.6g}")
+
+    def stats(self) -> Dict:
+        return {"symbols": len(self.paths), "served": self.served, "seed": self.seed}
@@ -0,0 +1,172 @@
+import asyncio
+import gc
+import logging
+import marshal
+import os
+import struct
+import time
+from operator import attrgetter, itemgetter
+from typing import Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 2
+
+# sessions gathered and encoded per event loop slice, about 1ms of work each
+SNAPSHOT_CHUNK = int(os.getenv("SESSION_SNAPSHOT_CHUNK", "500"))
+
+_frame_header = struct.Struct("<I")
+
+
+def _frame(payload: bytes) -> bytes:
+    return _frame_header.pack(len(payload)) + payload
+
+
+def _read_frames(data: bytes):
+    view = memoryview(data)
+    offset = 0
+    while offset < len(view):
+        (size,) = _frame_header.unpack_from(view, offset)
+        offset += _frame_header.size
+        yield view[offset:offset + size]
+        offset += size
+
+
+class SessionSnapshotter:
+    """Periodic and on-shutdown snapshots of the live call sessions.
+
+    The snapshot is columnar: one list per SessionState field, written with
+    marshal, which is several times faster than pickle for flat data. Both
+    gathering the columns and marshal hold the GIL, so a worker thread would
+    stall the event loop just the same; instead the sessions are encoded in
+    chunks of SNAPSHOT_CHUNK on the loop, yielding between chunks, and only
+    the file write and atomic replace run in a thread. The file is a header
+    frame followed by one length-prefixed marshal frame per chunk.
+    """
+
+    def __init__(self, path: str, sessions: Dict[str, Dict], state_factory: Callable,
+                 fields: Tuple[str, ...], interval: float = 30.0):
+        self.path = path
+        self.sessions = sessions
+        self.state_factory = state_factory
+        self.fields = fields
+        self.interval = interval
+        self.last_snapshot_at: Optional[float] = None
+        self.last_duration_ms: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def _encode(self, session_ids) -> bytes:
+        # sessions that ended since the key list was taken are skipped
+        session_ids = [sid for sid in session_ids if sid in self.sessions]
+        entries = list(map(self.sessions.__getitem__, session_ids))
+        states = [entry["state"] for entry in entries]
+        columns = {
+            "session_id": session_ids,
+            "user_name": list(map(itemgetter("user_name"), entries)),
+            "created_at": list(map(itemgetter("created_at"), entries))
+        }
+        for field in self.fields:
+            columns[field] = list(map(attrgetter(field), states))
+        return _frame(marshal.dumps(columns))
+
+    def _write(self, frames) -> int:
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.writelines(frames)
+            f.flush()
+            os.fsync(f.fileno())
+        # readers never see a half-written snapshot
+        os.replace(tmp_path, self.path)
+        return sum(map(len, frames))
+
+    async def snapshot(self):
+        start = time.perf_counter()
+        # keys only: 100k (id, entry) tuples would be enough allocations to set off a full gc pass
+        session_ids = list(self.sessions)
+        try:
+            frames = [_frame(marshal.dumps((SNAPSHOT_VERSION, time.time(), len(session_ids))))]
+            for offset in range(0, len(session_ids), SNAPSHOT_CHUNK):
+                frames.append(self._encode(session_ids[offset:offset + SNAPSHOT_CHUNK]))
+                # a session changed after its chunk was taken is picked up by the next snapshot
+                await asyncio.sleep(0)
+            size = await asyncio.to_thread(self._write, frames)
+            self.last_duration_ms = (time.perf_counter() - start) * 1000
+            self.last_snapshot_at = time.time()
+            logger.info(f"Snapshotted {len(session_ids)} sessions ({size} bytes) in {self.last_duration_ms:.1f}ms")
+        except Exception as e:
+            logger.error(f"Session snapshot failed: {str(e)}")
+
+    def restore(self) -> int:
+        """Load the last snapshot into the sessions dict, returns sessions restored"""
+        if not os.path.exists(self.path):
+            return 0
+        start = time.perf_counter()
+        # restore runs once before serving, building 100k objects would otherwise set off several full gc passes
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            try:
+                # marshal.load() on a file object reads value by value, one read() is far faster
+                with open(self.path, "rb") as f:
+                    frames = list(_read_frames(f.read()))
+                version, taken_at, count = marshal.loads(frames[0])
+            except Exception as e:
+                logger.error(f"Could not read session snapshot {self.path}: {str(e)}")
+                return 0
+            if version != SNAPSHOT_VERSION:
+                logger.warning(f"Ignoring session snapshot with version {version}")
+                return 0
+
+            # fields added to SessionState since the snapshot keep their defaults
+            template = self.state_factory(None)
+            state_class = type(template)
+            new_state = state_class.__new__
+            restored = 0
+            for frame in frames[1:]:
+                columns = marshal.loads(frame)
+                fields = [field for field in self.fields if field in columns]
+                keys = ("session_id", *fields)
+                missing = {key: value for key, value in vars(template).items() if key not in keys}
+                session_ids = columns["session_id"]
+                rows = zip(session_ids, *(columns[field] for field in fields))
+                for row, user_name, created_at in zip(rows, columns["user_name"], columns["created_at"]):
+                    state = new_state(state_class)
+                    if missing:
+                        state.__dict__.update(missing)
+                    state.__dict__.update(zip(keys, row))
+                    self.sessions[row[0]] = {"state": state, "user_name": user_name, "created_at": created_at}
+                restored += len(session_ids)
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+
+        logger.info(f"Restored {restored} sessions from snapshot in {(time.perf_counter() - start) * 1000:.1f}ms")
+        return restored
+
+    async def start(self):
+        if self.interval and self._task is None:
+            self._task = asyncio.create_task(self._snapshot_loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        # uvicorn turns SIGTERM into a graceful shutdown, so this is the on-SIGTERM snapshot
+        await self.snapshot()
+
+    async def _snapshot_loop(self):
+        while True:
+            try:
+                await asyncio.sleep(self.interval)
+                await self.snapshot()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Snapshot loop error: {str(e)}")
+
+    def stats(self) -> Dict:
+        return {
+            "path": self.path,
+            "last_snapshot_at": self.last_snapshot_at,
+            "last_duration_ms": self.last_duration_ms
+        }
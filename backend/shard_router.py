@@ -0,0 +1,420 @@
+"""Sharded deployment: N API worker processes behind a session-affinity router.
+
+    python shard_router.py --workers 4 --port 8000
+
+Every request that names a session (or an order / trigger / trace id minted
+by a worker) is sent to worker shard_for(id), so active_sessions, the
+websocket gateway, order books and caches stay process-local and lock-free.
+Requests without an id (start_call, market data) are spread round-robin; a
+worker mints session ids that hash back to itself. Per-worker views (health,
+metrics, trace lists) go to worker 0 unless ?shard=N picks another one, and
+order book reads are sent to every worker and merged. The router only parses
+HTTP/1.1 framing and relays bytes, websocket upgrades become a plain byte
+pipe, and it can run as several SO_REUSEPORT processes (--routers).
+
+Bulk tickers are ingested once by a feeder process and shared with the
+workers through SharedMarketData (shared memory), the feeder is also the only
+process recording snapshot ticks. Each worker records the per-symbol prices it
+fetches itself into its own tick directory (TICK_DIR.shard-N).
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import re
+import signal
+import socket
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+from sharding import shard_for
+
+logger = logging.getLogger(__name__)
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# the first path segment after these prefixes is the routing id
+_routed_path = re.compile(rb"^/(?:bland_webhook|end_call|ws|sessions|orders|triggers|debug/traces)/([^/?#\s]+)")
+# answered from one worker's own state, so repeated calls must reach the same worker
+_pinned_path = re.compile(rb"^/(?:health|metrics|debug/traces)(?:[?#]|$)")
+# every worker matches its own sessions' paper orders, so the book is the union of all of them
+_merged_path = re.compile(rb"^/orderbook/[^/?#\s]+/[^/?#\s]+(?:[?#]|$)")
+_shard_param = re.compile(rb"[?&]shard=(\d+)")
+_session_param = re.compile(rb"[?&]session_id=([^&#\s]+)")
+_session_field = re.compile(rb'"session_id"\s*:\s*"([^"]+)"')
+
+_NO_BODY_STATUS = {204, 304}
+
+
+class ShardRouter:
+    """Byte-level HTTP/1.1 router pinning each session to one worker"""
+
+    def __init__(self, upstreams: List[Tuple[str, int]], connect_timeout: float = 5.0):
+        self.upstreams = upstreams
+        self.connect_timeout = connect_timeout
+        self._round_robin = itertools.cycle(range(len(upstreams)))
+        self.requests = 0
+        self.upgrades = 0
+        self.errors = 0
+
+    def pick(self, target: bytes, body: bytes) -> int:
+        pinned = _shard_param.search(target)
+        if pinned:
+            return int(pinned.group(1)) % len(self.upstreams)
+        match = _routed_path.match(target) or _session_param.search(target) or (body and _session_field.search(body))
+        if match:
+            return shard_for(match.group(1).decode(errors="replace"), len(self.upstreams))
+        if _pinned_path.match(target):
+            return 0
+        return next(self._round_robin)
+
+    async def _connect(self, shard: int) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        host, port = self.upstreams[shard]
+        return await asyncio.wait_for(asyncio.open_connection(host, port), self.connect_timeout)
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        # one upstream connection per worker per client connection, reused across keep-alive requests
+        upstream: Dict[int, Tuple[asyncio.StreamReader, asyncio.StreamWriter]] = {}
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                request_line, headers = _parse_head(head)
+                parts = request_line.split(b" ")
+                if len(parts) != 3:
+                    writer.write(b"HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+                    break
+                method, target, _ = parts
+
+                chunked = b"chunked" in headers.get(b"transfer-encoding", b"").lower()
+                body = b""
+                if not chunked and headers.get(b"content-length"):
+                    body = await reader.readexactly(int(headers[b"content-length"]))
+                self.requests += 1
+                if method == b"GET" and _merged_path.match(target) and not _shard_param.search(target):
+                    try:
+                        writer.write(await self._merged_book(head, upstream))
+                    except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError) as e:
+                        self.errors += 1
+                        logger.error(f"Order book merge failed: {str(e)}")
+                        writer.write(b"HTTP/1.1 502 Bad Gateway\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+                        break
+                    await writer.drain()
+                    if headers.get(b"connection", b"").lower() == b"close":
+                        break
+                    continue
+                shard = self.pick(target, body)
+
+                try:
+                    if shard not in upstream:
+                        upstream[shard] = await self._connect(shard)
+                    up_reader, up_writer = upstream[shard]
+                except (OSError, asyncio.TimeoutError):
+                    self.errors += 1
+                    writer.write(b"HTTP/1.1 503 Service Unavailable\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+                    break
+
+                up_writer.write(head + body)
+                if chunked or b"upgrade" in headers.get(b"connection", b"").lower():
+                    # websocket upgrades (and the rare chunked upload) become a plain byte pipe for the rest of the connection
+                    self.upgrades += 1
+                    await _pipe_both(reader, writer, up_reader, up_writer)
+                    break
+                await up_writer.drain()
+
+                keep_alive = await _relay_response(up_reader, writer, method == b"HEAD")
+                await writer.drain()
+                if not keep_alive or headers.get(b"connection", b"").lower() == b"close":
+                    break
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Router connection error: {str(e)}")
+        finally:
+            for _, up_writer in upstream.values():
+                up_writer.close()
+            writer.close()
+
+    async def _merged_book(self, head: bytes, upstream: Dict) -> bytes:
+        """Ask every worker for its paper book and merge the levels into one response"""
+        async def fetch(shard: int) -> bytes:
+            if shard not in upstream:
+                upstream[shard] = await self._connect(shard)
+            up_reader, up_writer = upstream[shard]
+            up_writer.write(head)
+            await up_writer.drain()
+            response = _Buffer()
+            if not await _relay_response(up_reader, response, False):
+                upstream.pop(shard)[1].close()
+            return bytes(response.data)
+
+        responses = await asyncio.gather(*(fetch(shard) for shard in range(len(self.upstreams))))
+        books = []
+        for response in responses:
+            response_head, _, body = response.partition(b"\r\n\r\n")
+            if int(response_head.split(b" ")[1]) != 200:
+                # an error from any worker is passed through as is
+                return response
+            books.append(json.loads(body))
+        payload = json.dumps(merge_books(books)).encode()
+        return (b"HTTP/1.1 200 OK\r\ncontent-type: application/json\r\n"
+                b"content-length: " + str(len(payload)).encode() + b"\r\n\r\n" + payload)
+
+    async def serve(self, host: str, port: int, reuse_port: bool = False):
+        server = await asyncio.start_server(self.handle, host, port, reuse_port=reuse_port, backlog=2048)
+        logger.info(f"Routing {host}:{port} to {len(self.upstreams)} workers")
+        async with server:
+            await server.serve_forever()
+
+
+class _Buffer:
+    """Collects a relayed response instead of writing it to a socket"""
+
+    def __init__(self):
+        self.data = bytearray()
+
+    def write(self, chunk: bytes):
+        self.data += chunk
+
+    async def drain(self):
+        pass
+
+
+def merge_books(books: List[Dict], levels: int = 5) -> Dict:
+    """Union of the workers' OrderBook.depth() views, best levels first"""
+    bids = sorted((level for book in books for level in book["bids"]), key=lambda level: -level[0])
+    asks = sorted((level for book in books for level in book["asks"]), key=lambda level: level[0])
+    last_prices = [book["last_price"] for book in books if book["last_price"] is not None]
+    return {
+        # workers mark their books independently, the first one that has a price stands for all of them
+        "last_price": last_prices[0] if last_prices else None,
+        "bids": bids[:levels],
+        "asks": asks[:levels]
+    }
+
+
+def _parse_head(head: bytes) -> Tuple[bytes, Dict[bytes, bytes]]:
+    lines = head.split(b"\r\n")
+    headers = {}
+    for line in lines[1:]:
+        name, sep, value = line.partition(b":")
+        if sep:
+            headers[name.strip().lower()] = value.strip()
+    return lines[0], headers
+
+
+async def _relay_response(up_reader: asyncio.StreamReader, writer: asyncio.StreamWriter, head_only: bool) -> bool:
+    """Copy one response to the client, returns whether the connection can be reused"""
+    head = await up_reader.readuntil(b"\r\n\r\n")
+    status_line, headers = _parse_head(head)
+    writer.write(head)
+    status = int(status_line.split(b" ")[1])
+    keep_alive = headers.get(b"connection", b"").lower() != b"close"
+
+    if head_only or status in _NO_BODY_STATUS or 100 <= status < 200:
+        return keep_alive
+    if headers.get(b"content-length") is not None:
+        remaining = int(headers[b"content-length"])
+        while remaining:
+            chunk = await up_reader.read(min(remaining, 65536))
+            if not chunk:
+                return False
+            writer.write(chunk)
+            remaining -= len(chunk)
+        return keep_alive
+    if b"chunked" in headers.get(b"transfer-encoding", b"").lower():
+        while True:
+            size_line = await up_reader.readuntil(b"\r\n")
+            writer.write(size_line)
+            size = int(size_line.split(b";")[0], 16)
+            if size == 0:
+                # trailers end with an empty line
+                while True:
+                    line = await up_reader.readuntil(b"\r\n")
+                    writer.write(line)
+                    if line == b"\r\n":
+                        return keep_alive
+            writer.write(await up_reader.readexactly(size + 2))
+            await writer.drain()
+    # no framing: the body runs until the worker closes
+    while True:
+        chunk = await up_reader.read(65536)
+        if not chunk:
+            return False
+        writer.write(chunk)
+
+
+async def _pipe_both(reader, writer, up_reader, up_writer):
+    async def pipe(source: asyncio.StreamReader, sink: asyncio.StreamWriter):
+        try:
+            while True:
+                chunk = await source.read(65536)
+                if not chunk:
+                    break
+                sink.write(chunk)
+                await sink.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            sink.close()
+
+    await asyncio.gather(pipe(reader, up_writer), pipe(up_reader, writer))
+
+
+def _interrupt(*_):
+    # SIGTERM takes the same clean shutdown path as Ctrl+C
+    raise KeyboardInterrupt
+
+
+# feeder process
+
+def run_feeder(shm_name: str, hot_seconds: float, refresh_interval: float):
+    from exchanges import ADAPTERS, EXCHANGES
+    from shared_market import SharedMarketData
+    from tick_store import TickRecorder, TickStore
+    from ticker_cache import NO_QUOTE, TickerCache
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - feeder - %(message)s')
+    signal.signal(signal.SIGTERM, _interrupt)
+
+    async def feed():
+        market = SharedMarketData.attach(shm_name, list(EXCHANGES))
+        cache = TickerCache(ADAPTERS)
+        recorder = TickRecorder(TickStore(os.getenv("TICK_DIR", "ticks")))
+
+        def record(exchange: str, prices: Dict[str, float]):
+            quotes = cache.quotes.get(exchange, {})
+            for symbol, price in prices.items():
+                recorder.record(exchange, symbol, price, *quotes.get(symbol, NO_QUOTE))
+
+        cache.add_listener(market.publish)
+        cache.add_listener(record)
+        await cache.start()
+        await recorder.start()
+        try:
+            while True:
+                await asyncio.sleep(0.05)
+                now = time.time()
+                # only what some worker asked for recently, each at most once per refresh_interval
+                due = [exchange for exchange in market.wanted(hot_seconds)
+                       if now - cache.updated_at.get(exchange, 0) >= refresh_interval]
+                if due:
+                    results = await asyncio.gather(*(cache.refresh(exchange) for exchange in due))
+                    for exchange, ok in zip(due, results):
+                        if not ok:
+                            market.mark_failed(exchange)
+        finally:
+            await cache.stop()
+            await recorder.stop()
+
+    try:
+        asyncio.run(feed())
+    except KeyboardInterrupt:
+        pass
+
+
+def run_router(upstreams: List[Tuple[str, int]], host: str, port: int, reuse_port: bool):
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - router - %(message)s')
+    signal.signal(signal.SIGTERM, _interrupt)
+    try:
+        asyncio.run(ShardRouter(upstreams).serve(host, port, reuse_port=reuse_port))
+    except KeyboardInterrupt:
+        pass
+
+
+# supervisor
+
+def _wait_for_port(host: str, port: int, timeout: float) -> bool:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection((host, port), timeout=0.5):
+                return True
+        except OSError:
+            time.sleep(0.1)
+    return False
+
+
+def _worker_env(index: int, workers: int, shm_name: str) -> Dict[str, str]:
+    env = dict(os.environ)
+    env.update({
+        "SHARD_INDEX": str(index),
+        "SHARD_COUNT": str(workers),
+        "MARKET_SHM_NAME": shm_name,
+        # everything a worker persists is per shard
+        "JOURNAL_DIR": os.path.join(os.getenv("JOURNAL_DIR", "journal"), f"shard-{index}"),
+        "SESSION_SNAPSHOT_PATH": f"{os.getenv('SESSION_SNAPSHOT_PATH', 'sessions.snapshot')}.shard-{index}"
+    })
+    return env
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the trading bot as session-sharded worker processes")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--routers", type=int, default=1, help="router processes sharing the port via SO_REUSEPORT")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--worker-base-port", type=int, default=8100)
+    parser.add_argument("--hot-seconds", type=float, default=60.0)
+    parser.add_argument("--refresh-interval", type=float, default=2.0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - supervisor - %(message)s')
+    sys.path.insert(0, BACKEND_DIR)
+    from exchanges import EXCHANGES
+    from shared_market import SharedMarketData
+
+    shm_name = f"tradingbot-market-{os.getpid()}"
+    market = SharedMarketData.create(shm_name, list(EXCHANGES))
+    children: List = []
+    try:
+        feeder = multiprocessing.Process(target=run_feeder, args=(shm_name, args.hot_seconds, args.refresh_interval), daemon=True)
+        feeder.start()
+        children.append(feeder)
+
+        upstreams = [("127.0.0.1", args.worker_base_port + i) for i in range(args.workers)]
+        for index, (host, port) in enumerate(upstreams):
+            children.append(subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "main:app", "--host", host, "--port", str(port), "--log-level", "warning"],
+                cwd=BACKEND_DIR, env=_worker_env(index, args.workers, shm_name)
+            ))
+        for host, port in upstreams:
+            if not _wait_for_port(host, port, 60):
+                raise RuntimeError(f"worker on port {port} did not come up")
+        logger.info(f"{args.workers} workers up, routing on {args.host}:{args.port}")
+
+        routers = [multiprocessing.Process(target=run_router, args=(upstreams, args.host, args.port, args.routers > 1))
+                   for _ in range(args.routers)]
+        for router in routers:
+            router.start()
+        children.extend(routers)
+
+        signal.signal(signal.SIGTERM, _interrupt)
+        while all((child.poll() is None) if isinstance(child, subprocess.Popen) else child.is_alive() for child in children):
+            time.sleep(0.5)
+        logger.error("A child process exited, shutting down")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        # workers get SIGTERM so they snapshot their sessions on the way out
+        for child in children:
+            child.terminate()
+        for child in children:
+            if isinstance(child, subprocess.Popen):
+                try:
+                    child.wait(timeout=15)
+                except subprocess.TimeoutExpired:
+                    child.kill()
+            else:
+                child.join(timeout=5)
+        market.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+import os
+import random
+import uuid
+import zlib
+
+# set by shard_router.py on every worker process, a plain `uvicorn main:app` is shard 0 of 1
+SHARD_INDEX = int(os.getenv("SHARD_INDEX", "0"))
+SHARD_COUNT = int(os.getenv("SHARD_COUNT", "1"))
+
+_HEX = set("0123456789abcdefABCDEF")
+
+
+def shard_for(key: str, shards: int) -> int:
+    """Worker owning an id: its last 8 hex digits mod shards (crc32 for ids that don't end in hex).
+
+    Using the tail means derived ids like "trigger-<id>" land on the same worker as <id>.
+    """
+    tail = key[-8:]
+    if len(tail) == 8 and set(tail) <= _HEX:
+        return int(tail, 16) % shards
+    return zlib.crc32(key.encode()) % shards
+
+
+def is_local(key: str) -> bool:
+    """Whether an id routes to this worker"""
+    return shard_for(key, SHARD_COUNT) == SHARD_INDEX
+
+
+def _owned_tail() -> str:
+    # a random 32-bit value moved onto this shard's residue class
+    value = random.getrandbits(32)
+    value = value - value % SHARD_COUNT + SHARD_INDEX
+    if value >= 1 << 32:
+        value -= SHARD_COUNT
+    return f"{value:08x}"
+
+
+def new_session_id() -> str:
+    """uuid4 string that routes back to this worker"""
+    session_id = str(uuid.uuid4())
+    return session_id if SHARD_COUNT == 1 else session_id[:-8] + _owned_tail()
+
+
+def local_id() -> str:
+    """uuid4 hex (order / trigger ids) that routes back to this worker"""
+    value = uuid.uuid4().hex
+    return value if SHARD_COUNT == 1 else value[:-8] + _owned_tail()
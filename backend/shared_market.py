@@ -0,0 +1,284 @@
+import asyncio
+import logging
+import time
+from multiprocessing import resource_tracker, shared_memory
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ticker_cache import TickerCache, compact_symbol
+
+logger = logging.getLogger(__name__)
+
+SYMBOL_BYTES = 24
+HEADER_FIELDS = 4      # seq, generation, count, capacity
+EXCHANGE_FIELDS = 3    # updated_at, wanted_at, failed_at
+UPDATED_AT, WANTED_AT, FAILED_AT = range(EXCHANGE_FIELDS)
+
+
+class SharedMarketData:
+    """Latest price of every (exchange, symbol) in one shared memory block.
+
+    One feeder process writes, every API worker reads; nobody fetches the
+    same ticker twice. Layout: an int64 header (seq, generation, count,
+    capacity), a float64 (exchange x updated_at/wanted_at/failed_at) table and
+    fixed-size columns for exchange index, symbol and price. Writes are
+    bracketed by an odd/even sequence counter (a seqlock) so readers retry
+    instead of seeing a half-applied snapshot; `generation` moves only when
+    symbols are added, so readers rebuild their symbol index rarely.
+    Workers set wanted_at for exchanges they need, the feeder only refreshes those.
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, exchanges: List[str], owner: bool = False):
+        self.shm = shm
+        self.exchanges = exchanges
+        self.exchange_index = {exchange: i for i, exchange in enumerate(exchanges)}
+        self.owner = owner
+        buf = shm.buf
+        self.header = np.ndarray((HEADER_FIELDS,), dtype=np.int64, buffer=buf)
+        capacity = int(self.header[3])
+        offset = HEADER_FIELDS * 8
+        self.times = np.ndarray((len(exchanges), EXCHANGE_FIELDS), dtype=np.float64, buffer=buf, offset=offset)
+        offset += len(exchanges) * EXCHANGE_FIELDS * 8
+        self.prices = np.ndarray((capacity,), dtype=np.float64, buffer=buf, offset=offset)
+        offset += capacity * 8
+        self.exchange_ids = np.ndarray((capacity,), dtype=np.int32, buffer=buf, offset=offset)
+        offset += capacity * 4
+        self.symbols = np.ndarray((capacity,), dtype=f"S{SYMBOL_BYTES}", buffer=buf, offset=offset)
+        self._generation = -1
+        self._slots: Dict[Tuple[int, bytes], int] = {}
+        self._by_exchange: Dict[int, Tuple[np.ndarray, List[str]]] = {}
+
+    @staticmethod
+    def _size(exchanges: List[str], capacity: int) -> int:
+        return HEADER_FIELDS * 8 + len(exchanges) * EXCHANGE_FIELDS * 8 + capacity * (8 + 4 + SYMBOL_BYTES)
+
+    @classmethod
+    def create(cls, name: str, exchanges: List[str], capacity: int = 16384) -> "SharedMarketData":
+        shm = shared_memory.SharedMemory(name=name, create=True, size=cls._size(exchanges, capacity))
+        header = np.ndarray((HEADER_FIELDS,), dtype=np.int64, buffer=shm.buf)
+        header[:] = (0, 0, 0, capacity)
+        del header
+        return cls(shm, exchanges, owner=True)
+
+    @classmethod
+    def attach(cls, name: str, exchanges: List[str]) -> "SharedMarketData":
+        shm = shared_memory.SharedMemory(name=name)
+        # attaching registers the block with this process's resource tracker, which would unlink it on exit
+        resource_tracker.unregister(shm._name, "shared_memory")
+        return cls(shm, exchanges)
+
+    def close(self):
+        # numpy views must go before the buffer can be released
+        self.header = self.times = self.prices = self.exchange_ids = self.symbols = None
+        self._by_exchange = {}
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+    # writer side (feeder process)
+
+    def publish(self, exchange: str, prices: Dict[str, float]):
+        index = self.exchange_index.get(exchange)
+        if index is None or not prices:
+            return
+        if self._generation != int(self.header[1]):
+            self._rebuild()
+        header = self.header
+        header[0] += 1   # odd: write in progress
+        try:
+            capacity = int(header[3])
+            count = int(header[2])
+            added = 0
+            slots = np.empty(len(prices), dtype=np.int64)
+            values = np.empty(len(prices), dtype=np.float64)
+            used = 0
+            for symbol, price in prices.items():
+                key = (index, symbol.encode()[:SYMBOL_BYTES])
+                slot = self._slots.get(key)
+                if slot is None:
+                    if count >= capacity:
+                        continue
+                    slot = self._slots[key] = count
+                    self.exchange_ids[slot] = index
+                    self.symbols[slot] = key[1]
+                    count += 1
+                    added += 1
+                slots[used] = slot
+                values[used] = price
+                used += 1
+            self.prices[slots[:used]] = values[:used]
+            if added:
+                header[2] = count
+                header[1] += 1
+                self._generation = int(header[1])
+                self._by_exchange = {}
+            self.times[index, UPDATED_AT] = time.time()
+        finally:
+            header[0] += 1   # even again
+        if used < len(prices):
+            logger.warning(f"Shared market table full, dropped {len(prices) - used} {exchange} symbols")
+
+    def mark_failed(self, exchange: str):
+        index = self.exchange_index.get(exchange)
+        if index is not None:
+            self.times[index, FAILED_AT] = time.time()
+
+    def wanted(self, within: float) -> List[str]:
+        now = time.time()
+        return [exchange for exchange, i in self.exchange_index.items() if now - self.times[i, WANTED_AT] < within]
+
+    # reader side (API workers)
+
+    def want(self, exchange: str):
+        index = self.exchange_index.get(exchange)
+        if index is not None:
+            self.times[index, WANTED_AT] = time.time()
+
+    def updated_at(self, exchange: str) -> float:
+        index = self.exchange_index.get(exchange)
+        return float(self.times[index, UPDATED_AT]) if index is not None else 0.0
+
+    def failed_at(self, exchange: str) -> float:
+        index = self.exchange_index.get(exchange)
+        return float(self.times[index, FAILED_AT]) if index is not None else 0.0
+
+    def _rebuild(self):
+        generation = int(self.header[1])
+        count = int(self.header[2])
+        self._slots = dict(zip(zip(self.exchange_ids[:count].tolist(), self.symbols[:count].tolist()), range(count)))
+        self._by_exchange = {}
+        self._generation = generation
+
+    def _read(self, read):
+        # seqlock read: retry while a write is in progress or happened during the read
+        for _ in range(1000):
+            seq = int(self.header[0])
+            if seq & 1:
+                time.sleep(0)
+                continue
+            if self._generation != int(self.header[1]):
+                self._rebuild()
+            value = read()
+            if int(self.header[0]) == seq:
+                return value
+        return read()
+
+    def lookup(self, exchange: str, symbol: str) -> Optional[float]:
+        index = self.exchange_index.get(exchange)
+        if index is None:
+            return None
+
+        def read():
+            slot = self._slots.get((index, symbol.encode()[:SYMBOL_BYTES]))
+            return float(self.prices[slot]) if slot is not None else None
+        return self._read(read)
+
+    def snapshot(self, exchange: str) -> Dict[str, float]:
+        """{symbol: price} of one exchange"""
+        index = self.exchange_index.get(exchange)
+        if index is None:
+            return {}
+
+        def read():
+            rows = self._by_exchange.get(index)
+            if rows is None:
+                count = int(self.header[2])
+                slots = np.flatnonzero(self.exchange_ids[:count] == index)
+                rows = self._by_exchange[index] = (slots, [s.decode() for s in self.symbols[slots].tolist()])
+            slots, names = rows
+            return dict(zip(names, self.prices[slots].tolist()))
+        return self._read(read)
+
+    def stats(self) -> Dict:
+        return {"symbols": int(self.header[2]), "capacity": int(self.header[3]), "generation": int(self.header[1])}
+
+
+class SharedTickerCache(TickerCache):
+    """TickerCache for shard workers: snapshots come from the feeder through SharedMarketData.
+
+    A stale exchange is requested by marking it wanted and waiting (up to
+    `wait` seconds) for the feeder to publish; new snapshots are handed to the
+    same listeners as a local refresh would.
+    """
+
+    def __init__(self, adapters: Dict, market: SharedMarketData, wait: float = 2.0,
+                 poll_interval: float = 0.25, **kwargs):
+        super().__init__(adapters, **kwargs)
+        self.market = market
+        self.wait = wait
+        self.poll_interval = poll_interval
+        self._seen: Dict[str, float] = {}
+
+    async def start(self):
+        self._task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    def lookup(self, exchange: str, symbol: str, max_age: Optional[float] = None) -> Optional[float]:
+        exchange = exchange.lower()
+        age = self.age(exchange)
+        if age is None or age > (max_age if max_age is not None else self.max_age):
+            return None
+        return self.market.lookup(exchange, compact_symbol(symbol))
+
+    def age(self, exchange: str) -> Optional[float]:
+        updated_at = self.market.updated_at(exchange.lower())
+        return time.time() - updated_at if updated_at else None
+
+    async def refresh(self, exchange: str) -> bool:
+        exchange = exchange.lower()
+        if exchange not in self.market.exchange_index:
+            return False
+        started = time.time()
+        self.market.want(exchange)
+        # the feeder just failed on this exchange, don't wait for it
+        if started - self.market.failed_at(exchange) < self.retry_after:
+            return False
+        while time.time() - started < self.wait:
+            if self.market.updated_at(exchange) >= started:
+                self.refreshes += 1
+                return True
+            if self.market.failed_at(exchange) >= started:
+                self.failures += 1
+                return False
+            await asyncio.sleep(0.02)
+        return False
+
+    async def _refresh_loop(self):
+        while True:
+            try:
+                await asyncio.sleep(self.poll_interval)
+                now = time.time()
+                for exchange, at in self.last_lookup.items():
+                    if now - at < self.hot_seconds:
+                        self.market.want(exchange)
+                for source in self.warm_sources:
+                    for exchange in source():
+                        self.market.want(exchange)
+
+                # hand every new snapshot to the listeners (bars, triggers, order books)
+                for exchange in self.market.exchanges:
+                    updated_at = self.market.updated_at(exchange)
+                    if not updated_at or updated_at == self._seen.get(exchange):
+                        continue
+                    self._seen[exchange] = updated_at
+                    prices = self.market.snapshot(exchange)
+                    self.snapshots[exchange] = prices
+                    for listener in self.listeners:
+                        try:
+                            listener(exchange, prices)
+                        except Exception as e:
+                            logger.error(f"Ticker snapshot listener failed: {str(e)}")
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Shared ticker loop error: {str(e)}")
+
+    def stats(self) -> Dict:
+        stats = super().stats()
+        stats["shared"] = self.market.stats()
+        return stats
@@ -0,0 +1,77 @@
+import asyncio
+
+from admission import PRIORITY_NEW_CALL, PRIORITY_TURN, SHED_QUEUE_FULL, SHED_TIMEOUT, AdmissionController
+
+
+def test_limit_grows_additively_and_backs_off_multiplicatively():
+    controller = AdmissionController(initial_limit=10, target_latency=1.0, backoff=0.5)
+    controller.in_flight = 10
+    controller.release(0.1)
+    assert abs(controller.limit - 10.1) < 1e-9
+
+    controller.in_flight = 10
+    controller.release(5.0)
+    assert abs(controller.limit - 5.05) < 1e-9
+    # a second slow request in the same latency window doesn't cut again
+    controller.in_flight = 5
+    controller.release(5.0, ok=False)
+    assert abs(controller.limit - 5.05) < 1e-9
+    assert controller.increases == 1 and controller.decreases == 1
+
+
+def test_idle_limit_does_not_grow_and_stays_above_the_floor():
+    controller = AdmissionController(initial_limit=10, min_limit=4, target_latency=1.0, backoff=0.1)
+    controller.in_flight = 1
+    controller.release(0.1)
+    assert controller.limit == 10
+    controller.in_flight = 1
+    controller.release(2.0)
+    assert controller.limit == 4
+
+
+def test_over_limit_requests_queue_then_shed():
+    async def run():
+        controller = AdmissionController(initial_limit=1, min_limit=1, queue_timeout=0.05, max_queue=1)
+        assert await controller.acquire(PRIORITY_TURN)
+        waiting = asyncio.create_task(controller.acquire(PRIORITY_TURN))
+        await asyncio.sleep(0)
+        # the queue is full, the next one is shed at once
+        assert not await controller.acquire(PRIORITY_TURN)
+        # the waiter runs out of time too
+        assert not await waiting
+        return controller
+
+    controller = asyncio.run(run())
+    assert controller.shed[(PRIORITY_TURN, SHED_QUEUE_FULL)] == 1
+    assert controller.shed[(PRIORITY_TURN, SHED_TIMEOUT)] == 1
+
+
+def test_turns_get_freed_slots_before_new_calls():
+    async def run():
+        controller = AdmissionController(initial_limit=2, min_limit=1, queue_timeout=1.0, new_call_share=1.0)
+        assert await controller.acquire(PRIORITY_TURN)
+        assert await controller.acquire(PRIORITY_TURN)
+        new_call = asyncio.create_task(controller.acquire(PRIORITY_NEW_CALL))
+        await asyncio.sleep(0)
+        turn = asyncio.create_task(controller.acquire(PRIORITY_TURN))
+        await asyncio.sleep(0)
+
+        controller.release(0.1)
+        await asyncio.sleep(0.01)
+        assert turn.done() and turn.result()
+        assert not new_call.done()
+        controller.release(0.1)
+        assert await new_call
+
+    asyncio.run(run())
+
+
+def test_new_calls_are_capped_at_their_share():
+    async def run():
+        controller = AdmissionController(initial_limit=10, queue_timeout=0.01, new_call_share=0.5)
+        admitted = [await controller.acquire(PRIORITY_NEW_CALL) for _ in range(6)]
+        assert admitted == [True] * 5 + [False]
+        # turns can still use the rest of the limit
+        assert await controller.acquire(PRIORITY_TURN)
+
+    asyncio.run(run())
@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+
+from bars import DAY_SECONDS, BarAggregator
+
+T0 = 1_700_000_100   # not on a bar boundary
+
+
+def test_ticks_roll_into_bars():
+    bars = BarAggregator()
+    bars.update("okx", "BTCUSDT", 100.0, ts=T0)
+    bars.update("okx", "BTCUSDT", 105.0, ts=T0 + 10)
+    bars.update("okx", "BTCUSDT", 95.0, ts=T0 + 20)
+    bars.update("okx", "BTCUSDT", 101.0, ts=T0 + 70)   # next minute closes the first bar
+
+    minute = bars.bars("okx", "BTCUSDT", "1m")
+    assert [(b["open"], b["high"], b["low"], b["close"], b["volume"]) for b in minute] == [
+        (100.0, 105.0, 95.0, 95.0, 3.0),
+        (101.0, 101.0, 101.0, 101.0, 1.0),
+    ]
+    assert minute[1]["start"] - minute[0]["start"] == 60
+    assert len(bars.bars("okx", "BTCUSDT", "1s")) == 4
+
+
+def test_ring_keeps_only_capacity_bars():
+    bars = BarAggregator()
+    for i in range(200):
+        bars.update("okx", "BTCUSDT", 100.0 + i, ts=T0 + i)
+    second = bars.bars("okx", "BTCUSDT", "1s", limit=1000)
+    assert len(second) == 121   # 120 finished + the one in progress
+    assert second[-1]["close"] == 299.0
+    assert [b["start"] for b in second] == sorted(b["start"] for b in second)
+
+
+def test_snapshots_only_update_tracked_symbols():
+    bars = BarAggregator()
+    bars.update("okx", "BTCUSDT", 100.0, ts=T0)
+    bars.update_many([("okx", "BTCUSDT", 101.0, 1.0), ("okx", "ETHUSDT", 3000.0, 1.0)], ts=T0 + 1)
+    assert bars.keys == [("okx", "BTCUSDT")]
+    assert bars.bars("okx", "BTCUSDT", "1s")[-1]["close"] == 101.0
+
+
+def test_rolling_indicators_match_a_full_scan():
+    rng = np.random.default_rng(7)
+    bars = BarAggregator()
+    ts = T0
+    price = 100.0
+    # a bit over two days of ticks, so bars fall out of the 24h ring many times
+    while ts < T0 + 2 * DAY_SECONDS + 3600:
+        price *= float(np.exp(rng.normal(0, 0.002)))
+        bars.update("okx", "BTCUSDT", price, ts=ts)
+        ts += int(rng.integers(30, 200))
+
+    series = bars.series["5m"]
+    rows = np.array([0])
+    rolling = bars._indicators(rows, ts)[0]
+    scanned, since = bars._scan(series, rows, ts - DAY_SECONDS)
+    expected = dict(zip(["last", "change_24h_pct", "vwap_24h", "volatility_24h_pct", "high_24h", "low_24h"], scanned[0]))
+    for name, value in expected.items():
+        assert rolling[name] == pytest.approx(value, rel=1e-9), name
+    assert rolling["since"] == since[0]
+
+
+def test_stale_rings_fall_back_to_the_window():
+    bars = BarAggregator()
+    bars.update("okx", "BTCUSDT", 100.0, ts=T0)
+    bars.update("okx", "BTCUSDT", 200.0, ts=T0 + 600)
+    # a day later only the newest bar is inside the window
+    bars.update("okx", "BTCUSDT", 210.0, ts=T0 + DAY_SECONDS + 300)
+    indicators = bars.indicators_for("okx", "BTCUSDT", now=T0 + DAY_SECONDS + 310)
+    assert indicators["change_24h_pct"] == pytest.approx(5.0)
+    assert indicators["low_24h"] == 200.0
+    assert bars.indicators_for("okx", "BTCUSDT", now=T0 + 3 * DAY_SECONDS) is None
+
+
+def test_new_symbols_are_backfilled_from_history():
+    ts = (T0 + np.arange(0, 3600, 10)) * 1_000_000_000
+    last = 100.0 + np.arange(len(ts), dtype=np.float64)
+    calls = []
+
+    def history(exchange, symbol, start_ns):
+        calls.append((exchange, symbol))
+        return {"ts": ts, "last": last}
+
+    bars = BarAggregator(history=history)
+    minute = bars.bars("okx", "BTCUSDT", "1m", limit=1000)
+    assert calls == [("okx", "BTCUSDT")]
+    assert minute[0]["open"] == 100.0 and minute[-1]["close"] == last[-1]
+    assert sum(b["volume"] for b in minute) == len(ts)
+    indicators = bars.indicators_for("okx", "BTCUSDT", now=T0 + 3600)
+    assert indicators["vwap_24h"] == pytest.approx(last.mean())
+    # already tracked, no second backfill
+    bars.update("okx", "BTCUSDT", 1000.0, ts=T0 + 3600)
+    assert calls == [("okx", "BTCUSDT")]
@@ -0,0 +1,51 @@
+from exchange_adapters import ExchangeAdapter, build_adapters
+from exchanges import EXCHANGES
+from instruments import KIND_FUTURE, KIND_PERPETUAL, Instrument, InstrumentRegistry
+
+
+def adapters():
+    return build_adapters(EXCHANGES, InstrumentRegistry())
+
+
+def test_symbols_map_to_each_exchange_spelling():
+    built = adapters()
+    assert built["bybit"].to_native("BTC-USDT") == "BTCUSDT"
+    assert built["binance"].to_native("eth-btc") == "ETHBTC"
+    assert built["okx"].to_native("BTCUSDT") == "BTC-USDT"
+    assert built["bybit"].to_canonical("ETHBTC") == "ETH-BTC"
+
+
+def test_listing_overrides_guesses():
+    built = adapters()
+    bybit = built["bybit"]
+    bybit.registry.load("bybit", bybit.parse_instruments({"result": {"list": [
+        {"symbol": "PEPEUSDT", "baseCoin": "PEPE", "quoteCoin": "USDT"}
+    ]}}))
+    assert bybit.to_canonical("PEPEUSDT") == "PEPE-USDT"
+
+
+def test_deribit_guesses_kinds():
+    deribit = adapters()["deribit"]
+    assert deribit.instrument("BTC-PERPETUAL").kind == KIND_PERPETUAL
+    future = deribit.instrument("BTC-29SEP23")
+    assert future.kind == KIND_FUTURE and future.expiry == "2023-09-29"
+    assert deribit.to_native("btc_usdc") == "BTC_USDC"
+
+
+def test_price_urls_and_parsing():
+    built = adapters()
+    assert built["bybit"].price_url("BTCUSDT").endswith("/v5/market/tickers?category=spot&symbol=BTCUSDT")
+    assert built["okx"].parse_price({"data": [{"last": "45000"}]}, "BTC-USDT") == 45000.0
+    assert built["deribit"].parse_price({"result": {"last_price": 45000.5}}, "BTC-PERPETUAL") == 45000.5
+
+
+def test_bulk_endpoints_come_from_the_adapter():
+    built = adapters()
+    assert len(built["deribit"].bulk_ticker_urls) == 2
+    assert built["okx"].bulk_ticker_urls[0].startswith(EXCHANGES["okx"]["base_url"])
+    # an exchange without a registered adapter has no bulk snapshot
+    generic = ExchangeAdapter("kraken", {"name": "Kraken", "base_url": "https://api.kraken.com",
+                                         "price_endpoint": "/0/public/Ticker", "symbols_endpoint": "/0/public/AssetPairs"},
+                              InstrumentRegistry())
+    assert generic.bulk_ticker_urls == []
+    assert isinstance(generic.guess("XBT-USD"), Instrument)
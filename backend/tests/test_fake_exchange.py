@@ -0,0 +1,44 @@
+import math
+
+from fastapi.testclient import TestClient
+
+import fake_exchange
+from exchange_adapters import build_adapters
+from exchanges import EXCHANGES
+from fake_exchange import MarketSimulator
+from instruments import InstrumentRegistry
+
+
+def test_simulator_lists_each_pair_under_every_exchange_spelling():
+    sim = MarketSimulator(symbols=50, seed=1)
+    i = sim.find("okx", "BTC-USDT")
+    assert i is not None and sim.find("bybit", "btcusdt") == i and sim.find("deribit", "BTC-PERPETUAL") == i
+    before = sim.prices.copy()
+    sim.step(sim.updated_at + 60)
+    assert (sim.prices > 0).all() and not (sim.prices == before).all()
+    assert (sim.high >= sim.prices).all() and (sim.low <= sim.prices).all()
+
+
+def test_bulk_tickers_parse_through_the_adapters():
+    client = TestClient(fake_exchange.app)
+    adapters = build_adapters(EXCHANGES, InstrumentRegistry())
+    for exchange, path in (("okx", "/okx/api/v5/market/tickers?instType=SPOT"),
+                           ("bybit", "/bybit/v5/market/tickers?category=spot")):
+        response = client.get(path)
+        prices, quotes = adapters[exchange].parse_ticker_quotes(response.content)
+        assert len(prices) == len(fake_exchange.simulator.listed(exchange))
+        bid, ask = quotes["BTCUSDT"]
+        assert not math.isnan(bid) and bid < prices["BTCUSDT"] < ask
+
+
+def test_fault_injection():
+    client = TestClient(fake_exchange.app)
+    try:
+        client.post("/_sim/faults", json={"error_rate": 1.0})
+        assert client.get("/binance/api/v3/ticker/price").status_code == 500
+        client.post("/_sim/faults", json={"error_rate": 0.0, "rate_limit_rate": 1.0})
+        response = client.get("/binance/api/v3/ticker/price")
+        assert response.status_code == 429 and response.headers["Retry-After"] == "1"
+    finally:
+        fake_exchange.faults.configure(error_rate=0.0, rate_limit_rate=0.0)
+    assert client.get("/binance/api/v3/ticker/price").status_code == 200
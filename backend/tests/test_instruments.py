@@ -0,0 +1,40 @@
+from instruments import Instrument, InstrumentRegistry, parse_expiry
+
+
+def registry():
+    instruments = InstrumentRegistry()
+    instruments.add_aliases({"BTC": ["bitcoin", "bit coin"], "ETH": ["ethereum"]})
+    instruments.load("bybit", [Instrument("bybit", "BTCUSDT", "BTC", "USDT"),
+                               Instrument("bybit", "ETHBTC", "ETH", "BTC"),
+                               Instrument("bybit", "ETHUSDT", "ETH", "USDT")])
+    return instruments
+
+
+def test_any_spelling_finds_the_instrument():
+    instruments = registry()
+    for spelling in ("BTCUSDT", "btc-usdt", "BTC_USDT"):
+        assert instruments.get("bybit", spelling).canonical == "BTC-USDT"
+    assert instruments.get("okx", "BTC-USDT") is None
+
+
+def test_lookups_by_spoken_asset():
+    instruments = registry()
+    assert [i.native for i in instruments.with_base("bybit", "ethereum")] == ["ETHBTC", "ETHUSDT"]
+    assert [i.native for i in instruments.with_asset("bybit", "bitcoin")] == ["BTCUSDT", "ETHBTC"]
+    assert instruments.has_base("bybit", "ETH-BTC", "ethereum")
+    assert not instruments.has_base("bybit", "ETH-BTC", "bitcoin")
+
+
+def test_guesses_map_symbols_but_are_not_listed():
+    instruments = registry()
+    assert instruments.is_listed("okx", "ANY-THING")   # no catalog loaded yet
+    guess = instruments.add(Instrument("bybit", "DOGEUSDT", "DOGE", "USDT", listed=False))
+    assert instruments.get("bybit", "DOGE-USDT") is guess
+    assert not instruments.is_listed("bybit", "DOGE-USDT")
+    assert "DOGE-USDT" not in instruments.symbols("bybit")
+    assert instruments.symbols("bybit", 2) == ["BTC-USDT", "ETH-BTC"]
+
+
+def test_parse_expiry():
+    assert parse_expiry("29SEP23") == "2023-09-29"
+    assert parse_expiry("PERPETUAL") is None
@@ -0,0 +1,87 @@
+import asyncio
+
+from journal import Journal, load_checkpoint, read_records, recover_armed_triggers, recover_open_orders
+
+
+def write(directory, records):
+    async def run():
+        journal = Journal(str(directory), fsync=False, commit_interval=0)
+        await journal.start()
+        for kind, data in records:
+            journal.append(kind, data, session_id=data.get("session_id"))
+        await journal.stop()
+    asyncio.run(run())
+
+
+def order(client_order_id, status, filled=0.0):
+    return ("order", {"client_order_id": client_order_id, "session_id": "s1", "exchange": "okx", "symbol": "BTC-USDT",
+                      "side": "buy", "quantity": 1.0, "price": 100.0, "filled": filled, "status": status})
+
+
+def test_recover_open_orders_keeps_the_latest_state_of_unfinished_orders(tmp_path):
+    write(tmp_path, [
+        order("a", "accepted"), order("a", "open"), order("a", "partially_filled", 0.5),
+        order("b", "accepted"), order("b", "filled", 1.0),
+        order("c", "accepted"), order("c", "cancelled"),
+        order("d", "accepted"), order("d", "rejected"),
+        ("turn", {"text": "buy bitcoin"})
+    ])
+    recovered = recover_open_orders(str(tmp_path))
+    assert [(o["client_order_id"], o["status"], o["filled"]) for o in recovered] == [("a", "partially_filled", 0.5)]
+
+
+def test_recover_open_orders_skips_a_torn_last_line(tmp_path):
+    write(tmp_path, [order("a", "open")])
+    segment = next(tmp_path.iterdir())
+    with open(segment, "ab") as f:
+        f.write(b'{"seq":2,"kind":"order","data":{"client_order_id":"a","sta')
+    assert [o["status"] for o in recover_open_orders(str(tmp_path))] == ["open"]
+
+
+def test_recover_open_orders_on_an_empty_directory(tmp_path):
+    assert recover_open_orders(str(tmp_path / "missing")) == []
+
+
+def test_recover_armed_triggers(tmp_path):
+    trigger = {"trigger_id": "t1", "exchange": "okx", "symbol": "BTC-USDT", "direction": "above", "threshold": 50000.0}
+    write(tmp_path, [
+        ("trigger", {**trigger, "status": "armed"}),
+        ("trigger", {**trigger, "trigger_id": "t2", "status": "armed"}),
+        ("trigger", {**trigger, "trigger_id": "t2", "status": "fired"}),
+        ("trigger", {**trigger, "trigger_id": "t3", "status": "armed"}),
+        ("trigger", {**trigger, "trigger_id": "t3", "status": "cancelled"})
+    ])
+    assert [t["trigger_id"] for t in recover_armed_triggers(str(tmp_path))] == ["t1"]
+
+
+def test_reopening_after_a_torn_write_keeps_new_records(tmp_path):
+    write(tmp_path, [order("a", "open"), order("b", "open")])
+    segment = next(tmp_path.glob("journal-*"))
+    with open(segment, "ab") as f:
+        f.write(b'{"seq":3,"kind":"order","data":{"client_order_id":"c","sta')
+    write(tmp_path, [order("a", "filled", 1.0)])
+    assert [r["seq"] for r in read_records(str(tmp_path))] == [1, 2, 3]
+    assert [o["client_order_id"] for o in recover_open_orders(str(tmp_path))] == ["b"]
+
+
+def test_sealed_segments_are_folded_into_the_checkpoint(tmp_path):
+    async def run():
+        journal = Journal(str(tmp_path), segment_bytes=200, fsync=False, commit_interval=0)
+        await journal.start()
+        for i in range(20):
+            kind, data = order(f"o{i}", "open")
+            journal.append(kind, {**data, "session_id": f"s{i % 2}"}, session_id=f"s{i % 2}")
+            await asyncio.sleep(0)
+        for i in range(0, 20, 2):
+            kind, data = order(f"o{i}", "filled", 1.0)
+            journal.append(kind, {**data, "session_id": "s0"}, session_id="s0")
+            await asyncio.sleep(0)
+        await journal.stop()
+    asyncio.run(run())
+
+    checkpoint = load_checkpoint(str(tmp_path))
+    assert checkpoint["segment"] > 1
+    assert sorted(checkpoint["sessions"]) == ["s0", "s1"]
+    assert sorted(o["client_order_id"] for o in recover_open_orders(str(tmp_path))) == sorted(f"o{i}" for i in range(1, 20, 2))
+    assert len(list(read_records(str(tmp_path), session_id="s1"))) == 10
+    assert len(list(read_records(str(tmp_path), session_id="s0", kind="order"))) == 20
@@ -0,0 +1,64 @@
+import pytest
+
+from main import SmartTextProcessor
+
+
+@pytest.fixture(scope="module")
+def nlu():
+    return SmartTextProcessor()
+
+
+@pytest.mark.parametrize("text, side", [
+    ("buy 0.1 bitcoin", "buy"),
+    ("I want to sell my ether", "sell"),
+    ("go long on bitcoin", "buy"),
+    ("put in a bid", "buy"),
+    ("that's excellent", None),
+    ("move along", None),
+    ("I forbid it", None),
+    ("go long, actually sell it", "sell"),
+])
+def test_extract_side(nlu, text, side):
+    assert nlu.extract_side(text) == side
+
+
+@pytest.mark.parametrize("text", [
+    "alert me when bitcoin goes above 50000",
+    "let me know if eth drops below 3,000",
+    "buy 0.1 btc if it drops to 40000",
+    "notify me once ethereum reaches $3500",
+])
+def test_is_trigger_request(nlu, text):
+    assert nlu.is_trigger_request(text)
+
+
+@pytest.mark.parametrize("text", [
+    "tell me bitcoin's 24 hour change",
+    "let me know the symbols",
+    "buy 0.1 bitcoin at 45000",
+    "alert me about bitcoin",
+])
+def test_is_not_trigger_request(nlu, text):
+    assert not nlu.is_trigger_request(text)
+
+
+def test_extract_trigger(nlu):
+    trigger = nlu.extract_trigger("buy 0.1 btc if it drops to 40,000")
+    assert trigger["action"] == "order"
+    assert trigger["side"] == "buy"
+    assert trigger["quantity"] == 0.1
+    assert trigger["threshold"] == 40000.0
+    assert trigger["direction"] == "below"
+
+
+def test_extract_legs(nlu):
+    legs = nlu.extract_legs("buy 0.1 btc at 45,000 and 2 eth at 3000, sell 100 xrp at 0.5")
+    assert [(leg["side"], leg["crypto"], leg["quantity"], leg["price"]) for leg in legs] == [
+        ("buy", "bitcoin", 0.1, 45000.0),
+        ("buy", "ethereum", 2.0, 3000.0),
+        ("sell", "ripple", 100.0, 0.5),
+    ]
+
+
+def test_extract_legs_without_legs(nlu):
+    assert nlu.extract_legs("what's the price of bitcoin") == []
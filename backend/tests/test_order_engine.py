@@ -0,0 +1,130 @@
+import asyncio
+
+from order_engine import FILL_MATCHED, Order, OrderBook, OrderManager
+from price_source import SOURCE_LIVE, SOURCE_SIMULATED, MockPriceEngine, PriceQuote
+
+
+def order(side, quantity, price, client_order_id=None):
+    return Order(client_order_id or f"{side}-{quantity}-{price}", "okx", "BTC-USDT", side, quantity, price)
+
+
+def test_crossing_order_trades_at_resting_price():
+    book = OrderBook("okx", "BTC-USDT")
+    ask = order("sell", 1.0, 100.0)
+    book.submit(ask)
+    bid = order("buy", 1.0, 105.0)
+    fills = book.submit(bid)
+    assert fills == [(bid, 1.0, 100.0), (ask, 1.0, 100.0)]
+    assert bid.status == ask.status == "filled"
+    assert bid.avg_fill_price == 100.0
+
+
+def test_partial_fill_rests_the_remainder():
+    book = OrderBook("okx", "BTC-USDT")
+    book.submit(order("sell", 0.4, 100.0))
+    bid = order("buy", 1.0, 100.0)
+    book.submit(bid)
+    assert bid.status == "partially_filled"
+    assert abs(bid.remaining - 0.6) < 1e-12
+    assert book.depth()["bids"][0][0] == 100.0
+
+
+def test_price_time_priority():
+    book = OrderBook("okx", "BTC-USDT")
+    first = order("sell", 1.0, 101.0, "first")
+    second = order("sell", 1.0, 101.0, "second")
+    better = order("sell", 1.0, 100.0, "better")
+    for resting in (first, second, better):
+        book.submit(resting)
+    book.submit(order("buy", 2.0, 101.0))
+    assert better.status == "filled"
+    assert first.status == "filled"
+    assert second.status == "open"
+
+
+def test_non_crossing_orders_rest():
+    book = OrderBook("okx", "BTC-USDT")
+    book.submit(order("buy", 1.0, 99.0))
+    ask = order("sell", 1.0, 100.0)
+    assert book.submit(ask) == []
+    assert ask.status == "open"
+
+
+def test_cancelled_orders_are_skipped():
+    book = OrderBook("okx", "BTC-USDT")
+    cancelled = order("sell", 1.0, 100.0, "cancelled")
+    book.submit(cancelled)
+    cancelled.status = "cancelled"
+    live = order("sell", 1.0, 101.0, "live")
+    book.submit(live)
+    book.submit(order("buy", 1.0, 101.0))
+    assert cancelled.filled == 0.0
+    assert live.status == "filled"
+
+
+def test_feed_price_fills_marketable_and_resting_orders():
+    book = OrderBook("okx", "BTC-USDT")
+    book.last_price = 100.0
+    marketable = order("buy", 1.0, 101.0)
+    book.submit(marketable)
+    assert marketable.status == "filled"
+    assert marketable.avg_fill_price == 100.0
+
+    resting = order("buy", 1.0, 95.0)
+    book.submit(resting)
+    assert resting.status == "open"
+    book.on_price(96.0)
+    assert resting.status == "open"
+    fills = book.on_price(94.0)
+    assert resting.status == "filled"
+    assert fills and fills[0][0] is resting
+
+
+def test_fills_record_their_price_source():
+    book = OrderBook("okx", "BTC-USDT")
+    book.submit(order("sell", 1.0, 100.0, "ask"))
+    bid = order("buy", 2.0, 100.0, "bid")
+    book.submit(bid)
+    assert bid.fill_source == FILL_MATCHED
+
+    # once a mock price is used the order stays marked simulated
+    book.on_price(99.0, SOURCE_SIMULATED)
+    assert bid.status == "filled"
+    assert bid.to_dict()["fill_source"] == SOURCE_SIMULATED
+
+    live = order("buy", 1.0, 98.0, "live")
+    book.submit(live)
+    book.on_price(97.0, SOURCE_LIVE)
+    assert live.fill_source == SOURCE_LIVE
+
+
+def test_paper_executor_marks_simulated_feed_fills():
+    async def run():
+        async def feed(symbol, exchange):
+            return PriceQuote(exchange, symbol, 100.0, SOURCE_SIMULATED)
+
+        manager = OrderManager(price_feed=feed)
+        await manager.start()
+        placed = manager.submit("okx", "ETH-USDT", "buy", 1.0, 101.0)
+        for _ in range(50):
+            if placed.is_done:
+                break
+            await asyncio.sleep(0.01)
+        await manager.stop()
+        return placed
+
+    placed = asyncio.run(run())
+    assert placed.status == "filled"
+    assert placed.avg_fill_price == 100.0
+    assert placed.fill_source == SOURCE_SIMULATED
+
+
+def test_mock_prices_are_deterministic_and_anchored():
+    engine = MockPriceEngine(seed=7)
+    other = MockPriceEngine(seed=7)
+    now = 1_700_000_000.0
+    assert engine.price("BTC-USDT", now) == other.price("BTCUSDT", now)
+    assert 0.8 * 45000 < engine.price("BTC-USDT", now) < 1.2 * 45000
+    # the window wraps without a jump
+    wrap = engine.step_seconds * engine.horizon
+    assert abs(engine.price("ETH-USDT", wrap * 100) / engine.price("ETH-USDT", wrap * 100 - 1) - 1) < 0.01
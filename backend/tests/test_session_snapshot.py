@@ -0,0 +1,68 @@
+import asyncio
+import marshal
+
+from session_snapshot import SessionSnapshotter
+
+
+class State:
+    def __init__(self, session_id=None):
+        self.session_id = session_id
+        self.state = "await_exchange"
+        self.exchange = None
+        self.symbols = []
+        self.basket = []
+
+
+FIELDS = ("state", "exchange", "symbols")
+
+
+def sessions(count):
+    result = {}
+    for i in range(count):
+        state = State(f"s{i}")
+        state.state = "await_price"
+        state.exchange = "okx"
+        state.symbols = [f"COIN{i}-USDT"]
+        result[f"s{i}"] = {"state": state, "user_name": f"user{i}", "created_at": "2024-01-01T00:00:00"}
+    return result
+
+
+def test_round_trip_across_chunks(tmp_path, monkeypatch):
+    monkeypatch.setattr("session_snapshot.SNAPSHOT_CHUNK", 7)
+    path = str(tmp_path / "sessions.snapshot")
+    asyncio.run(SessionSnapshotter(path, sessions(25), State, FIELDS).snapshot())
+
+    restored = {}
+    assert SessionSnapshotter(path, restored, State, FIELDS).restore() == 25
+    entry = restored["s13"]
+    assert entry["user_name"] == "user13"
+    assert entry["state"].session_id == "s13"
+    assert entry["state"].state == "await_price"
+    assert entry["state"].symbols == ["COIN13-USDT"]
+    # fields the snapshot doesn't carry keep their defaults
+    assert entry["state"].basket == []
+
+
+def test_sessions_ended_during_a_snapshot_are_skipped(tmp_path, monkeypatch):
+    monkeypatch.setattr("session_snapshot.SNAPSHOT_CHUNK", 5)
+    path = str(tmp_path / "sessions.snapshot")
+    live = sessions(20)
+    snapshotter = SessionSnapshotter(path, live, State, FIELDS)
+
+    async def run():
+        task = asyncio.create_task(snapshotter.snapshot())
+        await asyncio.sleep(0)
+        del live["s19"]
+        await task
+    asyncio.run(run())
+
+    restored = {}
+    assert SessionSnapshotter(path, restored, State, FIELDS).restore() == 19
+    assert "s19" not in restored
+
+
+def test_unreadable_or_old_snapshots_are_ignored(tmp_path):
+    path = tmp_path / "sessions.snapshot"
+    assert SessionSnapshotter(str(path), {}, State, FIELDS).restore() == 0
+    path.write_bytes(marshal.dumps((1, 0.0, {"session_id": []})))
+    assert SessionSnapshotter(str(path), {}, State, FIELDS).restore() == 0
@@ -0,0 +1,70 @@
+import asyncio
+import json
+
+import sharding
+from shard_router import ShardRouter, merge_books
+from sharding import shard_for
+
+
+def test_minted_ids_route_back_to_their_worker(monkeypatch):
+    monkeypatch.setattr(sharding, "SHARD_COUNT", 4)
+    for index in range(4):
+        monkeypatch.setattr(sharding, "SHARD_INDEX", index)
+        for _ in range(50):
+            assert shard_for(sharding.new_session_id(), 4) == index
+            order_id = sharding.local_id()
+            assert shard_for(order_id, 4) == index
+            assert shard_for(f"trigger-{order_id}", 4) == index
+
+
+def test_router_picks():
+    router = ShardRouter([("127.0.0.1", 0)] * 4)
+    session_id = "0b5e6c8a-1111-2222-3333-00000000000e"
+    assert router.pick(f"/bland_webhook/{session_id}".encode(), b"") == 2
+    assert router.pick(b"/start_call", b'{"session_id": "' + session_id.encode() + b'"}') == 2
+    assert router.pick(b"/health", b"") == 0
+    assert router.pick(b"/health?shard=3", b"") == 3
+    assert {router.pick(b"/prices/okx", b"") for _ in range(4)} == {0, 1, 2, 3}
+
+
+def test_merge_books():
+    books = [
+        {"last_price": None, "bids": [[100.0, 1.0]], "asks": [[103.0, 1.0]]},
+        {"last_price": 101.0, "bids": [[101.0, 2.0], [99.0, 1.0]], "asks": [[102.0, 0.5]]},
+    ]
+    merged = merge_books(books)
+    assert merged == {"last_price": 101.0, "bids": [[101.0, 2.0], [100.0, 1.0], [99.0, 1.0]],
+                      "asks": [[102.0, 0.5], [103.0, 1.0]]}
+
+
+def test_order_book_is_merged_across_workers():
+    async def run():
+        async def worker(book):
+            async def handle(reader, writer):
+                while True:
+                    try:
+                        await reader.readuntil(b"\r\n\r\n")
+                    except asyncio.IncompleteReadError:
+                        break
+                    body = json.dumps(book).encode()
+                    writer.write(b"HTTP/1.1 200 OK\r\ncontent-length: " + str(len(body)).encode() + b"\r\n\r\n" + body)
+                    await writer.drain()
+                writer.close()
+            return await asyncio.start_server(handle, "127.0.0.1", 0)
+
+        servers = [await worker({"last_price": 50.0, "bids": [[49.0, 1.0]], "asks": []}),
+                   await worker({"last_price": 50.0, "bids": [[48.0, 2.0]], "asks": [[51.0, 1.0]]})]
+        router = ShardRouter([server.sockets[0].getsockname()[:2] for server in servers])
+        front = await asyncio.start_server(router.handle, "127.0.0.1", 0)
+        reader, writer = await asyncio.open_connection(*front.sockets[0].getsockname()[:2])
+        for _ in range(2):
+            writer.write(b"GET /orderbook/okx/BTC-USDT HTTP/1.1\r\nhost: test\r\n\r\n")
+            head = await reader.readuntil(b"\r\n\r\n")
+            length = int(head.lower().split(b"content-length: ")[1].split(b"\r\n")[0])
+            book = json.loads(await reader.readexactly(length))
+            assert book == {"last_price": 50.0, "bids": [[49.0, 1.0], [48.0, 2.0]], "asks": [[51.0, 1.0]]}
+        writer.close()
+        for server in servers + [front]:
+            server.close()
+
+    asyncio.run(run())
@@ -0,0 +1,48 @@
+import asyncio
+import math
+
+import numpy as np
+
+from tick_store import TickRecorder, TickStore, merge_ticks
+
+
+def test_range_query_across_segments(tmp_path):
+    store = TickStore(str(tmp_path), segment_rows=4)
+    ts = np.arange(10, dtype=np.int64) * 100
+    store.append("okx", "BTCUSDT", {"ts": ts, "bid": ts - 1.0, "ask": ts + 1.0, "last": ts.astype(np.float64)})
+
+    ticks = store.query("okx", "btcusdt", 250, 750)
+    assert ticks["ts"].tolist() == [300, 400, 500, 600, 700]
+    assert ticks["bid"].tolist() == [299.0, 399.0, 499.0, 599.0, 699.0]
+    assert store.query("okx", "BTCUSDT", 2000)["ts"].size == 0
+    assert store.query("okx", "BTCUSDT", end_ns=100)["ts"].tolist() == [0]
+    assert store.query("bybit", "BTCUSDT")["ts"].size == 0
+
+
+def test_torn_columns_only_count_whole_rows(tmp_path):
+    store = TickStore(str(tmp_path))
+    ts = np.arange(3, dtype=np.int64)
+    store.append("okx", "BTCUSDT", {"ts": ts, "bid": ts * 1.0, "ask": ts * 1.0, "last": ts * 1.0})
+    # a crash after writing the ts column of the next batch
+    with open(tmp_path / "okx" / "BTCUSDT" / "000001.ts", "ab") as f:
+        f.write(np.int64(3).tobytes())
+    assert store.query("okx", "BTCUSDT")["ts"].tolist() == [0, 1, 2]
+
+
+def test_recorder_keeps_bid_ask_and_merges_stores(tmp_path):
+    async def run():
+        first = TickRecorder(TickStore(str(tmp_path / "a")))
+        second = TickRecorder(TickStore(str(tmp_path / "b")))
+        first.record("okx", "BTCUSDT", 100.0, 99.5, 100.5, ts_ns=10)
+        second.record("okx", "BTCUSDT", 101.0, ts_ns=5)
+        # ts never goes backwards within one recorder
+        first.record("okx", "BTCUSDT", 102.0, ts_ns=1)
+        await first.flush()
+        await second.flush()
+        return first.store, second.store
+
+    first, second = asyncio.run(run())
+    ticks = merge_ticks([first.query("okx", "BTCUSDT"), second.query("okx", "BTCUSDT")])
+    assert ticks["ts"].tolist() == [5, 10, 10]
+    assert ticks["last"].tolist() == [101.0, 100.0, 102.0]
+    assert math.isnan(ticks["bid"][0]) and ticks["bid"][1] == 99.5 and ticks["ask"][1] == 100.5
@@ -0,0 +1,77 @@
+import json
+import math
+
+from exchange_adapters import build_adapters
+from exchanges import EXCHANGES
+from instruments import InstrumentRegistry
+
+ADAPTERS = build_adapters(EXCHANGES, InstrumentRegistry())
+
+
+def parse_ticker_snapshot(body: bytes, exchange: str):
+    return ADAPTERS[exchange].parse_ticker_snapshot(body)
+
+
+def body(data) -> bytes:
+    # exchanges send compact JSON, the regex path relies on it
+    return json.dumps(data, separators=(",", ":")).encode()
+
+
+def test_bybit_snapshot():
+    data = {"retCode": 0, "result": {"category": "spot", "list": [
+        {"symbol": "BTCUSDT", "bid1Price": "44999", "lastPrice": "45000.5", "volume24h": "12"},
+        {"symbol": "ETHUSDT", "lastPrice": "3000"}
+    ]}}
+    assert parse_ticker_snapshot(body(data), "bybit") == {"BTCUSDT": 45000.5, "ETHUSDT": 3000.0}
+
+
+def test_binance_snapshot():
+    data = [{"symbol": "BTCUSDT", "price": "45000.00"}, {"symbol": "ETHBTC", "price": "0.065"}]
+    assert parse_ticker_snapshot(body(data), "binance") == {"BTCUSDT": 45000.0, "ETHBTC": 0.065}
+
+
+def test_okx_snapshot_keys_are_compact():
+    data = {"code": "0", "data": [{"instType": "SPOT", "instId": "BTC-USDT", "last": "45000", "lastSz": "0.1"}]}
+    assert parse_ticker_snapshot(body(data), "okx") == {"BTCUSDT": 45000.0}
+
+
+def test_deribit_snapshot_skips_missing_prices():
+    data = {"jsonrpc": "2.0", "result": [
+        {"instrument_name": "BTC-PERPETUAL", "volume": 10.5, "last": 45000.5},
+        {"instrument_name": "BTC-29SEP23", "volume": 0, "last": None}
+    ]}
+    assert parse_ticker_snapshot(body(data), "deribit") == {"BTCPERPETUAL": 45000.5}
+
+
+def test_unexpected_layout_falls_back_to_json():
+    # whitespace defeats the patterns, the JSON parser still reads the snapshot
+    data = {"result": {"list": [{"symbol": "BTCUSDT", "lastPrice": "45000"}]}}
+    assert parse_ticker_snapshot(json.dumps(data, indent=2).encode(), "bybit") == {"BTCUSDT": 45000.0}
+
+
+def test_non_positive_prices_are_dropped():
+    data = [{"symbol": "BTCUSDT", "price": "0"}, {"symbol": "ETHUSDT", "price": "3000"}]
+    assert parse_ticker_snapshot(body(data), "binance") == {"ETHUSDT": 3000.0}
+
+
+def test_bybit_and_okx_quotes_on_the_fast_path():
+    bybit = {"result": {"list": [
+        {"symbol": "BTCUSDT", "bid1Price": "44999", "bid1Size": "1", "ask1Price": "45001", "ask1Size": "1", "lastPrice": "45000"},
+        {"symbol": "ETHUSDT", "bid1Price": "", "bid1Size": "", "ask1Price": "3001", "ask1Size": "2", "lastPrice": "3000"}
+    ]}}
+    prices, quotes = ADAPTERS["bybit"].parse_ticker_quotes(body(bybit))
+    assert prices == {"BTCUSDT": 45000.0, "ETHUSDT": 3000.0}
+    assert quotes["BTCUSDT"] == (44999.0, 45001.0)
+    bid, ask = quotes["ETHUSDT"]
+    assert math.isnan(bid) and ask == 3001.0
+
+    okx = {"data": [{"instType": "SPOT", "instId": "BTC-USDT", "last": "45000", "lastSz": "0.1",
+                     "askPx": "45002", "askSz": "1", "bidPx": "44998", "bidSz": "1"}]}
+    assert ADAPTERS["okx"].parse_ticker_quotes(body(okx)) == ({"BTCUSDT": 45000.0}, {"BTCUSDT": (44998.0, 45002.0)})
+
+
+def test_quotes_from_the_json_fallback():
+    okx = {"data": [{"instId": "ETH-USDT", "bidPx": "2999", "askPx": "3001", "last": "3000"}]}
+    assert ADAPTERS["okx"].parse_ticker_quotes(json.dumps(okx, indent=2).encode()) == ({"ETHUSDT": 3000.0}, {"ETHUSDT": (2999.0, 3001.0)})
+    # binance's bulk endpoint has no quotes
+    assert ADAPTERS["binance"].parse_ticker_quotes(body([{"symbol": "BTCUSDT", "price": "1"}]))[1] == {}
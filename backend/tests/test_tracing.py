@@ -0,0 +1,55 @@
+import asyncio
+
+import pytest
+
+import tracing
+from tracing import Tracer, annotate, record_error, traced
+
+
+@pytest.fixture
+def tracer(monkeypatch):
+    # @traced opens its spans on the module tracer
+    fresh = Tracer(slow_threshold=10.0)
+    monkeypatch.setattr(tracing, "tracer", fresh)
+    return fresh
+
+
+def test_fast_successful_traces_are_dropped(tracer):
+    with tracer.trace("webhook", session_id="s1"):
+        with tracer.span("nlu"):
+            annotate(intent="order")
+    assert tracer.stats()["started"] == 1
+    assert tracer.recent() == []
+
+
+def test_failed_trace_keeps_nested_spans(tracer):
+    @traced("price_quote")
+    async def quote():
+        annotate(exchange="okx")
+        await asyncio.sleep(0)
+        record_error("timeout")
+        return 1.0
+
+    async def run():
+        with tracer.trace("webhook", session_id="s1"):
+            with tracer.span("turn"):
+                await quote()
+
+    asyncio.run(run())
+    [kept] = tracer.recent(session_id="s1")
+    assert kept["failed"]
+    assert [(span["name"], span["parent_id"]) for span in kept["spans"]] == [("webhook", None), ("turn", 0), ("price_quote", 1)]
+    assert kept["spans"][2]["attributes"] == {"exchange": "okx"} and kept["spans"][2]["error"] == "timeout"
+    assert tracer.get(kept["trace_id"]) is kept
+
+
+def test_spans_outside_a_trace_are_no_ops(tracer):
+    @traced()
+    def work():
+        annotate(ignored=True)
+        return 2
+
+    assert work() == 2
+    with tracer.span("orphan") as span:
+        assert span is None
+    assert tracer.stats()["started"] == 0
@@ -0,0 +1,41 @@
+import asyncio
+
+from ticker_cache import compact_symbol
+from triggers import Trigger, TriggerEngine, TriggerPoller
+
+
+def test_snapshot_fires_crossed_triggers_only():
+    engine = TriggerEngine(symbol_key=compact_symbol)
+    above = engine.arm(Trigger("okx", "BTC-USDT", "above", 50000.0))
+    below = engine.arm(Trigger("okx", "BTC-USDT", "below", 40000.0))
+    assert engine.on_snapshot("okx", {"BTCUSDT": 45000.0}) == []
+    assert engine.on_snapshot("okx", {"BTCUSDT": 51000.0}) == [above]
+    assert above.status == "fired" and above.fired_price == 51000.0
+    assert below.status == "armed"
+
+
+def test_symbols_no_snapshot_covers_are_unchecked():
+    engine = TriggerEngine(symbol_key=compact_symbol)
+    engine.arm(Trigger("okx", "BTC-USDT", "above", 50000.0))
+    engine.arm(Trigger("deribit", "BTC-29SEP23", "above", 50000.0))
+    engine.on_snapshot("okx", {"BTCUSDT": 45000.0})
+    assert engine.unchecked(10.0) == [("deribit", "BTC-29SEP23")]
+
+
+def test_poller_fetches_unchecked_symbols_one_by_one():
+    engine = TriggerEngine(symbol_key=compact_symbol)
+    future = engine.arm(Trigger("deribit", "BTC-29SEP23", "above", 50000.0))
+    engine.arm(Trigger("okx", "BTC-USDT", "above", 50000.0))
+    engine.on_snapshot("okx", {"BTCUSDT": 45000.0})
+    fetched = []
+
+    async def fetch(exchange, symbol):
+        # stands in for fetch_price_quote, which feeds live prices to on_price
+        fetched.append((exchange, symbol))
+        engine.on_price(exchange, symbol, 52000.0)
+
+    poller = TriggerPoller(engine, fetch)
+    asyncio.run(poller.poll())
+    assert fetched == [("deribit", "BTC-29SEP23")]
+    assert future.status == "fired"
+    assert poller.stats() == {"polled": 1, "failures": 0, "unchecked": 0}
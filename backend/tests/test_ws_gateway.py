@@ -0,0 +1,81 @@
+import asyncio
+import json
+
+from ws_gateway import ClientConnection, POLICY_COALESCE, coalesce_key
+
+
+class FakeSocket:
+    def __init__(self):
+        self.sent = []
+        self.closed = False
+
+    async def send_text(self, text):
+        self.sent.append(text)
+
+    async def close(self):
+        self.closed = True
+
+
+def order_update(order_id, status):
+    return {"type": "order_update", "order": {"client_order_id": order_id, "status": status}}
+
+
+def push(conn, message):
+    return conn.enqueue(json.dumps(message), message["type"], coalesce_key(message))
+
+
+def queued(conn):
+    return [json.loads(item[0]) for item in conn.queue]
+
+
+def test_full_queue_keeps_every_transcript_line():
+    conn = ClientConnection(FakeSocket(), "s1", "caller", 2, POLICY_COALESCE)
+    for i in range(5):
+        assert push(conn, {"type": "transcript_update", "text": f"line {i}"})
+    assert [m["text"] for m in queued(conn)] == [f"line {i}" for i in range(5)]
+    assert conn.dropped == 0
+
+
+def test_order_updates_coalesce_per_order():
+    conn = ClientConnection(FakeSocket(), "s1", "caller", 2, POLICY_COALESCE)
+    push(conn, order_update("a", "new"))
+    push(conn, order_update("b", "new"))
+    push(conn, order_update("a", "filled"))
+    push(conn, order_update("c", "new"))
+    orders = [(m["order"]["client_order_id"], m["order"]["status"]) for m in queued(conn)]
+    assert orders == [("a", "filled"), ("b", "new"), ("c", "new")]
+    assert conn.coalesced == 1
+
+
+def test_heartbeats_make_room_and_are_dropped_first():
+    conn = ClientConnection(FakeSocket(), "s1", "caller", 2, POLICY_COALESCE)
+    conn.enqueue('{"type": "heartbeat"}', "heartbeat", "heartbeat")
+    push(conn, {"type": "transcript_update", "text": "hi"})
+    push(conn, {"type": "price_alert", "price": 1})
+    assert [m["type"] for m in queued(conn)] == ["transcript_update", "price_alert"]
+    # nothing left to evict, the new heartbeat goes instead
+    assert not conn.enqueue('{"type": "heartbeat"}', "heartbeat", None)
+    assert conn.dropped == 2
+
+
+def test_client_too_far_behind_is_disconnected():
+    conn = ClientConnection(FakeSocket(), "s1", "caller", 2, POLICY_COALESCE)
+    results = [push(conn, {"type": "transcript_update", "text": str(i)}) for i in range(10)]
+    assert results.count(False) == 2
+    assert conn.overflowed and conn.closing
+
+
+def test_batch_writer_sends_one_array_per_drain():
+    async def run():
+        socket = FakeSocket()
+        conn = ClientConnection(socket, "s1", "caller", 10, POLICY_COALESCE, batch=True)
+        for i in range(3):
+            push(conn, {"type": "transcript_update", "text": str(i)})
+        conn.request_close()
+        await conn.run_writer(1.0)
+        return socket, conn
+
+    socket, conn = asyncio.run(run())
+    assert len(socket.sent) == 1
+    assert [m["text"] for m in json.loads(socket.sent[0])] == ["0", "1", "2"]
+    assert conn.sent == 3 and socket.closed
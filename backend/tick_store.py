@@ -0,0 +1,219 @@
+import asyncio
+import logging
+import os
+import re
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# one file per column per segment, every value is 8 bytes so row i is at offset 8*i in each file
+TICK_COLUMNS = {
+    "ts": np.dtype("<i8"),     # unix time in nanoseconds
+    "bid": np.dtype("<f8"),
+    "ask": np.dtype("<f8"),
+    "last": np.dtype("<f8")
+}
+
+_unsafe_chars = re.compile(r"[^A-Za-z0-9_.-]")
+
+
+def _safe_name(name: str) -> str:
+    return _unsafe_chars.sub("_", name)
+
+
+class TickStore:
+    """Columnar per-(exchange, symbol) tick segments, read through np.memmap.
+
+    Layout: {root}/{exchange}/{symbol}/{segment:06d}.{column}. A segment is
+    sealed once it holds segment_rows rows; sealed segments never change, so
+    their memmaps are cached. Queries return views into the mapped files
+    unless the range spans several segments.
+    """
+
+    def __init__(self, root: str, segment_rows: int = 1 << 20):
+        self.root = root
+        self.segment_rows = segment_rows
+        self._sealed_maps: Dict[str, Dict[str, np.memmap]] = {}
+
+    def _dir(self, exchange: str, symbol: str) -> str:
+        return os.path.join(self.root, _safe_name(exchange.lower()), _safe_name(symbol.upper()))
+
+    def _segments(self, exchange: str, symbol: str) -> List[Tuple[int, str]]:
+        directory = self._dir(exchange, symbol)
+        if not os.path.isdir(directory):
+            return []
+        indexes = sorted({int(name.split(".")[0]) for name in os.listdir(directory) if name.endswith(".ts")})
+        return [(index, os.path.join(directory, f"{index:06d}")) for index in indexes]
+
+    def _rows_on_disk(self, base: str) -> int:
+        # a crash can leave columns of different lengths, only whole rows count
+        sizes = []
+        for column, dtype in TICK_COLUMNS.items():
+            path = f"{base}.{column}"
+            sizes.append(os.path.getsize(path) // dtype.itemsize if os.path.exists(path) else 0)
+        return min(sizes)
+
+    def append(self, exchange: str, symbol: str, columns: Dict[str, np.ndarray]):
+        """Append a batch of rows (called from the recorder's flush thread)"""
+        rows = len(columns["ts"])
+        if rows == 0:
+            return
+        directory = self._dir(exchange, symbol)
+        os.makedirs(directory, exist_ok=True)
+
+        segments = self._segments(exchange, symbol)
+        index, base = segments[-1] if segments else (1, os.path.join(directory, f"{1:06d}"))
+        written = self._rows_on_disk(base) if segments else 0
+
+        start = 0
+        while start < rows:
+            if written >= self.segment_rows:
+                index += 1
+                base = os.path.join(directory, f"{index:06d}")
+                written = 0
+            count = min(rows - start, self.segment_rows - written)
+            for column, dtype in TICK_COLUMNS.items():
+                with open(f"{base}.{column}", "ab") as f:
+                    f.truncate(written * dtype.itemsize)
+                    f.write(np.ascontiguousarray(columns[column][start:start + count], dtype=dtype).tobytes())
+            written += count
+            start += count
+
+    def _map(self, base: str, sealed: bool) -> Optional[Dict[str, np.memmap]]:
+        if sealed and base in self._sealed_maps:
+            return self._sealed_maps[base]
+        rows = self._rows_on_disk(base)
+        if rows == 0:
+            return None
+        maps = {column: np.memmap(f"{base}.{column}", dtype=dtype, mode="r", shape=(rows,))
+                for column, dtype in TICK_COLUMNS.items()}
+        if sealed:
+            self._sealed_maps[base] = maps
+        return maps
+
+    def query(self, exchange: str, symbol: str, start_ns: Optional[int] = None,
+              end_ns: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """Ticks with start_ns <= ts < end_ns, as one array per column"""
+        segments = self._segments(exchange, symbol)
+        parts: List[Dict[str, np.ndarray]] = []
+        for position, (index, base) in enumerate(segments):
+            maps = self._map(base, sealed=position < len(segments) - 1)
+            if maps is None:
+                continue
+            ts = maps["ts"]
+            # segments are in time order, skip the ones entirely outside the range
+            if start_ns is not None and ts[-1] < start_ns:
+                continue
+            if end_ns is not None and ts[0] >= end_ns:
+                break
+            lo = int(np.searchsorted(ts, start_ns, side="left")) if start_ns is not None else 0
+            hi = int(np.searchsorted(ts, end_ns, side="left")) if end_ns is not None else len(ts)
+            if hi > lo:
+                parts.append({column: array[lo:hi] for column, array in maps.items()})
+
+        if not parts:
+            return {column: np.empty(0, dtype=dtype) for column, dtype in TICK_COLUMNS.items()}
+        if len(parts) == 1:
+            return parts[0]
+        return {column: np.concatenate([part[column] for part in parts]) for column in TICK_COLUMNS}
+
+    def symbols(self) -> List[Tuple[str, str]]:
+        if not os.path.isdir(self.root):
+            return []
+        return [(exchange, symbol)
+                for exchange in sorted(os.listdir(self.root))
+                for symbol in sorted(os.listdir(os.path.join(self.root, exchange)))]
+
+
+def merge_ticks(parts: List[Dict[str, np.ndarray]]) -> Dict[str, np.ndarray]:
+    """Query results of several stores as one series in ts order"""
+    parts = [part for part in parts if len(part["ts"])]
+    if not parts:
+        return {column: np.empty(0, dtype=dtype) for column, dtype in TICK_COLUMNS.items()}
+    if len(parts) == 1:
+        return parts[0]
+    merged = {column: np.concatenate([part[column] for part in parts]) for column in TICK_COLUMNS}
+    order = np.argsort(merged["ts"], kind="stable")
+    return {column: values[order] for column, values in merged.items()}
+
+
+class TickRecorder:
+    """Buffers ticks in memory and appends them to the TickStore in batches from a worker thread"""
+
+    def __init__(self, store: TickStore, flush_interval: float = 1.0, max_buffered: int = 50000, enabled: bool = True):
+        self.store = store
+        self.enabled = enabled
+        self.flush_interval = flush_interval
+        self.max_buffered = max_buffered
+        self.recorded = 0
+        self.dropped = 0
+        self._buffers: Dict[Tuple[str, str], List[Tuple[int, float, float, float]]] = {}
+        self._buffered = 0
+        self._last_ts: Dict[Tuple[str, str], int] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def record(self, exchange: str, symbol: str, last: float, bid: float = float("nan"),
+               ask: float = float("nan"), ts_ns: Optional[int] = None):
+        if not self.enabled:
+            return
+        if self._buffered >= self.max_buffered:
+            # the disk is not keeping up, losing ticks beats growing without bound
+            self.dropped += 1
+            return
+        key = (exchange.lower(), symbol.upper())
+        ts_ns = ts_ns if ts_ns is not None else time.time_ns()
+        # range queries binary search the ts column, keep it non-decreasing per symbol
+        ts_ns = max(ts_ns, self._last_ts.get(key, 0))
+        self._last_ts[key] = ts_ns
+        self._buffers.setdefault(key, []).append((ts_ns, bid, ask, last))
+        self._buffered += 1
+        self.recorded += 1
+
+    def _take(self) -> Dict[Tuple[str, str], List[Tuple[int, float, float, float]]]:
+        buffers, self._buffers = self._buffers, {}
+        self._buffered = 0
+        return buffers
+
+    def _write(self, buffers: Dict[Tuple[str, str], List[Tuple[int, float, float, float]]]):
+        for (exchange, symbol), rows in buffers.items():
+            ts, bid, ask, last = zip(*rows)
+            self.store.append(exchange, symbol, {
+                "ts": np.fromiter(ts, dtype=np.int64, count=len(rows)),
+                "bid": np.fromiter(bid, dtype=np.float64, count=len(rows)),
+                "ask": np.fromiter(ask, dtype=np.float64, count=len(rows)),
+                "last": np.fromiter(last, dtype=np.float64, count=len(rows))
+            })
+
+    async def flush(self):
+        buffers = self._take()
+        if buffers:
+            try:
+                await asyncio.to_thread(self._write, buffers)
+            except Exception as e:
+                logger.error(f"Tick flush failed: {str(e)}")
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+
+    async def _flush_loop(self):
+        while True:
+            try:
+                await asyncio.sleep(self.flush_interval)
+                await self.flush()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Tick recorder loop error: {str(e)}")
+
+    def stats(self) -> Dict:
+        return {"recorded": self.recorded, "buffered": self._buffered, "dropped": self.dropped}
@@ -0,0 +1,160 @@
+import asyncio
+import logging
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# (bid, ask) of a symbol the snapshot had no quote for
+NO_QUOTE = (float("nan"), float("nan"))
+
+
+def compact_symbol(symbol: str) -> str:
+    """BTC-USDT, btc_usdt and BTCUSDT all map to the same key"""
+    return symbol.upper().replace("-", "").replace("_", "")
+
+
+class TickerCache:
+    """Whole-exchange ticker snapshots, refreshed with one request per exchange.
+
+    Lookups are a dict read. A stale snapshot is refreshed on demand (one
+    refresh in flight per exchange) and exchanges looked up recently are kept
+    warm by a background loop. Endpoints and response parsing come from each
+    exchange's adapter (exchange_adapters.py).
+    """
+
+    def __init__(self, adapters: Dict, max_age: float = 5.0, refresh_interval: float = 2.0,
+                 hot_seconds: float = 60.0, timeout: float = 5.0, retry_after: float = 10.0):
+        self.adapters = adapters
+        self.max_age = max_age
+        self.refresh_interval = refresh_interval
+        self.hot_seconds = hot_seconds
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self.snapshots: Dict[str, Dict[str, float]] = {}
+        self.quotes: Dict[str, Dict[str, Tuple[float, float]]] = {}  # (bid, ask) where the snapshot has them
+        self.updated_at: Dict[str, float] = {}
+        self.last_lookup: Dict[str, float] = {}
+        self.failed_at: Dict[str, float] = {}
+        self.listeners: List[Callable[[str, Dict[str, float]], None]] = []
+        self.warm_sources: List[Callable[[], List[str]]] = []
+        self.refreshes = 0
+        self.failures = 0
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._client: Optional[httpx.AsyncClient] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def add_listener(self, listener: Callable[[str, Dict[str, float]], None]):
+        self.listeners.append(listener)
+
+    def add_warm_source(self, source: Callable[[], List[str]]):
+        """Extra exchanges to keep refreshing even without recent lookups (e.g. ones with armed alerts)"""
+        self.warm_sources.append(source)
+
+    async def start(self):
+        self._client = httpx.AsyncClient(timeout=self.timeout)
+        self._task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        if self._client:
+            await self._client.aclose()
+            self._client = None
+
+    def lookup(self, exchange: str, symbol: str, max_age: Optional[float] = None) -> Optional[float]:
+        """Cached price if the exchange snapshot is fresh enough, no I/O"""
+        exchange = exchange.lower()
+        age = time.time() - self.updated_at.get(exchange, 0)
+        if age > (max_age if max_age is not None else self.max_age):
+            return None
+        return self.snapshots.get(exchange, {}).get(compact_symbol(symbol))
+
+    def age(self, exchange: str) -> Optional[float]:
+        updated_at = self.updated_at.get(exchange.lower())
+        return time.time() - updated_at if updated_at else None
+
+    async def get_price(self, exchange: str, symbol: str) -> Optional[float]:
+        exchange = exchange.lower()
+        self.last_lookup[exchange] = time.time()
+        # only a stale snapshot is refreshed; a symbol missing from a fresh one (not in the bulk
+        # listing, e.g. Deribit futures) is a plain miss, the caller falls back to per-symbol requests
+        age = self.age(exchange)
+        adapter = self.adapters.get(exchange)
+        if (age is None or age > self.max_age) and adapter is not None and adapter.bulk_ticker_urls:
+            await self.refresh(exchange)
+        return self.lookup(exchange, symbol)
+
+    async def refresh(self, exchange: str) -> bool:
+        lock = self._locks.setdefault(exchange, asyncio.Lock())
+        refresh_started = time.time()
+        async with lock:
+            # someone else refreshed while we waited for the lock
+            if self.updated_at.get(exchange, 0) >= refresh_started:
+                return True
+            # don't hammer (or keep waiting on) an exchange whose bulk endpoint just failed
+            if time.time() - self.failed_at.get(exchange, 0) < self.retry_after:
+                return False
+            adapter = self.adapters.get(exchange)
+            if not adapter:
+                return False
+            client = self._client or httpx.AsyncClient(timeout=self.timeout)
+            try:
+                prices: Dict[str, float] = {}
+                quotes: Dict[str, Tuple[float, float]] = {}
+                for url in adapter.bulk_ticker_urls:
+                    response = await client.get(url)
+                    response.raise_for_status()
+                    page_prices, page_quotes = adapter.parse_ticker_quotes(response.content)
+                    prices.update(page_prices)
+                    quotes.update(page_quotes)
+                if not prices:
+                    self.failed_at[exchange] = time.time()
+                    return False
+                self.snapshots[exchange] = prices
+                self.quotes[exchange] = quotes
+                self.updated_at[exchange] = time.time()
+                self.refreshes += 1
+                logger.info(f"Refreshed {len(prices)} {adapter.name} tickers")
+            except Exception as e:
+                self.failures += 1
+                self.failed_at[exchange] = time.time()
+                logger.error(f"Bulk ticker refresh failed for {exchange}: {str(e)}")
+                return False
+            finally:
+                if client is not self._client:
+                    await client.aclose()
+
+        for listener in self.listeners:
+            try:
+                listener(exchange, prices)
+            except Exception as e:
+                logger.error(f"Ticker snapshot listener failed: {str(e)}")
+        return True
+
+    async def _refresh_loop(self):
+        while True:
+            try:
+                await asyncio.sleep(self.refresh_interval)
+                now = time.time()
+                hot = {exchange for exchange, at in self.last_lookup.items() if now - at < self.hot_seconds}
+                for source in self.warm_sources:
+                    hot.update(source())
+                await asyncio.gather(*(self.refresh(exchange) for exchange in hot))
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Ticker refresh loop error: {str(e)}")
+
+    def stats(self) -> Dict:
+        return {
+            "refreshes": self.refreshes,
+            "failures": self.failures,
+            "exchanges": {
+                exchange: {"symbols": len(prices), "age_seconds": round(self.age(exchange) or 0, 2)}
+                for exchange, prices in self.snapshots.items()
+            }
+        }
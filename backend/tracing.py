@@ -0,0 +1,195 @@
+import functools
+import inspect
+import json
+import logging
+import os
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, List, Optional
+
+from sharding import local_id
+
+logger = logging.getLogger(__name__)
+
+# the span the running code is inside of; asyncio tasks and to_thread calls inherit it
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+
+class Span:
+    __slots__ = ("trace", "name", "span_id", "parent_id", "start", "duration", "attributes", "error")
+
+    def __init__(self, trace: "Trace", name: str, parent_id: Optional[int], attributes: Dict[str, Any]):
+        self.trace = trace
+        self.name = name
+        self.span_id = len(trace.spans)
+        self.parent_id = parent_id
+        self.start = time.perf_counter()
+        self.duration: Optional[float] = None
+        self.attributes = attributes
+        self.error: Optional[str] = None
+        trace.spans.append(self)
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def fail(self, error: str):
+        self.error = error
+        self.trace.failed = True
+
+    def to_dict(self) -> Dict:
+        return {
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_ms": round((self.start - self.trace.start) * 1000, 3),
+            "duration_ms": round(self.duration * 1000, 3) if self.duration is not None else None,
+            "attributes": self.attributes,
+            "error": self.error
+        }
+
+
+class Trace:
+    __slots__ = ("trace_id", "started_at", "start", "spans", "failed")
+
+    def __init__(self):
+        self.trace_id = local_id()   # routes back to this worker for /debug/traces/{id}
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.spans: List[Span] = []
+        self.failed = False
+
+    def to_dict(self) -> Dict:
+        root = self.spans[0]
+        return {
+            "trace_id": self.trace_id,
+            "name": root.name,
+            "started_at": self.started_at,
+            "duration_ms": round((root.duration or 0) * 1000, 3),
+            "failed": self.failed,
+            "attributes": root.attributes,
+            "spans": [span.to_dict() for span in self.spans]
+        }
+
+
+class Tracer:
+    """In-process request tracing with tail-based sampling.
+
+    Every traced request records all of its spans in memory, which costs a
+    few microseconds per span. The decision to keep a trace is made when it
+    ends: only slow (>= slow_threshold seconds) or failed ones are kept, in a
+    ring buffer and, if `path` is set, appended as JSON lines to a file.
+    Spans opened outside a trace are no-ops.
+    """
+
+    def __init__(self, slow_threshold: float = 1.0, capacity: int = 200, path: Optional[str] = None):
+        self.slow_threshold = slow_threshold
+        self.path = path
+        self.kept: Deque[Dict] = deque(maxlen=capacity)
+        self.started = 0
+        self.sampled = 0
+
+    @contextmanager
+    def trace(self, name: str, **attributes):
+        """Root span of one request"""
+        trace = Trace()
+        self.started += 1
+        root = Span(trace, name, None, attributes)
+        token = _current_span.set(root)
+        try:
+            yield root
+        except BaseException as e:
+            root.fail(repr(e))
+            raise
+        finally:
+            root.duration = time.perf_counter() - root.start
+            _current_span.reset(token)
+            if trace.failed or root.duration >= self.slow_threshold:
+                self._keep(trace)
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        parent = _current_span.get()
+        if parent is None:
+            yield None
+            return
+        span = Span(parent.trace, name, parent.span_id, attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.fail(repr(e))
+            raise
+        finally:
+            span.duration = time.perf_counter() - span.start
+            _current_span.reset(token)
+
+    def _keep(self, trace: Trace):
+        data = trace.to_dict()
+        self.kept.append(data)
+        self.sampled += 1
+        if self.path:
+            try:
+                with open(self.path, "a") as f:
+                    f.write(json.dumps(data, default=str) + "\n")
+            except Exception as e:
+                logger.error(f"Could not write trace to {self.path}: {str(e)}")
+
+    def recent(self, limit: int = 50, session_id: Optional[str] = None) -> List[Dict]:
+        traces = [t for t in reversed(self.kept) if session_id is None or t["attributes"].get("session_id") == session_id]
+        return traces[:limit]
+
+    def get(self, trace_id: str) -> Optional[Dict]:
+        return next((t for t in self.kept if t["trace_id"] == trace_id), None)
+
+    def stats(self) -> Dict:
+        return {"started": self.started, "kept": self.sampled, "buffered": len(self.kept), "slow_threshold": self.slow_threshold}
+
+
+tracer = Tracer(
+    slow_threshold=float(os.getenv("TRACE_SLOW_SECONDS", "1.0")),
+    capacity=int(os.getenv("TRACE_BUFFER", "200")),
+    path=os.getenv("TRACE_FILE")
+)
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def annotate(**attributes):
+    """Add attributes to the current span (no-op outside a trace)"""
+    span = _current_span.get()
+    if span is not None:
+        span.set(**attributes)
+
+
+def record_error(error: str):
+    """Mark the current span failed for errors that are caught and handled, so the trace is kept"""
+    span = _current_span.get()
+    if span is not None:
+        span.fail(error)
+
+
+def traced(name: Optional[str] = None):
+    """Decorator running a function (sync or async) inside a span"""
+    def decorator(func):
+        span_name = name or func.__name__
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if _current_span.get() is None:
+                    return await func(*args, **kwargs)
+                with tracer.span(span_name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _current_span.get() is None:
+                return func(*args, **kwargs)
+            with tracer.span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,227 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+import uuid
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_seq = itertools.count()
+
+
+class Trigger:
+    __slots__ = ("trigger_id", "session_id", "exchange", "symbol", "direction", "threshold", "action",
+                 "side", "quantity", "limit_price", "status", "created_at", "fired_at", "fired_price",
+                 "client_order_id")
+
+    def __init__(self, exchange: str, symbol: str, direction: str, threshold: float, action: str = "alert",
+                 side: Optional[str] = None, quantity: Optional[float] = None, limit_price: Optional[float] = None,
+                 session_id: Optional[str] = None, trigger_id: Optional[str] = None):
+        self.trigger_id = trigger_id or uuid.uuid4().hex
+        self.session_id = session_id
+        self.exchange = exchange
+        self.symbol = symbol
+        self.direction = direction
+        self.threshold = threshold
+        self.action = action
+        self.side = side
+        self.quantity = quantity
+        self.limit_price = limit_price
+        self.status = "armed"
+        self.created_at = time.time()
+        self.fired_at = None
+        self.fired_price = None
+        self.client_order_id = None
+
+    def to_dict(self) -> Dict:
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+
+class TriggerBook:
+    """Armed triggers of one (exchange, symbol).
+
+    "above" triggers sit in a min-heap and "below" triggers in a max-heap, so a
+    tick only looks at the heap tops: cost is O(crossed * log armed), nothing
+    is touched when no threshold was crossed. Cancelled triggers are dropped
+    lazily when they reach the top.
+    """
+
+    def __init__(self, symbol: str = ""):
+        self.symbol = symbol    # as first armed, what a per-symbol price request asks for
+        self.above: List[Tuple[float, int, Trigger]] = []   # (threshold, seq, trigger)
+        self.below: List[Tuple[float, int, Trigger]] = []   # (-threshold, seq, trigger)
+        self.armed = 0
+        self.checked_at = 0.0   # last time any price for the symbol was evaluated
+
+    def add(self, trigger: Trigger):
+        if trigger.direction == "above":
+            heapq.heappush(self.above, (trigger.threshold, next(_seq), trigger))
+        else:
+            heapq.heappush(self.below, (-trigger.threshold, next(_seq), trigger))
+        self.armed += 1
+
+    def crossed(self, price: float) -> List[Trigger]:
+        fired = []
+        above, below = self.above, self.below
+        while above and above[0][0] <= price:
+            trigger = heapq.heappop(above)[2]
+            if trigger.status == "armed":
+                fired.append(trigger)
+        while below and -below[0][0] >= price:
+            trigger = heapq.heappop(below)[2]
+            if trigger.status == "armed":
+                fired.append(trigger)
+        self.armed -= len(fired)
+        return fired
+
+
+class TriggerEngine:
+    """Price alerts and conditional orders keyed by (exchange, symbol_key(symbol))"""
+
+    def __init__(self, symbol_key: Callable[[str], str] = str.upper):
+        self.symbol_key = symbol_key
+        self.books: Dict[Tuple[str, str], TriggerBook] = {}
+        self.triggers: Dict[str, Trigger] = {}
+        self.session_triggers: Dict[str, List[str]] = {}
+        self.listeners: List[Callable[[Trigger], None]] = []
+        self.fired = 0
+
+    def add_listener(self, listener: Callable[[Trigger], None]):
+        self.listeners.append(listener)
+
+    def arm(self, trigger: Trigger) -> Trigger:
+        key = (trigger.exchange.lower(), self.symbol_key(trigger.symbol))
+        book = self.books.get(key)
+        if book is None:
+            book = self.books[key] = TriggerBook(trigger.symbol)
+        book.add(trigger)
+        self.triggers[trigger.trigger_id] = trigger
+        if trigger.session_id:
+            self.session_triggers.setdefault(trigger.session_id, []).append(trigger.trigger_id)
+        return trigger
+
+    def restore(self, data: Dict) -> Trigger:
+        """Re-arm a trigger recovered from the journal, keeping its id and creation time"""
+        existing = self.triggers.get(data["trigger_id"])
+        if existing is not None:
+            return existing
+        trigger = Trigger(data["exchange"], data["symbol"], data["direction"], float(data["threshold"]),
+                          action=data.get("action", "alert"), side=data.get("side"), quantity=data.get("quantity"),
+                          limit_price=data.get("limit_price"), session_id=data.get("session_id"), trigger_id=data["trigger_id"])
+        trigger.created_at = data.get("created_at", trigger.created_at)
+        return self.arm(trigger)
+
+    def cancel(self, trigger_id: str) -> Optional[Trigger]:
+        trigger = self.triggers.get(trigger_id)
+        if trigger is not None and trigger.status == "armed":
+            trigger.status = "cancelled"
+            book = self.books.get((trigger.exchange.lower(), self.symbol_key(trigger.symbol)))
+            if book is not None:
+                book.armed -= 1
+        return trigger
+
+    def on_price(self, exchange: str, symbol: str, price: float) -> List[Trigger]:
+        return self._evaluate(self.books.get((exchange.lower(), self.symbol_key(symbol))), price)
+
+    def _evaluate(self, book: Optional[TriggerBook], price: float) -> List[Trigger]:
+        if book is None or book.armed <= 0 or price <= 0:
+            return []
+        book.checked_at = time.time()
+        fired = book.crossed(price)
+        if not fired:
+            return fired
+        now = time.time()
+        for trigger in fired:
+            trigger.status = "fired"
+            trigger.fired_at = now
+            trigger.fired_price = price
+            self.fired += 1
+            for listener in self.listeners:
+                try:
+                    listener(trigger)
+                except Exception as e:
+                    logger.error(f"Trigger listener failed for {trigger.trigger_id}: {str(e)}")
+        return fired
+
+    def on_snapshot(self, exchange: str, prices: Dict[str, float]) -> List[Trigger]:
+        """Evaluate a whole-exchange snapshot ({symbol key: price}), only symbols with armed triggers are looked at"""
+        fired = []
+        for (book_exchange, key), book in list(self.books.items()):
+            if book_exchange == exchange and book.armed > 0 and key in prices:
+                fired.extend(self._evaluate(book, prices[key]))
+        return fired
+
+    def armed_exchanges(self) -> List[str]:
+        return sorted({exchange for (exchange, _), book in self.books.items() if book.armed > 0})
+
+    def unchecked(self, max_age: float) -> List[Tuple[str, str]]:
+        """(exchange, symbol) with armed triggers no price reached for max_age seconds, e.g. not in any bulk snapshot"""
+        cutoff = time.time() - max_age
+        return [(exchange, book.symbol) for (exchange, _), book in self.books.items()
+                if book.armed > 0 and book.checked_at < cutoff]
+
+    def for_session(self, session_id: str) -> List[Trigger]:
+        return [self.triggers[tid] for tid in self.session_triggers.get(session_id, [])]
+
+    def stats(self) -> Dict:
+        return {"armed": sum(book.armed for book in self.books.values()), "fired": self.fired, "symbols": len(self.books)}
+
+
+class TriggerPoller:
+    """Per-symbol price requests for armed symbols the bulk snapshots don't cover.
+
+    Deribit futures, delisted pairs and the like never show up in a bulk
+    ticker, so every `interval` seconds each armed symbol that no price has
+    reached for `max_age` seconds is fetched on its own (at most
+    `concurrency` at once). The fetch is expected to feed the price back
+    through TriggerEngine.on_price, only live prices fire triggers.
+    """
+
+    def __init__(self, engine: TriggerEngine, fetch: Callable[[str, str], Awaitable], interval: float = 5.0,
+                 max_age: float = 10.0, concurrency: int = 8):
+        self.engine = engine
+        self.fetch = fetch
+        self.interval = interval
+        self.max_age = max_age
+        self.concurrency = concurrency
+        self.polled = 0
+        self.failures = 0
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._poll_loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def poll(self):
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def fetch(exchange: str, symbol: str):
+            async with semaphore:
+                try:
+                    await self.fetch(exchange, symbol)
+                    self.polled += 1
+                except Exception as e:
+                    self.failures += 1
+                    logger.error(f"Trigger price poll failed for {symbol} on {exchange}: {str(e)}")
+
+        await asyncio.gather(*(fetch(exchange, symbol) for exchange, symbol in self.engine.unchecked(self.max_age)))
+
+    async def _poll_loop(self):
+        while True:
+            try:
+                await asyncio.sleep(self.interval)
+                await self.poll()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Trigger poll loop error: {str(e)}")
+
+    def stats(self) -> Dict:
+        return {"polled": self.polled, "failures": self.failures, "unchecked": len(self.engine.unchecked(self.max_age))}
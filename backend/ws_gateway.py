@@ -0,0 +1,282 @@
+import asyncio
+import json
+import logging
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Set
+
+from fastapi import WebSocket, WebSocketDisconnect
+
+logger = logging.getLogger(__name__)
+
+# what to do when a connection's outbound queue is full
+POLICY_DROP_OLDEST = "drop_oldest"
+POLICY_DROP_NEWEST = "drop_newest"
+POLICY_COALESCE = "coalesce"
+
+# frames a newer one fully replaces, keyed by what they describe (coalesced when the queue is full)
+COALESCE_KEYS = {
+    "heartbeat": lambda message: "heartbeat",
+    "pong": lambda message: "pong",
+    "order_update": lambda message: f"order:{message['order']['client_order_id']}",
+}
+# frames that may be dropped outright under backpressure; transcript lines, alerts and order updates never are
+DROPPABLE_TYPES = {"heartbeat", "pong"}
+# a client this many times max_queue behind on frames we can't drop is disconnected instead
+OVERFLOW_FACTOR = 4
+
+# sentinel pushed into a queue to make the writer close the socket after flushing
+_CLOSE = object()
+
+
+def coalesce_key(message: Dict) -> Optional[str]:
+    key_of = COALESCE_KEYS.get(message.get("type"))
+    try:
+        return key_of(message) if key_of else None
+    except (KeyError, TypeError):
+        return None
+
+
+class ClientConnection:
+    """One browser socket with its own bounded send queue and writer task.
+
+    When full only heartbeats/pongs are dropped and one order's updates are
+    coalesced; a client too far behind on the rest is disconnected instead.
+    """
+
+    def __init__(self, websocket: WebSocket, session_id: str, role: str, max_queue: int, policy: str,
+                 batch: bool = False):
+        self.websocket = websocket
+        self.session_id = session_id
+        self.role = role
+        self.max_queue = max_queue
+        self.policy = policy
+        self.batch = batch
+        self.queue: Deque = deque()
+        self.wakeup = asyncio.Event()
+        self.last_seen = time.monotonic()
+        self.sent = 0
+        self.batches = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.overflowed = False
+        self.closed = False
+        self.closing = False
+        self.writer_task: Optional[asyncio.Task] = None
+
+    def enqueue(self, frame: str, kind: Optional[str] = None, key: Optional[str] = None) -> bool:
+        """Queue an already-encoded frame, never blocks the caller"""
+        if self.closed or self.closing:
+            return False
+        droppable = kind in DROPPABLE_TYPES
+
+        if len(self.queue) >= self.max_queue:
+            if key is not None and self.policy == POLICY_COALESCE and self._replace(frame, key):
+                return True
+            if droppable and self.policy == POLICY_DROP_NEWEST:
+                self.dropped += 1
+                return False
+            if not self._drop_oldest_droppable():
+                if droppable:
+                    # everything queued must be delivered, the heartbeat is the one to go
+                    self.dropped += 1
+                    return False
+                if len(self.queue) >= self.max_queue * OVERFLOW_FACTOR:
+                    logger.warning(f"Session {self.session_id} ({self.role}) is {len(self.queue)} frames behind, disconnecting it")
+                    self.overflowed = True
+                    self.request_close()
+                    return False
+
+        self.queue.append((frame, key, droppable))
+        self.wakeup.set()
+        return True
+
+    def _replace(self, frame: str, key: str) -> bool:
+        # the newest queued frame for the same thing is superseded in place
+        for i in range(len(self.queue) - 1, -1, -1):
+            queued = self.queue[i]
+            if queued is not _CLOSE and queued[1] == key:
+                self.queue[i] = (frame, key, queued[2])
+                self.coalesced += 1
+                return True
+        return False
+
+    def _drop_oldest_droppable(self) -> bool:
+        for i, queued in enumerate(self.queue):
+            if queued is not _CLOSE and queued[2]:
+                del self.queue[i]
+                self.dropped += 1
+                return True
+        return False
+
+    def request_close(self):
+        if not self.closed and not self.closing:
+            self.closing = True
+            self.queue.append(_CLOSE)
+            self.wakeup.set()
+
+    async def run_writer(self, send_timeout: float):
+        try:
+            while True:
+                await self.wakeup.wait()
+                self.wakeup.clear()
+
+                # drain everything queued since the last wakeup in one go
+                while self.queue:
+                    if self.batch:
+                        frames = []
+                        while self.queue and self.queue[0] is not _CLOSE:
+                            frames.append(self.queue.popleft()[0])
+                        if frames:
+                            await asyncio.wait_for(self.websocket.send_text(f"[{','.join(frames)}]"), timeout=send_timeout)
+                            self.sent += len(frames)
+                            self.batches += 1
+                            continue
+                    item = self.queue.popleft()
+                    if item is _CLOSE:
+                        return
+                    await asyncio.wait_for(self.websocket.send_text(item[0]), timeout=send_timeout)
+                    self.sent += 1
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.warning(f"Writer for session {self.session_id} ({self.role}) stopped: {str(e)}")
+        finally:
+            self.closed = True
+            self.queue.clear()
+            try:
+                await self.websocket.close()
+            except Exception:
+                pass
+
+    def stats(self) -> Dict:
+        return {
+            "role": self.role,
+            "queued": len(self.queue),
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "batches": self.batches,
+            "overflowed": self.overflowed,
+            "idle_seconds": round(time.monotonic() - self.last_seen, 1)
+        }
+
+
+class WebSocketGateway:
+    """Fan-out layer between the webhook handlers and browser sockets.
+
+    publish() only encodes and enqueues, so a slow socket never delays a
+    webhook response. Each socket is drained by its own writer task.
+    """
+
+    def __init__(self, max_queue: int = 100, policy: str = POLICY_COALESCE,
+                 heartbeat_interval: float = 15.0, idle_timeout: Optional[float] = None, send_timeout: float = 5.0):
+        self.max_queue = max_queue
+        self.policy = policy
+        self.heartbeat_interval = heartbeat_interval
+        self.idle_timeout = idle_timeout
+        self.send_timeout = send_timeout
+        self.sessions: Dict[str, Set[ClientConnection]] = {}
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        self._heartbeat_frame = json.dumps({"type": "heartbeat"})
+        self._pong_frame = json.dumps({"type": "pong"})
+
+    def __contains__(self, session_id: str) -> bool:
+        return bool(self.sessions.get(session_id))
+
+    def __len__(self) -> int:
+        return len(self.sessions)
+
+    def connection_count(self) -> int:
+        return sum(len(conns) for conns in self.sessions.values())
+
+    async def start(self):
+        if self._heartbeat_task is None:
+            self._heartbeat_task = asyncio.create_task(self._heartbeat_loop())
+
+    async def stop(self):
+        if self._heartbeat_task:
+            self._heartbeat_task.cancel()
+            self._heartbeat_task = None
+        for session_id in list(self.sessions.keys()):
+            self.close_session(session_id)
+
+    async def connect(self, websocket: WebSocket, session_id: str, role: str = "caller", batch: bool = False) -> ClientConnection:
+        await websocket.accept()
+        conn = ClientConnection(websocket, session_id, role, self.max_queue, self.policy, batch)
+        conn.writer_task = asyncio.create_task(conn.run_writer(self.send_timeout))
+        self.sessions.setdefault(session_id, set()).add(conn)
+        logger.info(f"WebSocket connection established for session {session_id} ({role}), sockets: {len(self.sessions[session_id])}")
+        return conn
+
+    def disconnect(self, conn: ClientConnection):
+        conns = self.sessions.get(conn.session_id)
+        if conns is not None:
+            conns.discard(conn)
+            if not conns:
+                del self.sessions[conn.session_id]
+        conn.request_close()
+
+    def publish(self, session_id: str, message: Dict) -> int:
+        """Encode once and enqueue on every socket of the session, returns sockets reached"""
+        conns = self.sessions.get(session_id)
+        if not conns:
+            return 0
+        frame = json.dumps(message)
+        kind = message.get("type")
+        key = coalesce_key(message)
+        return sum(1 for conn in conns if conn.enqueue(frame, kind, key))
+
+    def send_to(self, conn: ClientConnection, message: Dict) -> bool:
+        return conn.enqueue(json.dumps(message), message.get("type"), coalesce_key(message))
+
+    def close_session(self, session_id: str):
+        """Flush and close every socket of the session without waiting on them"""
+        conns = self.sessions.pop(session_id, None)
+        if not conns:
+            return
+        for conn in conns:
+            conn.request_close()
+        logger.info(f"Closing {len(conns)} WebSocket connection(s) for session {session_id}")
+
+    async def serve(self, conn: ClientConnection):
+        """Read loop for one socket, any inbound frame counts as a heartbeat"""
+        try:
+            while not conn.closed:
+                data = await conn.websocket.receive_text()
+                conn.last_seen = time.monotonic()
+                try:
+                    message_data = json.loads(data)
+                    if message_data.get("type") == "ping":
+                        conn.enqueue(self._pong_frame, "pong", "pong")
+                except json.JSONDecodeError:
+                    logger.warning(f"Invalid JSON received: {data}")
+        except WebSocketDisconnect:
+            logger.info(f"WebSocket disconnected for session {conn.session_id} ({conn.role})")
+        except Exception as e:
+            logger.error(f"WebSocket error for session {conn.session_id}: {str(e)}")
+        finally:
+            self.disconnect(conn)
+
+    async def _heartbeat_loop(self):
+        while True:
+            try:
+                await asyncio.sleep(self.heartbeat_interval)
+                now = time.monotonic()
+                for session_id, conns in list(self.sessions.items()):
+                    for conn in list(conns):
+                        # a dead socket fails its heartbeat send (send_timeout) and marks itself closed,
+                        # idle_timeout additionally drops clients that have stopped talking to us
+                        idle = self.idle_timeout is not None and now - conn.last_seen > self.idle_timeout
+                        if conn.closed or idle:
+                            logger.info(f"Dropping stale WebSocket for session {session_id} ({conn.role})")
+                            self.disconnect(conn)
+                        else:
+                            conn.enqueue(self._heartbeat_frame, "heartbeat", "heartbeat")
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Heartbeat loop error: {str(e)}")
+
+    def stats(self) -> Dict[str, List[Dict]]:
+        return {session_id: [conn.stats() for conn in conns] for session_id, conns in self.sessions.items()}